@@ -1,18 +1,47 @@
+import functools
+import hashlib
+import json
+import platform
+import sys
+import threading
+import time
 from use_cases.search_files import SearchFilesUseCase
 from use_cases.benchmark import BenchmarkUseCase
 from use_cases.estimation import EstimationUseCase
+from use_cases.parallel_search import ParallelSearchUseCase
+from use_cases.pipeline_search import PipelineSearchUseCase
+from use_cases.metrics import SearchMetrics, NO_METRICS
 from domain.algorithms.naive import NaiveSearch
 from domain.algorithms.boyer_moore import BoyerMooreSearch
+from domain.algorithms.boyer_moore_multi import MultiBoyerMooreSearch
 from domain.algorithms.kmp import KMPSearch
-from domain.algorithms.aho_corasick import AhoCorasickSearch
+from domain.algorithms.kmp_multi import MultiKMPSearch
+from domain.algorithms.aho_corasick_compact import CompactAhoCorasickSearch
 from domain.algorithms.bitap import BitapSearch
+from domain.algorithms.bitap_multi import MultiBitapSearch
+from domain.algorithms.native import NativeSearch
+from domain.algorithms.vectorized_search import VectorizedSearch
 from domain.algorithms.composite import CompositeSearchAlgorithm
+from domain.interfaces.algorithm_cache import AlgorithmCache
+from domain.interfaces.calibration_store import CalibrationStore
+from domain.models.result_mode import ResultMode
 
 class SearchController:
-    def __init__(self, search_use_case: SearchFilesUseCase, benchmark_use_case: BenchmarkUseCase, estimation_use_case: EstimationUseCase):
+    # アルゴリズムの内部表現を変えたら上げる（古いキャッシュを使わないため）
+    ALGORITHM_CACHE_VERSION = 7
+    # 保存した起動時のベンチマークの係数をこの秒数まで使う（過ぎたら裏で測り直す）
+    CALIBRATION_MAX_AGE = 7 * 24 * 3600
+
+    def __init__(self, search_use_case: SearchFilesUseCase, benchmark_use_case: BenchmarkUseCase, estimation_use_case: EstimationUseCase,
+                 parallel_search_use_case: ParallelSearchUseCase = None, algorithm_cache: AlgorithmCache = None,
+                 pipeline_search_use_case: PipelineSearchUseCase = None, calibration_store: CalibrationStore = None):
         self.search_use_case = search_use_case
         self.benchmark_use_case = benchmark_use_case
         self.estimation_use_case = estimation_use_case
+        self.parallel_search_use_case = parallel_search_use_case
+        self.algorithm_cache = algorithm_cache
+        self.pipeline_search_use_case = pipeline_search_use_case
+        self.calibration_store = calibration_store
         self.benchmark_coeffs = {}
 
     def run_benchmark(self):
@@ -20,66 +49,254 @@ class SearchController:
             "naive": NaiveSearch("benchmarkpattern"),
             "bm": BoyerMooreSearch("benchmarkpattern"),
             "kmp": KMPSearch("benchmarkpattern"),
-            "ac": AhoCorasickSearch(["benchmarkpattern"]),
+            "ac": CompactAhoCorasickSearch(["benchmarkpattern"]),
+            "native": NativeSearch(["benchmarkpattern"]),
+            "vector": VectorizedSearch(["benchmarkpattern"]),
             "bitap": BitapSearch("benchmarkpattern", max_distance=1)
         }
         self.benchmark_coeffs = self.benchmark_use_case.execute(algos)
+        if self.calibration_store:
+            self.calibration_store.put(self._calibration_key(), {"coeffs": self.benchmark_coeffs, "time": time.time()})
         return self.benchmark_coeffs
 
+    def calibrate(self, on_done=None) -> bool:
+        """
+        保存済みの係数（同じマシン・インタプリタで測ったもの）があればすぐに使う。
+        無いか CALIBRATION_MAX_AGE より古ければ、別スレッドで run_benchmark をやり直し、終わったら on_done(係数) を呼ぶ
+        （その間の見積もりは保存済みの係数か、無ければ既定の係数で行う）。測り直すなら True を返す。
+        """
+        entry = self.calibration_store.get(self._calibration_key()) if self.calibration_store else None
+        if entry:
+            self.benchmark_coeffs = entry["coeffs"]
+            if time.time() - entry.get("time", 0) < self.CALIBRATION_MAX_AGE:
+                return False
+
+        def task():
+            coeffs = self.run_benchmark()
+            if on_done:
+                on_done(coeffs)
+
+        threading.Thread(target=task, daemon=True).start()
+        return True
+
+    def _ensure_calibration(self):
+        """係数がまだ無ければ、保存済みのものを読むか、その場で測る。"""
+        if not self.benchmark_coeffs:
+            entry = self.calibration_store.get(self._calibration_key()) if self.calibration_store else None
+            if entry:
+                self.benchmark_coeffs = entry["coeffs"]
+            else:
+                self.run_benchmark()
+
+    def _calibration_key(self):
+        # 係数はマシンとインタプリタ（とエンジンの実装）が同じときだけ使い回せる
+        return "/".join([
+            platform.node(), platform.machine(), platform.processor() or "-",
+            platform.python_implementation(), sys.version.split()[0], str(self.ALGORITHM_CACHE_VERSION)
+        ])
+
+    def run_benchmark_suite(self, **options):
+        """生成したコーパスでエンジンを測る（引数は BenchmarkUseCase.run_suite を参照）。"""
+        return self.benchmark_use_case.run_suite(self._get_algorithm, **options)
+
     def estimate_time(self, file_paths, algorithm_key, patterns, bitap_distance):
         return self.estimation_use_case.execute(file_paths, algorithm_key, patterns, self.benchmark_coeffs, bitap_distance)
 
     def get_all_estimates(self, file_paths, patterns, bitap_distance):
         estimates = {}
-        for key in ["naive", "bm", "kmp", "ac", "bitap"]:
+        for key in ["naive", "bm", "kmp", "ac", "native", "vector", "bitap"]:
             estimates[key] = self.estimation_use_case.get_seconds(file_paths, key, patterns, self.benchmark_coeffs, bitap_distance)
         return estimates
 
-    def run_search(self, file_paths, algorithm_key, patterns, bitap_distance, progress_callback=None):
-        algorithm = self._get_algorithm(algorithm_key, patterns, bitap_distance)
+    def run_search(self, file_paths, algorithm_key, patterns, bitap_distance, progress_callback=None, workers=1,
+                   result_callback=None, result_mode="all", first_n=1, pipeline=None, metrics: SearchMetrics = None):
+        """
+        workers が 1 以外ならプロセスプールで並列に検索する（None は CPU 数）。
+        result_callback(path, SearchResult) には見つかった一致が届いた順に渡される。
+        result_mode: "all" / "count" / "exists" / "first_n"（first_n 件まで）。ResultMode を参照。
+        pipeline に "thread" / "process" を渡すと、読み込み・デコード・走査を重ねて行う（workers が 1 のとき）。
+        zip / tar は展開せずにメンバーごとに検索し、結果は仮想パス "bundle.zip!/var/log/app.log" で返す。
+        algorithm_key に "auto" を渡すと、ファイルごとに速そうなエンジンを選ぶ（使ったエンジンは結果の "engine"）。
+        metrics (SearchMetrics) を渡すと、段ごとの時間・エンジンごとのカウンタ・（指定があれば）cProfile の結果が溜まる。
+        エンジン固有のカウンタは、探索器がこのプロセスで動くとき（並列のワーカーや process のパイプライン以外）だけ数える。
+        """
+        metrics = metrics or NO_METRICS
+        expanded = self._expand_archives(file_paths)
+        if pipeline is None and set(expanded) - set(file_paths):
+            # 多数のメンバーを1つずつ順に読むより、次のメンバーを先読みしながら検索する
+            pipeline = "thread"
+        file_paths = expanded
+        mode = ResultMode(result_mode, first_n)
+
+        if algorithm_key == "auto":
+            return self._run_auto(file_paths, patterns, bitap_distance, progress_callback, workers, result_callback,
+                                  mode, pipeline, metrics)
+        return self._run_engine(file_paths, algorithm_key, patterns, bitap_distance, progress_callback, workers,
+                                result_callback, mode, pipeline, metrics)
+
+    def _run_auto(self, file_paths, patterns, bitap_distance, progress_callback, workers, result_callback, mode,
+                  pipeline, metrics):
+        # コストモデルが当てはめ前のエンジンは、起動時のベンチマークの係数で比べる
+        self._ensure_calibration()
+        groups = {}
+        with metrics.stage("select"):
+            choices = self.estimation_use_case.choose_engines(file_paths, patterns, self.benchmark_coeffs)
+            for path in file_paths:
+                groups.setdefault(choices[path][0], []).append(path)
+
+        sizes = {path: self.search_use_case.file_repo.get_size(path) for path in file_paths}
+        total_size = sum(sizes.values())
+
+        def report(base_offset, path, current, total, file_current, file_total):
+            # エンジンごとの進捗を、全ファイルに対する進捗にする
+            progress_callback(path, base_offset + current, total_size, file_current, file_total)
+
+        results = {}
+        processed_size = 0
+        for key, paths in groups.items():
+            results.update(self._run_engine(
+                paths, key, patterns, bitap_distance,
+                functools.partial(report, processed_size) if progress_callback else None,
+                workers, result_callback, mode, pipeline, metrics
+            ))
+            processed_size += sum(sizes[path] for path in paths)
+        return {path: results[path] for path in file_paths}
+
+    def _run_engine(self, file_paths, algorithm_key, patterns, bitap_distance, progress_callback, workers,
+                    result_callback, mode, pipeline, metrics=NO_METRICS):
+        with metrics.stage("build"):
+            algorithm = self._get_cached_algorithm(algorithm_key, patterns, bitap_distance)
+
+        if metrics.enabled:
+            algorithm.enable_stats(metrics.engine_counters(algorithm_key))
+        try:
+            if workers != 1 and self.parallel_search_use_case:
+                with metrics.profiled("run"):
+                    results = self.parallel_search_use_case.execute(
+                        file_paths, algorithm, max_workers=workers, progress_callback=progress_callback,
+                        result_callback=result_callback, mode=mode, metrics=metrics
+                    )
+            elif pipeline and self.pipeline_search_use_case:
+                with metrics.profiled("run"):
+                    results = self.pipeline_search_use_case.execute(
+                        file_paths, algorithm, progress_callback=progress_callback, result_callback=result_callback,
+                        mode=mode, processes=pipeline == "process", metrics=metrics
+                    )
+            else:
+                results = self._run_sequential(file_paths, algorithm, progress_callback, result_callback, mode, metrics)
+        finally:
+            if metrics.enabled:
+                algorithm.enable_stats(None)  # キャッシュに残る探索器にカウンタを持たせたままにしない
+
+        for data in results.values():
+            data["engine"] = algorithm_key
+        if metrics.enabled:
+            self._count_results(metrics, algorithm_key, results)
+        if mode.quota is None and self.estimation_use_case:
+            # 打ち切った検索の時間はファイル全体の走査時間ではないので、コストモデルには足さない
+            self.estimation_use_case.record(algorithm_key, patterns, bitap_distance, results)
+        return results
+
+    def _run_sequential(self, file_paths, algorithm, progress_callback, result_callback, mode, metrics=NO_METRICS):
         results = {}
 
         total_size = sum(self.search_use_case.file_repo.get_size(path) for path in file_paths)
         processed_size = 0
 
+        def report(path, base_offset, current, total):
+            # 全体の進捗とファイルごとの進捗を両方渡す
+            progress_callback(path, base_offset + current, total_size, current, total)
+
         for path in file_paths:
             file_size = self.search_use_case.file_repo.get_size(path)
-
-            def make_wrapped_callback(base_offset, p):
-                # Pass both global and file-local progress
-                return lambda current, total: progress_callback(p, base_offset + current, total_size, current, total) if progress_callback else None
-
-            results[path] = self.search_use_case.execute(
-                path,
-                algorithm,
-                progress_callback=make_wrapped_callback(processed_size, path)
-            )
+            with metrics.profiled("file"):
+                results[path] = self.search_use_case.execute(
+                    path,
+                    algorithm,
+                    progress_callback=functools.partial(report, path, processed_size) if progress_callback else None,
+                    result_callback=functools.partial(result_callback, path) if result_callback else None,
+                    mode=mode,
+                    metrics=metrics
+                )
             processed_size += file_size
 
         return results
 
+    @staticmethod
+    def _count_results(metrics, algorithm_key, results):
+        """エンジンごとと全体の、ファイル数・走査したバイト数・一致件数・所要時間を足す。"""
+        totals = {
+            "files": len(results),
+            "bytes_scanned": sum(data["scanned"] for data in results.values()),
+            "matches": sum(sum(data["result"].counts.values()) for data in results.values())
+        }
+        counters = metrics.engine_counters(algorithm_key)
+        for name, n in totals.items():
+            metrics.count(name, n)
+            counters[name] = counters.get(name, 0) + n
+        counters["time_ms"] = counters.get("time_ms", 0) + sum(data["time"] for data in results.values())
+
+    def _expand_archives(self, file_paths):
+        expanded = []
+        for path in file_paths:
+            members = self.search_use_case.file_repo.list_members(path)
+            expanded.extend(members if members is not None else [path])
+        return list(dict.fromkeys(expanded))
+
     def get_algorithm_info(self, algorithm_key):
+        if algorithm_key == "auto":
+            return "Auto", (
+                "ファイルごとに、先頭を少し読んで一致の多さを見積もり、最も速そうなエンジン（Bitap 以外）を選びます。"
+                "見積もりは検索のたびに記録した実際の所要時間から求めるので、使うほど正確になります。"
+            )
         algo = self._get_algorithm(algorithm_key, ["dummy"], 2)
         return algo.name, algo.get_description()
 
+    def _get_cached_algorithm(self, algorithm_key, patterns, bitap_distance):
+        if not self.algorithm_cache:
+            return self._get_algorithm(algorithm_key, patterns, bitap_distance)
+
+        key = self._cache_key(algorithm_key, patterns, bitap_distance)
+        algorithm = self.algorithm_cache.get(key)
+        if algorithm is None:
+            algorithm = self._get_algorithm(algorithm_key, patterns, bitap_distance)
+            algorithm.prepare()
+            self.algorithm_cache.put(key, algorithm)
+        return algorithm
+
+    def _cache_key(self, algorithm_key, patterns, bitap_distance):
+        params = bitap_distance if algorithm_key == "bitap" else None
+        content = json.dumps([self.ALGORITHM_CACHE_VERSION, algorithm_key, list(patterns), params], ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
     def _get_algorithm(self, algorithm_key, patterns, bitap_distance):
         if algorithm_key == "ac":
-            return AhoCorasickSearch(patterns)
+            return CompactAhoCorasickSearch(patterns)
+
+        if algorithm_key == "native":
+            return NativeSearch(patterns)
+
+        if algorithm_key == "vector":
+            # NumPy の配列演算（Naive / BM は NumPy を使わない）
+            return VectorizedSearch(patterns)
 
         if algorithm_key == "bitap":
-            searchers = [BitapSearch(p, bitap_distance) for p in patterns]
-            return CompositeSearchAlgorithm(searchers, "Bitap (Multi)")
+            return MultiBitapSearch(patterns, bitap_distance)
 
         if algorithm_key == "naive":
+            # Naive はパターンごとに走査する（1パターン版をそのまま束ねる）
             searchers = [NaiveSearch(p) for p in patterns]
             return CompositeSearchAlgorithm(searchers, "Naive (Multi)")
 
+        # BM と KMP は、複数パターンなら全パターンを1回で走査する版を使う
         if algorithm_key == "bm":
-            searchers = [BoyerMooreSearch(p) for p in patterns]
-            return CompositeSearchAlgorithm(searchers, "Boyer-Moore (Multi)")
+            if len(patterns) == 1:
+                return BoyerMooreSearch(patterns[0])
+            return MultiBoyerMooreSearch(patterns)
 
         if algorithm_key == "kmp":
-            searchers = [KMPSearch(p) for p in patterns]
-            return CompositeSearchAlgorithm(searchers, "KMP (Multi)")
+            if len(patterns) == 1:
+                return KMPSearch(patterns[0])
+            return MultiKMPSearch(patterns)
 
         raise ValueError(f"Unknown algorithm: {algorithm_key}")
@@ -0,0 +1,195 @@
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Optional
+from domain.interfaces.file_repository import FileRepository
+from use_cases.line_index import LineIndexUseCase
+
+
+class ResultTable:
+    """
+    検索結果を「1件の一致につき1行」の表として見せるモデル（UI には依存しない）。
+
+    行はその場で組み立てるだけで、全件の行オブジェクトは作らない。行番号 i から
+    (ファイル, パターン) のまとまりを二分探索で引き、その位置の配列を添字で読む。
+    並べ替え・絞り込みは行番号の配列（ビュー）を作り直すだけなので、build_view を
+    UI スレッドの外で呼び、できたビューを set_view で差し替える。
+    行番号と前後の文字列 (context) は、表示する行の分だけファイルを読んで求める。
+    line_indexes（改行の索引）があれば、一致のある行だけを seek して読む。
+    """
+    # 一致の前後に見せる文字数
+    CONTEXT = 40
+    # 求めた (行, 前後の文字列) を覚えておく件数
+    CONTEXT_CACHE = 10000
+
+    def __init__(self, results: dict, file_repo: Optional[FileRepository] = None,
+                 line_indexes: Optional[LineIndexUseCase] = None):
+        self.file_repo = file_repo
+        self.line_indexes = line_indexes
+        # (ファイル, パターン, 位置の配列, 距離の配列, 件数)。位置を持たない結果（件数だけ）は1行にまとめる
+        self.groups = []
+        self.starts = array("q")  # まとまりごとの先頭の行番号
+        total = 0
+        for file, data in results.items():
+            r = data["result"]
+            for p, c in r.counts.items():
+                if not c:
+                    continue
+                positions = r.positions.get(p) or None
+                self.groups.append((file, p, positions, r.distances.get(p) or None, c))
+                self.starts.append(total)
+                total += len(positions) if positions else 1
+        self.total = total
+        self.view = None  # None なら全行を元の順で
+        self._flat = {}  # 並べ替えのキー（位置・距離）を行番号の順に並べた配列
+        self._context = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.total if self.view is None else len(self.view)
+
+    def row(self, i: int) -> tuple:
+        """
+        表示順で i 番目の行 (ファイル, パターン, 位置, 距離, 件数)。
+        一致の行の件数は None、件数だけの行は位置・距離が None。
+        """
+        return self._row(i if self.view is None else self.view[i])
+
+    def rows(self, start: int, stop: int) -> list[tuple]:
+        return [self.row(i) for i in range(max(start, 0), min(stop, len(self)))]
+
+    def _row(self, rid):
+        g = bisect_right(self.starts, rid) - 1
+        file, p, positions, distances, count = self.groups[g]
+        if positions is None:
+            return file, p, None, None, count
+        k = rid - self.starts[g]
+        return file, p, positions[k], distances[k] if distances else None, None
+
+    def _range(self, g):
+        end = self.starts[g + 1] if g + 1 < len(self.groups) else self.total
+        return self.starts[g], end
+
+    # ---- 並べ替え・絞り込み -------------------------------------------------
+
+    def build_view(self, sort_key: str = None, reverse: bool = False, text: str = "") -> Optional[array]:
+        """
+        text（ファイル名かパターンの一部、大文字小文字は区別しない）で絞り込み、sort_key で並べた
+        行番号の配列を返す（どちらも無ければ None）。時間がかかるので UI スレッドの外で呼ぶ。
+        """
+        text = text.strip().lower()
+        groups = [
+            g for g, (file, p, *_) in enumerate(self.groups)
+            if not text or text in file.lower() or text in p.lower()
+        ]
+        if sort_key is None and not text:
+            return None
+
+        if sort_key in ("position", "distance"):
+            ids = array("q")
+            for g in groups:
+                ids.extend(range(*self._range(g)))
+            return array("q", sorted(ids, key=self._flat_keys(sort_key).__getitem__, reverse=reverse))
+
+        # ファイル・パターンの順は、まとまりを並べ替えるだけで済む（まとまりの中は位置の昇順のまま）
+        if sort_key == "file":
+            groups.sort(key=lambda g: (self.groups[g][0], self.groups[g][1]), reverse=reverse)
+        elif sort_key == "pattern":
+            groups.sort(key=lambda g: (self.groups[g][1], self.groups[g][0]), reverse=reverse)
+        ids = array("q")
+        for g in groups:
+            start, end = self._range(g)
+            ids.extend(range(end - 1, start - 1, -1) if reverse else range(start, end))
+        return ids
+
+    def _flat_keys(self, sort_key):
+        """位置（または距離）を行番号の順に並べた配列。無い行は -1。"""
+        keys = self._flat.get(sort_key)
+        if keys is None:
+            keys = array("q")
+            for file, p, positions, distances, count in self.groups:
+                values = positions if sort_key == "position" else distances
+                if values:
+                    keys.extend(values if values.typecode == "q" else array("q", values))
+                else:
+                    keys.extend([-1] * (len(positions) if positions else 1))
+            self._flat[sort_key] = keys
+        return keys
+
+    def set_view(self, view: Optional[array]):
+        self.view = view
+
+    # ---- 行番号と前後の文字列 ---------------------------------------------
+
+    def get_context(self, file: str, position: int) -> Optional[tuple]:
+        """求め済みなら (行番号, 前後の文字列)、まだなら None。"""
+        with self._lock:
+            return self._context.get((file, position))
+
+    def load_context(self, rows: list[tuple]):
+        """rows（row の戻り値）のうち、まだ求めていない一致の行番号と前後の文字列をファイルから求める。"""
+        wanted = {}
+        for file, p, position, *_ in rows:
+            if position is not None and self.get_context(file, position) is None:
+                wanted.setdefault(file, set()).add(position)
+
+        for file, positions in wanted.items():
+            try:
+                found = None
+                if self.line_indexes:
+                    found = self.line_indexes.context(file, positions, self.CONTEXT)
+                if found is None:
+                    # 索引が使えない（圧縮ファイルなど）ので、先頭から読む
+                    found = self._scan_context(file, sorted(positions))
+            except (OSError, ValueError) as e:
+                print(f"[WARN] 前後の文字列を読めません: {file} ({e})")
+                found = {}
+            with self._lock:
+                for position in positions:
+                    self._context[(file, position)] = found.get(position, (None, ""))
+                while len(self._context) > self.CONTEXT_CACHE:
+                    self._context.popitem(last=False)
+
+    def _scan_context(self, file, positions):
+        """ファイルを先頭から1回読み、昇順の positions それぞれの (行番号, 前後の文字列) を返す。"""
+        width = self.CONTEXT
+        found = {}
+        targets = iter(positions)
+        target = next(targets, None)
+        buf = ""
+        buf_start = 0  # buf の先頭の文字位置
+        lines = 0      # buf より前にある改行の数
+
+        for chunk in self.file_repo.read_chunks(file):
+            # 前のチャンクの末尾は、次のチャンクの先頭にある一致の「前」の文字列として残す
+            keep = len(buf) - min(len(buf), 2 * width)
+            lines += buf.count("\n", 0, keep)
+            buf_start += keep
+            buf = buf[keep:] + chunk
+            # 一致の後ろ width 文字までが buf に揃ったものから求める
+            while target is not None and target + width <= buf_start + len(buf):
+                found[target] = self._snippet(buf, target - buf_start, lines)
+                target = next(targets, None)
+            if target is None:
+                break
+
+        while target is not None and target - buf_start < len(buf):
+            found[target] = self._snippet(buf, target - buf_start, lines)
+            target = next(targets, None)
+        return found
+
+    def _snippet(self, buf, k, lines):
+        width = self.CONTEXT
+        line = lines + buf.count("\n", 0, k) + 1
+        start = buf.rfind("\n", max(k - width, 0), k) + 1 or max(k - width, 0)
+        end = buf.find("\n", k, k + width)
+        if end == -1:
+            end = min(k + width, len(buf))
+        return line, buf[start:end].replace("\t", " ")
+
+    @staticmethod
+    def display_name(file: str) -> str:
+        # アーカイブのメンバーは "bundle.zip!/var/log/app.log" の形のまま、ふつうのファイルは名前だけ
+        return file if "!/" in file else os.path.basename(file)
@@ -0,0 +1,117 @@
+"""
+エンジンの速さを、生成したコーパスで測るベンチマーク。
+
+    python programs/bench.py -o before.json
+    python programs/bench.py -e bm,native,ac -c syslog,json -s 1M,16M -k 1,100,10000 -l 8,32
+    python programs/bench.py -o after.json --compare before.json   # 遅くなった組み合わせがあれば終了コード 1
+
+結果は JSON（実行環境・設定と、組み合わせごとの中央値 / p95 / 最小値 / MB/s / メモリのピーク / 一致件数）。
+-o を省くと標準出力へ書き出す。進捗は標準エラー出力に1組み合わせ1行で表示する。
+"""
+import argparse
+import json
+import sys
+
+from cli import ALGORITHMS, build_controller
+from use_cases.benchmark_corpora import CORPORA
+
+# auto はエンジンを選ぶだけなので測らない
+ENGINES = [key for key in ALGORITHMS if key != "auto"]
+
+UNITS = {"K": 1024, "M": 1024 * 1024, "G": 1024 * 1024 * 1024}
+
+
+def parse_size(text):
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def parse_list(text, convert=str):
+    return [convert(item) for item in text.split(",") if item.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="String Search benchmark")
+    parser.add_argument("-e", "--engines", default="naive,bm,kmp,ac,native,vector,bitap",
+                        help=f"測るエンジン（カンマ区切り: {','.join(ENGINES)}）")
+    parser.add_argument("-c", "--corpora", default="syslog,json,japanese,adversarial",
+                        help=f"コーパス（カンマ区切り: {','.join(CORPORA)}）")
+    parser.add_argument("-s", "--sizes", default="1M", help="コーパスの大きさ（文字数。K / M / G 可。カンマ区切り）")
+    parser.add_argument("-k", "--patterns", default="1,10,100", help="検索ワードの数（カンマ区切り）")
+    parser.add_argument("-l", "--lengths", default="8", help="検索ワードの長さ（カンマ区切り）")
+    parser.add_argument("-d", "--distances", default="1", help="Bitap の距離（カンマ区切り）")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="測る回数（中央値・p95 をとる）")
+    parser.add_argument("-w", "--warmup", type=int, default=1, help="測る前の空回しの回数")
+    parser.add_argument("--seed", type=int, default=0, help="コーパスと検索ワードの乱数の種")
+    parser.add_argument("--budget", type=float, default=10.0, help="1回がこの秒数を超える組み合わせは飛ばす")
+    parser.add_argument("-o", "--output", help="結果の JSON を書き出すファイル")
+    parser.add_argument("--compare", help="比べる前回の結果の JSON。遅くなった・件数が変わった組み合わせを表示する")
+    parser.add_argument("--threshold", type=float, default=0.1, help="--compare で遅くなったとみなす割合")
+    args = parser.parse_args(argv)
+
+    for engine in parse_list(args.engines):
+        if engine not in ENGINES:
+            parser.error(f"不明なエンジンです: {engine}")
+    for corpus in parse_list(args.corpora):
+        if corpus not in CORPORA:
+            parser.error(f"不明なコーパスです: {corpus}")
+    return args
+
+
+def show_case(case):
+    label = f"{case['engine']:<7}{case['corpus']:<12}{case['size']:>11,} k={case['patterns']:<6}m={case['length']:<4}"
+    if case["distance"] is not None:
+        label += f"d={case['distance']} "
+    if "skipped" in case:
+        print(f"{label} 飛ばしました ({case['times_ms'][0]:.0f} ms)", file=sys.stderr)
+    else:
+        print(f"{label} {case['median_ms']:10.2f} ms  p95 {case['p95_ms']:10.2f} ms  {case['mb_per_s']:8.1f} MB/s  "
+              f"{case['peak_bytes'] / (1024 * 1024):7.1f} MB  hits={case['hits']}", file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    controller = build_controller(use_cache=False)
+
+    report = controller.run_benchmark_suite(
+        engines=parse_list(args.engines),
+        corpora=parse_list(args.corpora),
+        sizes=parse_list(args.sizes, parse_size),
+        pattern_counts=parse_list(args.patterns, int),
+        lengths=parse_list(args.lengths, int),
+        distances=parse_list(args.distances, int),
+        repeat=args.repeat,
+        warmup=args.warmup,
+        seed=args.seed,
+        budget=args.budget,
+        on_case=show_case
+    )
+
+    text = json.dumps(report, ensure_ascii=False, indent=1)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        from use_cases.benchmark import compare_runs
+
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        changes = compare_runs(baseline, report, args.threshold)
+        for change in changes:
+            if change["kind"] == "hits":
+                detail = f"一致件数 {change['before']} -> {change['after']}"
+            else:
+                detail = f"{change['before']:.2f} ms -> {change['after']:.2f} ms (x{change['ratio']:.2f})"
+            print(f"[{change['kind']}] {change['engine']} {change['corpus']} {change['size']:,} "
+                  f"k={change['patterns']} m={change['length']}: {detail}", file=sys.stderr)
+        return 1 if changes else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
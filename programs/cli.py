@@ -0,0 +1,192 @@
+"""
+GUI を使わずに検索するコマンドライン版。
+
+    python programs/cli.py -p ERROR -p timeout -r /var/log/app
+    python programs/cli.py -f words.csv -a bitap -d 1 "logs/*.log" > hits.jsonl
+    python programs/cli.py -p ERROR -o hits.xlsx /var/log/app.log
+
+一致は見つかった順に JSON Lines で標準出力へ書き出す（-o を指定したらそのファイルへ）。
+tkinter / ttkbootstrap などの GUI 側の依存は読み込まない（openpyxl / pyarrow は -o で使うときだけ）。
+"""
+import argparse
+import csv
+import glob
+import os
+import sys
+
+ALGORITHMS = ["naive", "bm", "kmp", "ac", "native", "vector", "bitap", "auto"]
+MODES = ["all", "count", "exists", "first_n"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="String Search (headless)")
+    parser.add_argument("paths", nargs="+", help="検索対象のファイル・ディレクトリ・glob")
+    parser.add_argument("-p", "--pattern", action="append", default=[], help="検索ワード（複数指定可）")
+    parser.add_argument("-f", "--pattern-file", action="append", default=[],
+                        help="検索ワードの CSV（1列目を使う。GUI の「CSV から読み込み」と同じ形式）")
+    parser.add_argument("-a", "--algorithm", choices=ALGORITHMS, default="bm",
+                        help="auto はファイルごとに速そうなエンジンを選ぶ（Bitap 以外）")
+    parser.add_argument("-d", "--distance", type=int, default=2, help="レーベンシュタイン距離 (Bitapのみ)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="ディレクトリを再帰的にたどる")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="並列プロセス数（0 で CPU 数）")
+    parser.add_argument("-m", "--mode", choices=MODES, default="all",
+                        help="count: 件数だけ / exists: 1件見つかったらそのファイルは打ち切る / first_n: 先頭 N 件まで")
+    parser.add_argument("-n", "--first-n", type=int, default=1, help="first_n モードで報告する件数（パターンごと）")
+    parser.add_argument("--pipeline", action="store_true", help="読み込み・デコード・走査を重ねて行う（-j 1 のとき）")
+    parser.add_argument("--pipeline-mode", choices=["thread", "process"],
+                        help="--pipeline の走査をスレッドで行うか別プロセスで行うか（既定は thread。指定すると --pipeline も付く）")
+    parser.add_argument("-o", "--output",
+                        help="結果を書き出すファイル（拡張子で形式を選ぶ: .csv / .xlsx / .jsonl / .parquet / .arrow）")
+    parser.add_argument("--progress", action="store_true", help="進捗（%%・MB/s・残り時間）を標準エラー出力に表示する")
+    parser.add_argument("--no-cache", action="store_true", help="アルゴリズム・検索結果のキャッシュを使わない")
+    parser.add_argument("--lines", action="store_true", help="一致ごとに行と桁（1 始まり）も書き出す")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="段ごとの時間（読み込み・デコード・走査・書き出しなど）とエンジンごとのカウンタを JSON で書き出す")
+    parser.add_argument("--profile", type=int, default=0, metavar="N",
+                        help="N ファイルに1つを cProfile で測り、--metrics の JSON に関数ごとの時間を入れる")
+    args = parser.parse_args(argv)
+    if args.first_n < 1:
+        parser.error("--first-n には 1 以上を指定してください")
+    if args.profile and not args.metrics:
+        parser.error("--profile には --metrics も指定してください")
+    return args
+
+
+def load_patterns(args):
+    patterns = [p for p in args.pattern if p]
+    for path in args.pattern_file:
+        with open(path, "r", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if not row: continue
+                word = row[0].strip()
+                if word:
+                    patterns.append(word)
+    return patterns
+
+
+def expand_paths(paths, recursive):
+    files = []
+    for path in paths:
+        matches = sorted(glob.glob(path, recursive=recursive)) if glob.has_magic(path) else [path]
+        for match in matches:
+            if os.path.isdir(match):
+                if recursive:
+                    for root, dirs, names in os.walk(match):
+                        dirs.sort()
+                        files.extend(os.path.join(root, name) for name in sorted(names))
+                else:
+                    files.extend(
+                        os.path.join(match, name) for name in sorted(os.listdir(match))
+                        if os.path.isfile(os.path.join(match, name))
+                    )
+            elif os.path.isfile(match) or os.path.isfile(match.split("!/", 1)[0]):
+                # "bundle.zip!/var/log/app.log" のようにアーカイブ内の1ファイルも指定できる
+                files.append(match)
+            else:
+                print(f"見つかりません: {match}", file=sys.stderr)
+    return list(dict.fromkeys(files))
+
+
+def build_controller(use_cache, lines=False):
+    from infrastructure.external.file_repository import LocalFileRepository
+    from use_cases.line_index import LineIndexUseCase
+    from use_cases.search_files import SearchFilesUseCase
+    from use_cases.benchmark import BenchmarkUseCase
+    from use_cases.estimation import EstimationUseCase
+    from use_cases.cost_model import CostModel
+    from use_cases.parallel_search import ParallelSearchUseCase
+    from use_cases.pipeline_search import PipelineSearchUseCase
+    from adapters.controllers.search_controller import SearchController
+
+    algorithm_cache = result_store = cost_model_store = calibration_store = line_index_store = None
+    if use_cache:
+        from infrastructure.external.algorithm_cache import FileAlgorithmCache
+        from infrastructure.external.result_store import FileResultStore
+        from infrastructure.external.cost_model_store import FileCostModelStore
+        from infrastructure.external.calibration_store import FileCalibrationStore
+        from infrastructure.external.line_index_store import FileLineIndexStore
+        algorithm_cache = FileAlgorithmCache()
+        result_store = FileResultStore()
+        cost_model_store = FileCostModelStore()
+        calibration_store = FileCalibrationStore()
+        line_index_store = FileLineIndexStore()
+
+    file_repo = LocalFileRepository()
+    # 行と桁を書き出すときだけ、走査しながら改行の索引を作る
+    line_indexes = LineIndexUseCase(file_repo, line_index_store) if lines else None
+    search_use_case = SearchFilesUseCase(file_repo, result_store, line_indexes)
+    return SearchController(
+        search_use_case, BenchmarkUseCase(), EstimationUseCase(file_repo, CostModel(cost_model_store)),
+        ParallelSearchUseCase(search_use_case), algorithm_cache, PipelineSearchUseCase(search_use_case), calibration_store
+    )
+
+
+def show_progress(snapshot):
+    # 同じ行を書き換える
+    print(f"\r{snapshot.format():<40}", end="", file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    patterns = load_patterns(args)
+    if not patterns:
+        print("検索ワードを指定してください (-p / -f)", file=sys.stderr)
+        return 2
+
+    files = expand_paths(args.paths, args.recursive)
+    if not files:
+        print("検索対象のファイルがありません", file=sys.stderr)
+        return 2
+
+    from infrastructure.external.file_exporter import FileExporter, JsonLinesExporter
+    from use_cases.progress import ProgressChannel
+    from use_cases.metrics import SearchMetrics, NO_METRICS
+
+    controller = build_controller(not args.no_cache, args.lines)
+    line_indexes = controller.search_use_case.line_indexes
+    try:
+        writer = (FileExporter.open(args.output, line_index=line_indexes) if args.output
+                  else JsonLinesExporter(sys.stdout, line_indexes))
+    except (ValueError, ImportError) as e:
+        print(f"出力ファイルを開けません: {e}", file=sys.stderr)
+        return 2
+
+    progress = ProgressChannel(show_progress) if args.progress else None
+    metrics = SearchMetrics(profile_every=args.profile) if args.metrics else NO_METRICS
+    try:
+        results = controller.run_search(
+            files,
+            args.algorithm,
+            patterns,
+            args.distance,
+            progress_callback=progress,
+            workers=args.workers or None,
+            result_callback=metrics.timed("export", writer.write_matches),
+            result_mode=args.mode,
+            first_n=args.first_n,
+            pipeline=args.pipeline_mode or ("thread" if args.pipeline else None),
+            metrics=metrics
+        )
+        with metrics.stage("export"):
+            for path, data in results.items():
+                writer.write_summary(path, data)
+    except BrokenPipeError:
+        # head などで出力が途中で閉じられた。終了時の flush で再び失敗しないようにする
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        with metrics.stage("export"):
+            writer.close()
+        if progress:
+            progress.close()
+            print(file=sys.stderr)
+        if args.metrics:
+            metrics.dump(args.metrics)
+
+    # count モードでは一致の行を出さないので、集計の件数で判定する
+    found = any(sum(data["result"].counts.values()) for data in results.values())
+    return 0 if found else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
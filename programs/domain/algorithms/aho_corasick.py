@@ -1,9 +1,13 @@
 from domain.interfaces.search_algorithm import SearchAlgorithm
 from domain.models.search_result import SearchResult
+from domain.models.result_mode import ResultMode
 from collections import deque, defaultdict
 
 
 class AhoCorasickSearch(SearchAlgorithm):
+    bytes_native = True
+    stream_fields = ("state",)
+
     def __init__(self, patterns):
         """
         patterns: list[str]
@@ -58,7 +62,19 @@ class AhoCorasickSearch(SearchAlgorithm):
                 # 出力の継承
                 self.out[s].extend(self.out[self.fail[s]])
 
-    def search(self, text: str) -> SearchResult:
+    def get_patterns(self) -> list[str]:
+        return list(self.patterns)
+
+    def build_encoded(self, encoding: str):
+        labels = {}
+        for pattern in self.patterns:
+            try:
+                labels[pattern.encode(encoding)] = pattern
+            except UnicodeEncodeError:
+                pass  # このエンコーディングでは出現し得ないパターン
+        return AhoCorasickSearch(list(labels)), labels
+
+    def search(self, text: str, mode: ResultMode = None) -> SearchResult:
         state = 0
         counts = defaultdict(int)
         positions = defaultdict(list)
@@ -73,9 +89,13 @@ class AhoCorasickSearch(SearchAlgorithm):
                 counts[pattern] += 1
                 positions[pattern].append(i - len(pattern) + 1)
 
-        return SearchResult(dict(counts), dict(positions))
+        return self.fill_counts(SearchResult(dict(counts), dict(positions)))
     
-    def search_chunk(self, text: str, offset: int = 0) -> SearchResult:
+    def reset(self):
+        super().reset()
+        self.state = 0
+
+    def search_chunk(self, text: str, offset: int = 0, mode: ResultMode = None) -> SearchResult:
         counts = defaultdict(int)
         positions = defaultdict(list) 
         for i, char in enumerate(text): 
@@ -85,4 +105,4 @@ class AhoCorasickSearch(SearchAlgorithm):
             for pattern in self.out[self.state]: 
                 counts[pattern] += 1 
                 positions[pattern].append(offset + i - len(pattern) + 1) 
-        return SearchResult(dict(counts), dict(positions))
+        return self.fill_counts(SearchResult(dict(counts), dict(positions)))
@@ -0,0 +1,253 @@
+from array import array
+from bisect import bisect_left
+from collections import deque
+from domain.interfaces.search_algorithm import SearchAlgorithm
+from domain.models.search_result import SearchResult
+from domain.models.result_mode import ResultMode
+
+
+class _SparseDelta(dict):
+    """
+    文字の種類が多いときの遷移表。Trie の辺は状態ごとの行として配列に持つ
+    （offsets[state]:offsets[state + 1] の範囲に、文字クラスの昇順の labels と遷移先の targets）。
+    引き方は配列の遷移表と同じ delta[state * sigma + class]。dict の部分は引いた遷移を memo_limit 件まで覚えるキャッシュで、
+    無ければ行を二分探索し、辺が無ければ失敗遷移をたどって求める。
+    """
+
+    def __init__(self, sigma: int, fail: array, goto: list, memo_limit: int):
+        super().__init__()
+        self.sigma = sigma
+        self.fail = fail
+        self.memo_limit = memo_limit
+        self.offsets = array("i", [0])
+        self.labels = array("i")
+        self.targets = array("i")
+        for edges in goto:
+            for c in sorted(edges):
+                self.labels.append(c)
+                self.targets.append(edges[c])
+            self.offsets.append(len(self.labels))
+
+    def __missing__(self, key):
+        sigma = self.sigma
+        state, c = divmod(key, sigma)
+        target = 0
+        # 辺のある最初の状態（自身か、失敗遷移の先）の遷移先を使う。根にも無ければ根へ
+        while True:
+            lo, hi = self.offsets[state], self.offsets[state + 1]
+            i = bisect_left(self.labels, c, lo, hi)
+            if i < hi and self.labels[i] == c:
+                target = self.targets[i]
+                break
+            if state == 0:
+                break
+            state = self.fail[state]
+            found = self.get(state * sigma + c)
+            if found is not None:
+                target = found
+                break
+        if len(self) < self.memo_limit:
+            self[key] = target
+        return target
+
+
+class CompactAhoCorasickSearch(SearchAlgorithm):
+    """
+    配列で表現した Aho–Corasick オートマトン。
+
+    - 文字はパターンに現れるものだけに番号 (1..sigma-1) を振り直し、それ以外は 0 にまとめる
+    - 失敗遷移は構築時に展開して完全な DFA (delta[state * sigma + class]) にする。
+      状態数 × sigma が DENSE_LIMIT を超える（CJK のパターンが多いなど）ときは、Trie の辺を配列の行にし、
+      失敗遷移をたどって引く _SparseDelta にする
+    - 出力はリストをコピーせず、出力を持つ最も長い接尾辞状態へのリンク (dictionary suffix link) でたどる
+    - 文字列用のオートマトンは初めて文字列を走査するときに作る（バイト列だけを走査するなら作らない）
+    """
+    bytes_native = True
+    stream_fields = ("state",)
+    # 完全な DFA の遷移表をこの要素数 (int32) まで配列で持つ
+    DENSE_LIMIT = 1 << 22
+    # _SparseDelta が覚えておく遷移の数（よく引かれる浅い状態の遷移を二分探索せずに引く）
+    SPARSE_MEMO = 1 << 16
+
+    def __init__(self, patterns):
+        """
+        patterns: list[str]
+        """
+        super().__init__(pattern="")
+        self.patterns = patterns
+        self.state = 0
+        self.name = "Aho–Corasick (Multi Pattern)"
+        # 重複と空文字列は除く（同じパターンは1度だけ報告する）
+        self.keys = [p for p in dict.fromkeys(patterns) if len(p) > 0]
+        self.lengths = array("i", (len(p) for p in self.keys))
+        self.delta = None
+
+    def get_description(self):
+        return ( "Aho–Corasickアルゴリズムは複数パターンを同時に検索できる手法で、Trie構造と失敗遷移（Fail-Link）を用いてテキストを一度走査するだけですべてのパターンを高速に検出できます。"
+                 "この実装では失敗遷移をあらかじめ展開した遷移表を配列で持つので、1文字あたり表を1回引くだけで済みます。^^" )
+
+    def get_patterns(self) -> list[str]:
+        return list(self.patterns)
+
+    def build_automaton(self):
+        # 1. 文字クラスの振り直し
+        self.classes = {}
+        for pattern in self.keys:
+            for char in pattern:
+                if char not in self.classes:
+                    self.classes[char] = len(self.classes) + 1
+        sigma = self.sigma = len(self.classes) + 1
+
+        # 2. Trie の構築（構築時のみ dict を使い、後で配列に畳み込む）
+        goto = [{}]
+        out_id = array("i", [-1])
+        for k, pattern in enumerate(self.keys):
+            state = 0
+            for char in pattern:
+                c = self.classes[char]
+                if c not in goto[state]:
+                    goto.append({})
+                    out_id.append(-1)
+                    goto[state][c] = len(goto) - 1
+                state = goto[state][c]
+            out_id[state] = k
+
+        n = len(goto)
+        fail = array("i", bytes(4 * n))
+        link = array("i", [-1]) * n      # 出力を持つ最長の真の接尾辞状態
+        report = array("i", [-1]) * n    # 最初に報告すべき状態（自身か link）
+        dense = n * sigma <= self.DENSE_LIMIT
+        if dense:
+            delta = array("i", bytes(4 * n * sigma))
+        else:
+            delta = _SparseDelta(sigma, fail, goto, self.SPARSE_MEMO)
+
+        # 3. BFS で fail を求めながら遷移表を埋める（密な表は完全な DFA の行をコピーする。疎な表は辺を持ち済み）
+        queue = deque()
+        for c, s in goto[0].items():
+            if dense:
+                delta[c] = s
+            queue.append(s)
+
+        while queue:
+            r = queue.popleft()
+            f = fail[r]
+            base = r * sigma
+            if dense:
+                delta[base:base + sigma] = delta[f * sigma:f * sigma + sigma]
+            link[r] = f if out_id[f] >= 0 else link[f]
+            report[r] = r if out_id[r] >= 0 else link[r]
+
+            for c, s in goto[r].items():
+                fail[s] = delta[f * sigma + c]
+                if dense:
+                    delta[base + c] = s
+                queue.append(s)
+
+        self.delta = delta
+        self.out_id = out_id
+        self.link = link
+        self.report = report
+
+    def build_encoded(self, encoding: str):
+        labels = {}
+        for pattern in self.patterns:
+            try:
+                labels[pattern.encode(encoding)] = pattern
+            except UnicodeEncodeError:
+                pass  # このエンコーディングでは出現し得ないパターン
+        # バイト列用は prepare で先に作ってキャッシュに入れられるよう、ここで構築する
+        searcher = CompactAhoCorasickSearch(list(labels))
+        searcher.build_automaton()
+        return searcher, labels
+
+    def search(self, text: str, mode: ResultMode = None) -> SearchResult:
+        counts = [0] * len(self.keys)
+        positions = self._positions(mode)
+        self._scan(text, 0, 0, counts, positions, mode)
+        if self.stats is not None:
+            self.record_stats(ac_chars=len(text))
+        return self._result(counts, positions)
+
+    def reset(self):
+        super().reset()
+        self.state = 0
+
+    def search_chunk(self, text: str, offset: int = 0, mode: ResultMode = None) -> SearchResult:
+        counts = [0] * len(self.keys)
+        positions = self._positions(mode)
+        self.state = self._scan(text, self.state, offset, counts, positions, mode)
+        if self.stats is not None:
+            self.record_stats(ac_chars=len(text))
+        return self._result(counts, positions)
+
+    def _positions(self, mode):
+        # count モードでは位置を記録しない
+        if mode and mode.limit == 0:
+            return None
+        return [array("q") for _ in self.keys]
+
+    def _scan(self, text, state, offset, counts, positions, mode=None):
+        if self.delta is None:
+            self.build_automaton()
+        if mode and mode.quota:
+            return self._scan_quota(text, state, offset, counts, positions, mode.quota, mode.stop_any)
+
+        delta = self.delta
+        sigma = self.sigma
+        get_class = self.classes.get
+        report = self.report
+        link = self.link
+        out_id = self.out_id
+        lengths = self.lengths
+
+        for i, char in enumerate(text):
+            state = delta[state * sigma + get_class(char, 0)]
+            s = report[state]
+            while s >= 0:
+                k = out_id[s]
+                counts[k] += 1
+                if positions is not None:
+                    positions[k].append(offset + i - lengths[k] + 1)
+                s = link[s]
+
+        return state
+
+    def _scan_quota(self, text, state, offset, counts, positions, quota, stop_any):
+        """
+        パターンごとに quota 件まで数える。stop_any なら最初の1パターンが、
+        そうでなければ全パターンが quota に達した時点で走査をやめる。
+        """
+        delta = self.delta
+        sigma = self.sigma
+        get_class = self.classes.get
+        report = self.report
+        link = self.link
+        out_id = self.out_id
+        lengths = self.lengths
+        remaining = len(self.keys)
+
+        for i, char in enumerate(text):
+            state = delta[state * sigma + get_class(char, 0)]
+            s = report[state]
+            while s >= 0:
+                k = out_id[s]
+                s = link[s]
+                if counts[k] == quota:
+                    continue
+                counts[k] += 1
+                if positions is not None:
+                    positions[k].append(offset + i - lengths[k] + 1)
+                if counts[k] == quota:
+                    remaining -= 1
+                    if stop_any or remaining == 0:
+                        return state
+
+        return state
+
+    def _result(self, counts, positions) -> SearchResult:
+        # 件数は一致の無いパターンも 0 で返す（位置は一致のあったパターンだけ）
+        return SearchResult(
+            dict(zip(self.keys, counts)),
+            {self.keys[k]: positions[k] for k, c in enumerate(counts) if c} if positions is not None else {}
+        )
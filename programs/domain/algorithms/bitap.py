@@ -1,12 +1,25 @@
 from domain.interfaces.search_algorithm import SearchAlgorithm
 from domain.models.search_result import SearchResult
-from domain.utils import levenshtein
+from domain.models.result_mode import ResultMode
 
 class BitapSearch(SearchAlgorithm):
+    """
+    Myers のビットベクトル法によるあいまい検索（Bitap の編集距離版）。
+
+    - 各終端位置での最小編集距離を、列の差分ビットベクトル (Pv/Mv) から直接求める
+    - 距離が下がって上がるまでを1つの一致とみなし、最小距離の終端だけを報告する
+    - 開始位置は、その終端から反転パターンで m + d 文字だけ逆向きに走査して求める
+    - ビットベクトルは Python の int なので、パターン長がワード長を超えてもそのまま扱える
+    """
+    stream_fields = SearchAlgorithm.stream_fields + ("_vectors", "_pending")
+
     def __init__(self, pattern: str, max_distance: int = 2):
         super().__init__(pattern)
         self.max_distance = max_distance
         self.name = f"Bitap (d={max_distance})"
+        self.mask = self._peq(pattern)
+        self.reverse_mask = self._peq(pattern[::-1])
+        self.reset()
 
     def get_description(self):
         return (
@@ -16,68 +29,137 @@ class BitapSearch(SearchAlgorithm):
             "レーベンシュタイン距離がわかりにくかったら「何文字まで変わっててもセーフか」みたいな感覚でOK^^"
         )
 
-    def search(self, text: str) -> SearchResult:
+    @staticmethod
+    def _peq(pattern):
+        peq = {}
+        for i, c in enumerate(pattern):
+            peq[c] = peq.get(c, 0) | (1 << i)
+        return peq
+
+    def get_signature(self) -> str:
+        return repr((type(self).__name__, self.pattern, self.max_distance))
+
+    def reset(self):
+        super().reset()
+        # チャンク間で持ち越す状態: (Pv, Mv, 現在の距離, 直前の距離) と、報告を保留中の一致
+        m = len(self.pattern)
+        self._vectors = ((1 << m) - 1, 0, m, m)
+        self._pending = None
+
+    def search(self, text: str, mode: ResultMode = None) -> SearchResult:
+        m = len(self.pattern)
+        if m == 0:
+            return SearchResult({"": 0}, {"": []})
+
+        quota = mode.quota if mode else None
+        matches, _, pending = self._scan(text, 0, 0, ((1 << m) - 1, 0, m, m), None, quota)
+        if pending and len(matches) != quota:
+            matches.append(pending)
+        return self._result(matches)
+
+    def search_chunk(self, text: str, offset: int = 0, mode: ResultMode = None) -> SearchResult:
         m = len(self.pattern)
         if m == 0:
             return SearchResult({"": 0}, {"": []})
 
-        mask = {}
-        for i, c in enumerate(self.pattern):
-            mask[c] = mask.get(c, 0) | (1 << i)
+        # 開始位置の逆向き走査 (最大 m + d 文字) が前のチャンクにはみ出す分を持ち越す
+        buf = self._tail + text
+        base = offset - len(self._tail)
+        matches, self._vectors, self._pending = self._scan(
+            buf, len(self._tail), base, self._vectors, self._pending, mode.quota if mode else None
+        )
+
+        keep = m + self.max_distance - 1
+        self._tail = buf[-keep:] if keep > 0 else ""
+
+        return self._result(matches)
 
-        BITMASK = (1 << m) - 1
-        R = [0] * (self.max_distance + 1)
+    def finish(self) -> SearchResult:
+        matches = [self._pending] if self._pending else []
+        self._pending = None
+        return self._result(matches)
+
+    def _scan(self, text, start: int, base: int, vectors, pending, quota: int = None):
+        """
+        text[start:] を走査し、(確定した一致のリスト, ビットベクトル, 保留中の一致) を返す。
+        一致は (開始位置, 距離)。距離がまだ下がり得る一致は pending として持ち越す。
+        quota 件の一致が確定したらそこで走査をやめる。
+        """
+        m = len(self.pattern)
+        d = self.max_distance
+        peq = self.mask
+        full = (1 << m) - 1
+        high = 1 << (m - 1)
+        Pv, Mv, score, prev = vectors
         matches = []
 
-        for i, c in enumerate(text):
-            char_mask = mask.get(c, 0)
-            old_r0 = R[0]
-            R[0] = ((R[0] << 1) | 1) & char_mask
-            R[0] &= BITMASK
-
-            prev = old_r0
-            for d in range(1, self.max_distance + 1):
-                old_rd = R[d]
-                sub_or_match = ((R[d] << 1) | 1) & char_mask
-                ins = (prev << 1) | 1
-                delete = prev
-
-                R[d] = (sub_or_match | ins | delete) & BITMASK
-                prev = old_rd
-
-            if (R[self.max_distance] & (1 << (m - 1))) != 0:
-                start = i - m + 1 - self.max_distance
-                end = i + 1
-                ws = max(0, start)
-                we = min(len(text), end)
-                window = text[ws:we]
-
-                best_dist = None
-                best_pos = None
-
-                for j in range(0, len(window) - m + 1):
-                    sub = window[j:j + m]
-                    dist = levenshtein(self.pattern, sub)
-
-                    if best_dist is None or dist < best_dist:
-                        best_dist = dist
-                        best_pos = ws + j
-
-                if best_dist is not None and best_dist <= self.max_distance:
-                    matches.append((best_pos, best_dist))
-
-        unique_matches = []
-        seen_pos = set()
-        for pos, dist in matches:
-            if pos not in seen_pos:
-                unique_matches.append((pos, dist))
-                seen_pos.add(pos)
-
-        counts = {self.pattern: len(unique_matches)}
-        positions = {self.pattern: [pos for pos, dist in unique_matches]}
-        distances = {self.pattern: [dist for pos, dist in unique_matches]}
+        for i in range(start, len(text)):
+            Eq = peq.get(text[i], 0)
+            Xv = Eq | Mv
+            Xh = (((Eq & Pv) + Pv) ^ Pv) | Eq
+            Ph = Mv | (~(Xh | Pv) & full)
+            Mh = Pv & Xh
+            if Ph & high:
+                score += 1
+            elif Mh & high:
+                score -= 1
+            Ph = (Ph << 1) & full
+            Mh = (Mh << 1) & full
+            Pv = Mh | (~(Xv | Ph) & full)
+            Mv = Ph & Xv
+
+            # score は text[..i] のどこかで終わる部分文字列とパターンの最小編集距離
+            if pending is not None:
+                if score < pending[1]:
+                    pending = (self._find_start(text, i, score, base), score)
+                elif score > pending[1]:
+                    matches.append(pending)
+                    pending = None
+                    if len(matches) == quota:
+                        break
+            elif score <= d and score < prev:
+                pending = (self._find_start(text, i, score, base), score)
+            prev = score
+
+        return matches, (Pv, Mv, score, prev), pending
+
+    def _find_start(self, text, end: int, dist: int, base: int) -> int:
+        """
+        text[end] で終わり距離 dist となる部分文字列のうち、最も左から始まるものの開始位置。
+        反転したパターンと反転したテキストの編集距離を、同じビットベクトル法で1文字ずつ伸ばして求める。
+        """
+        if self.stats is not None:
+            self.record_stats(bitap_verifications=1)
+        m = len(self.pattern)
+        peq = self.reverse_mask
+        full = (1 << m) - 1
+        high = 1 << (m - 1)
+        Pv, Mv, score = full, 0, m
+        found = end + 1
+
+        for j in range(end, max(end - m - self.max_distance, -1), -1):
+            Eq = peq.get(text[j], 0)
+            Xv = Eq | Mv
+            Xh = (((Eq & Pv) + Pv) ^ Pv) | Eq
+            Ph = Mv | (~(Xh | Pv) & full)
+            Mh = Pv & Xh
+            if Ph & high:
+                score += 1
+            elif Mh & high:
+                score -= 1
+            # 開始位置を固定するので、上端の行は1文字ごとに距離が1増える
+            Ph = ((Ph << 1) | 1) & full
+            Mh = (Mh << 1) & full
+            Pv = Mh | (~(Xv | Ph) & full)
+            Mv = Ph & Xv
+            if score == dist:
+                found = j
+
+        return base + found
+
+    def _result(self, matches) -> SearchResult:
+        counts = {self.pattern: len(matches)}
+        positions = {self.pattern: [pos for pos, dist in matches]}
+        distances = {self.pattern: [dist for pos, dist in matches]}
 
         return SearchResult(counts, positions, distances)
-
-    def search_chunk(self, text: str, offset: int = 0) -> SearchResult:
-        raise NotImplementedError("Bitapはストリーム非対応.")
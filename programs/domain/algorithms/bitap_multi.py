@@ -0,0 +1,184 @@
+from domain.interfaces.search_algorithm import SearchAlgorithm
+from domain.models.search_result import SearchResult
+from domain.models.result_mode import ResultMode
+from domain.algorithms.bitap import BitapSearch
+
+
+class MultiBitapSearch(SearchAlgorithm):
+    """
+    複数パターンのビットベクトルを1つの int に詰めて、1回の走査で全パターンをあいまい検索する。
+
+    - 各パターンは幅 W の区画を1つ使う。短いパターンは下位側を「どの文字にも一致する行」で埋める
+      （この行の距離は常に 0 なので、結果は BitapSearch を1パターンずつ使った場合と同じになる）
+    - 区画をまたぐ桁上がり・シフトはマスクで止める
+    - 各パターンの距離も区画ごとのカウンタとして1つの int (S) に詰め、d 以下の区画をまとめて判定する
+    """
+    stream_fields = SearchAlgorithm.stream_fields + ("_vectors", "_pending")
+
+    def __init__(self, patterns: list[str], max_distance: int = 2):
+        super().__init__(pattern="")
+        self.patterns = patterns
+        self.max_distance = max_distance
+        self.name = f"Bitap (Multi, d={max_distance})"
+        self.build_vectors(patterns)
+        self.reset()
+
+    def get_description(self):
+        return BitapSearch("").get_description()
+
+    def get_patterns(self) -> list[str]:
+        return list(self.patterns)
+
+    def get_signature(self) -> str:
+        return repr((type(self).__name__, self.get_patterns(), self.max_distance))
+
+    def build_vectors(self, patterns):
+        d = self.max_distance
+        self.keys = [p for p in dict.fromkeys(patterns) if len(p) > 0]
+        # 開始位置の復元は1パターン版の逆向き走査を使う
+        self.searchers = [BitapSearch(p, d) for p in self.keys]
+
+        # 区画の最上位ビットを空けたまま距離 (<= W) と d + 1 を表せる幅にする
+        W = self.width = max([3, d + 2] + [len(p) for p in self.keys])
+        n = len(self.keys)
+        self.full = (1 << (W * n)) - 1
+
+        lows = highs = rows = counts = 0
+        peq = {}
+        for k, pattern in enumerate(self.keys):
+            shift = k * W
+            m = len(pattern)
+            lows |= 1 << shift
+            highs |= 1 << (shift + W - 1)
+            rows |= ((1 << m) - 1) << (shift + W - m)
+            counts |= m << shift
+            for i, c in enumerate(pattern):
+                peq[c] = peq.get(c, 0) | (1 << (shift + W - m + i))
+
+        # 埋め草の行はどの文字にも一致させる
+        self.padding = self.full & ~rows
+        self.peq = {c: bits | self.padding for c, bits in peq.items()}
+        self.lows = lows
+        self.highs = highs
+        self.rows = rows
+        self.initial_scores = counts
+        self.limits = (d + 1) * lows
+
+    def enable_stats(self, stats):
+        super().enable_stats(stats)
+        for s in self.searchers:
+            s.enable_stats(stats)
+
+    def reset(self):
+        super().reset()
+        # チャンク間で持ち越す状態: (Pv, Mv, 距離カウンタ S) と、報告を保留中の一致 {区画番号: (開始位置, 距離)}
+        self._vectors = (self.rows, 0, self.initial_scores)
+        self._pending = {}
+
+    def search(self, text: str, mode: ResultMode = None) -> SearchResult:
+        matches, _, pending = self._scan(text, 0, 0, (self.rows, 0, self.initial_scores), {}, mode)
+        for k, match in pending.items():
+            matches.append((k,) + match)
+        return self._result(matches)
+
+    def search_chunk(self, text: str, offset: int = 0, mode: ResultMode = None) -> SearchResult:
+        buf = self._tail + text
+        base = offset - len(self._tail)
+        matches, self._vectors, self._pending = self._scan(
+            buf, len(self._tail), base, self._vectors, dict(self._pending), mode
+        )
+
+        keep = self.width + self.max_distance - 1
+        self._tail = buf[-keep:] if keep > 0 else ""
+
+        return self._result(matches)
+
+    def finish(self) -> SearchResult:
+        matches = [(k,) + match for k, match in self._pending.items()]
+        self._pending = {}
+        return self._result(matches)
+
+    def _scan(self, text, start: int, base: int, vectors, pending, mode: ResultMode = None):
+        """
+        text[start:] を走査し、(確定した一致 [(区画, 開始位置, 距離)], ビットベクトル, 保留中の一致) を返す。
+        一致の区切り方は BitapSearch._scan と同じ。mode の上限に達したら走査をやめる。
+        """
+        W = self.width
+        d = self.max_distance
+        peq = self.peq
+        padding = self.padding
+        full = self.full
+        not_lows = full & ~self.lows
+        highs = self.highs
+        not_highs = full & ~highs
+        limits = self.limits
+        searchers = self.searchers
+        Pv, Mv, S = vectors
+        pending_bits = sum(1 << (k * W + W - 1) for k in pending)
+        matches = []
+        quota = mode.quota if mode else None
+        found = [0] * len(self.keys)
+        remaining = len(self.keys)
+
+        if not self.keys:
+            return matches, vectors, pending
+
+        for i in range(start, len(text)):
+            Eq = peq.get(text[i], padding)
+            Xv = Eq | Mv
+            # 区画の最上位ビットからの桁上がりを止めた加算
+            X = Eq & Pv
+            Xh = ((((X & not_highs) + (Pv & not_highs)) ^ ((X ^ Pv) & highs)) ^ Pv) | Eq
+            Ph = Mv | (full & ~(Xh | Pv))
+            Mh = Pv & Xh
+            up = Ph & highs
+            down = Mh & highs
+            if up or down:
+                S += (up >> (W - 1)) - (down >> (W - 1))
+            Ph = (Ph << 1) & not_lows
+            Mh = (Mh << 1) & not_lows
+            Pv = Mh | (full & ~(Xv | Ph))
+            Mv = Ph & Xv
+
+            # 距離は1文字で ±1 しか変わらないので、下がった区画と保留中の区画だけを見ればよい
+            if not down and not (up & pending_bits):
+                continue
+            # 距離が d 以下の区画: 最上位ビットを立てて d + 1 を引き、借りが出た区画
+            within = (((S | highs) - limits) & highs) ^ highs
+            touched = (down & within) | ((up | down) & pending_bits)
+            while touched:
+                bit = touched & -touched
+                touched ^= bit
+                k = (bit.bit_length() - 1) // W
+                if k in pending:
+                    dist = pending[k][1]
+                    if bit & down:
+                        pending[k] = (searchers[k]._find_start(text, i, dist - 1, base), dist - 1)
+                    else:
+                        matches.append((k,) + pending.pop(k))
+                        pending_bits ^= bit
+                        found[k] += 1
+                        if found[k] == quota:
+                            remaining -= 1
+                            if mode.stop_any or remaining == 0:
+                                # 打ち切るので、まだ距離が確定していない一致は報告しない
+                                return matches, (Pv, Mv, S), {}
+                else:
+                    dist = (S >> (k * W)) & ((1 << W) - 1)
+                    pending[k] = (searchers[k]._find_start(text, i, dist, base), dist)
+                    pending_bits |= bit
+
+        return matches, (Pv, Mv, S), pending
+
+    def _result(self, matches) -> SearchResult:
+        counts = {p: 0 for p in self.patterns}
+        positions = {p: [] for p in self.patterns}
+        distances = {p: [] for p in self.patterns}
+
+        for k, pos, dist in matches:
+            p = self.keys[k]
+            counts[p] += 1
+            positions[p].append(pos)
+            distances[p].append(dist)
+
+        return SearchResult(counts, positions, distances)
@@ -1,11 +1,18 @@
 from domain.interfaces.search_algorithm import SearchAlgorithm
 from domain.models.search_result import SearchResult
+from domain.models.result_mode import ResultMode
 
 class BoyerMooreSearch(SearchAlgorithm):
+    bytes_native = True
+    overlapping = False  # 一致後は m 文字進めるので、一致は重ならない
+    stream_fields = SearchAlgorithm.stream_fields + ("_next",)
+
     def __init__(self, pattern: str):
         super().__init__(pattern)
         self.name = "Boyer–Moore"
         self.bad_char = self.build_bad_char_table(pattern)
+        self.good_suffix = self.build_good_suffix_table(pattern)
+        self._next = 0
     
     def get_description(self):
         return ( "Boyer–Mooreアルゴリズムは高速な文字列探索手法で、後方から比較し、Bad-Character/Good-Suffixルールにより大きくスキップします。長いテキストに対して非常に効率的です。^^" )
@@ -16,26 +23,106 @@ class BoyerMooreSearch(SearchAlgorithm):
             table[c] = i
         return table
 
-    def search(self, text: str) -> SearchResult:
-        positions = []
-        m = len(self.pattern)
-        n = len(text)
+    def build_good_suffix_table(self, pattern):
+        """
+        Good-Suffix 表。pattern[j] で不一致になったら shift[j + 1] だけずらせる。
+        一致済みの接尾辞が pattern 内の別の位置（直前の文字が違うもの）か、pattern の接頭辞と重なる位置まで動かす。
+        """
+        m = len(pattern)
+        shift = [0] * (m + 1)
+        border = [0] * (m + 1)  # border[i]: pattern[i:] の最長の境界（接頭辞かつ接尾辞）の開始位置
+
+        i, j = m, m + 1
+        border[i] = j
+        while i > 0:
+            while j <= m and pattern[i - 1] != pattern[j - 1]:
+                if shift[j] == 0:
+                    shift[j] = j - i
+                j = border[j]
+            i -= 1
+            j -= 1
+            border[i] = j
+
+        j = border[0]
+        for i in range(m + 1):
+            if shift[i] == 0:
+                shift[i] = j
+            if i == j:
+                j = border[j]
+
+        return shift
+
+    def reset(self):
+        super().reset()
+        self._next = 0  # 次に一致を報告してよい最小の位置（一致は重ならない）
+
+    def search(self, text: str, mode: ResultMode = None) -> SearchResult:
+        if len(self.pattern) == 0:
+            return SearchResult({"": 0}, {"": []})
+
+        positions = self.new_positions(mode)
+        count, _ = self._scan(text, 0, positions, mode.quota if mode else None)
+
+        return SearchResult(
+            {self.pattern: count},
+            {self.pattern: positions} if positions is not None else {}
+        )
 
+    def search_chunk(self, text: str, offset: int = 0, mode: ResultMode = None) -> SearchResult:
+        m = len(self.pattern)
         if m == 0:
             return SearchResult({"": 0}, {"": []})
 
-        i = 0
+        # 末尾 m-1 文字を持ち越し、前回の一致の続きから走査を再開する
+        buf = self._tail + text
+        base = offset - len(self._tail)
+        positions = self.new_positions(mode)
+        count, end = self._scan(buf, max(self._next - base, 0), positions, mode.quota if mode else None)
+
+        if count:
+            self._next = base + end
+        self._tail = buf[-(m - 1):] if m > 1 else ""
+
+        return SearchResult(
+            {self.pattern: count},
+            {self.pattern: [base + i for i in positions]} if positions is not None else {}
+        )
+
+    def _scan(self, text, start: int, positions, quota: int = None) -> tuple:
+        """
+        text[start:] の重ならない一致を数え、positions が None でなければ位置も足す。
+        (件数, 最後の一致の終わりの位置) を返す。
+        """
+        m = len(self.pattern)
+        n = len(text)
+        pattern = self.pattern
+        bad_char = self.bad_char
+        good_suffix = self.good_suffix
+        # 計測を有効にしたときだけ、試した窓の数とずらした幅の合計を stats に足す
+        counting = self.stats is not None
+        windows = 0
+        count = 0
+        end = start
+
+        i = start
         while i <= n - m:
+            if counting:
+                windows += 1
             j = m - 1
-            while j >= 0 and self.pattern[j] == text[i + j]:
+            while j >= 0 and pattern[j] == text[i + j]:
                 j -= 1
             if j < 0:
-                positions.append(i)
+                count += 1
+                if positions is not None:
+                    positions.append(i)
+                end = i + m
+                if count == quota:
+                    break
                 i += m
             else:
-                i += max(1, j - self.bad_char.get(text[i + j], -1))
+                # Bad-Character と Good-Suffix のうち大きい方だけずらす
+                i += max(j - bad_char.get(text[i + j], -1), good_suffix[j + 1])
 
-        return SearchResult(
-            {self.pattern: len(positions)},
-            {self.pattern: positions}
-        )
+        if counting:
+            self.record_stats(bm_windows=windows, bm_shift_total=i - start)
+        return count, end
@@ -0,0 +1,142 @@
+from array import array
+from domain.interfaces.search_algorithm import SearchAlgorithm
+from domain.models.search_result import SearchResult
+from domain.models.result_mode import ResultMode
+
+
+class MultiBoyerMooreSearch(SearchAlgorithm):
+    """
+    複数パターンの Boyer–Moore（Horspool 型の Bad-Character 表を全パターンで共有する。Wu–Manber のブロック長 1 版）。
+
+    - 窓の長さは最も短いパターンの長さ m。窓の末尾の文字で表を引き、どのパターンの先頭 m 文字とも合い得ない分だけずらす
+    - 窓の末尾の文字がパターンの m 文字目と同じなら、そのパターンだけを確かめる
+    - 一致はパターンごとに重ならないものだけを報告する（BoyerMooreSearch を1パターンずつ使った場合と同じ結果）
+    """
+    bytes_native = True
+    overlapping = False
+    stream_fields = SearchAlgorithm.stream_fields + ("_next",)
+
+    def __init__(self, patterns):
+        super().__init__(pattern="")
+        self.patterns = patterns
+        self.name = "Boyer–Moore (Multi)"
+        self.build_tables(patterns)
+        self.reset()
+
+    def get_description(self):
+        return ( "Boyer–Mooreアルゴリズムを複数パターン用にしたもので、最も短いパターンの長さの窓を後方の文字から見て、"
+                 "どのパターンとも合い得ない分だけまとめてスキップします。テキストは全パターンで1回だけ走査します。^^" )
+
+    def get_patterns(self) -> list[str]:
+        return list(self.patterns)
+
+    def build_tables(self, patterns):
+        # 重複と空文字列は除く（同じパターンは1度だけ報告する）
+        self.keys = [p for p in dict.fromkeys(patterns) if len(p) > 0]
+        self.lengths = array("i", (len(p) for p in self.keys))
+        m = self.window = min(self.lengths, default=0)
+        self.longest = max(self.lengths, default=0)
+
+        # shift[c]: 窓の末尾が c のときにずらせる幅（各パターンの先頭 m-1 文字での最後の出現から求める）
+        # candidates[c]: 窓の末尾が c のときに確かめるパターンの番号（m 文字目が c のもの）
+        shift = {}
+        candidates = {}
+        for k, pattern in enumerate(self.keys):
+            for i in range(m - 1):
+                shift[pattern[i]] = min(shift.get(pattern[i], m), m - 1 - i)
+            candidates.setdefault(pattern[m - 1], []).append(k)
+        self.shift = shift
+        self.candidates = candidates
+
+    def build_encoded(self, encoding: str):
+        labels = {}
+        for pattern in self.keys:
+            try:
+                labels[pattern.encode(encoding)] = pattern
+            except UnicodeEncodeError:
+                pass  # このエンコーディングでは出現し得ないパターン
+        return MultiBoyerMooreSearch(list(labels)), labels
+
+    def reset(self):
+        super().reset()
+        # パターンごとの、次に一致を報告してよい最小の位置（一致は重ならない）
+        self._next = [0] * len(self.keys)
+
+    def search(self, text: str, mode: ResultMode = None) -> SearchResult:
+        counts = [0] * len(self.keys)
+        positions = self._positions(mode)
+        self._scan(text, 0, [0] * len(self.keys), counts, positions, mode)
+        return self._result(counts, positions)
+
+    def search_chunk(self, text: str, offset: int = 0, mode: ResultMode = None) -> SearchResult:
+        # 末尾 (最長のパターンの長さ - 1) 文字を持ち越す。持ち越し部分の一致は _next で二重に報告しない
+        buf = self._tail + text
+        base = offset - len(self._tail)
+        counts = [0] * len(self.keys)
+        positions = self._positions(mode)
+        self._scan(buf, base, self._next, counts, positions, mode)
+
+        keep = self.longest - 1
+        self._tail = buf[-keep:] if keep > 0 else ""
+        return self._result(counts, positions)
+
+    def _positions(self, mode):
+        # count モードでは位置を記録しない
+        if mode and mode.limit == 0:
+            return None
+        return [array("q") for _ in self.keys]
+
+    def _scan(self, text, base, next_allowed, counts, positions, mode=None):
+        """
+        text を走査する（位置は base を足した値）。next_allowed[k] より前から始まる一致は報告せず、
+        報告したら一致の終わりに進める。quota に達したら mode に応じて打ち切る。
+        """
+        if not self.keys:
+            return
+        quota = mode.quota if mode else None
+        stop_any = mode.stop_any if mode else False
+        remaining = len(self.keys)
+
+        keys = self.keys
+        lengths = self.lengths
+        get_shift = self.shift.get
+        get_candidates = self.candidates.get
+        m = self.window
+        n = len(text)
+        counting = self.stats is not None
+        windows = 0
+
+        i = m - 1
+        while i < n:
+            if counting:
+                windows += 1
+            c = text[i]
+            found = get_candidates(c)
+            if found is not None:
+                s = i - m + 1
+                for k in found:
+                    if base + s < next_allowed[k] or counts[k] == quota:
+                        continue
+                    end = s + lengths[k]
+                    if end <= n and text[s:end] == keys[k]:
+                        counts[k] += 1
+                        next_allowed[k] = base + end
+                        if positions is not None:
+                            positions[k].append(base + s)
+                        if counts[k] == quota:
+                            remaining -= 1
+                            if stop_any or remaining == 0:
+                                if counting:
+                                    self.record_stats(bm_windows=windows, bm_shift_total=i - m + 1)
+                                return
+            i += get_shift(c, m)
+
+        if counting:
+            self.record_stats(bm_windows=windows, bm_shift_total=i - m + 1)
+
+    def _result(self, counts, positions) -> SearchResult:
+        # 件数は一致の無いパターンも 0 で返す（位置は一致のあったパターンだけ）
+        return SearchResult(
+            dict(zip(self.keys, counts)),
+            {self.keys[k]: positions[k] for k, c in enumerate(counts) if c} if positions is not None else {}
+        )
@@ -1,19 +1,45 @@
 from domain.interfaces.search_algorithm import SearchAlgorithm
 from domain.models.search_result import SearchResult
+from domain.models.result_mode import ResultMode
+from typing import Optional
 
 class CompositeSearchAlgorithm(SearchAlgorithm):
+    """
+    1パターンずつの探索器を束ね、パターンごとにテキストを走査する（Naive の複数パターンだけが使う）。
+    全パターンを1回の走査にまとめるエンジンは、Boyer–Moore（MultiBoyerMooreSearch）・KMP（MultiKMPSearch）・
+    Aho–Corasick・Native。
+    """
+
     def __init__(self, searchers: list[SearchAlgorithm], name="Composite"):
         super().__init__("")
         self.searchers = searchers
         self.name = name
+        self.bytes_native = all(s.bytes_native for s in searchers)
+        self.overlapping = all(s.overlapping for s in searchers)
 
-    def search(self, text: str) -> SearchResult:
+    def search(self, text: str, mode: ResultMode = None) -> SearchResult:
         counts = {}
         positions = {}
         distances = {}
 
         for s in self.searchers:
-            r = s.search(text)
+            r = s.search(text, mode)
+            counts.update(r.counts)
+            positions.update(r.positions)
+            distances.update(r.distances)
+
+        return SearchResult(counts, positions, distances)
+
+    def search_encoded(self, data, encoding: str, mode: ResultMode = None) -> Optional[SearchResult]:
+        if not self.bytes_native:
+            return None
+
+        counts = {}
+        positions = {}
+        distances = {}
+
+        for s in self.searchers:
+            r = s.search_encoded(data, encoding, mode)
             counts.update(r.counts)
             positions.update(r.positions)
             distances.update(r.distances)
@@ -25,13 +51,53 @@ class CompositeSearchAlgorithm(SearchAlgorithm):
             return self.searchers[0].get_description()
         return ""
 
-    def search_chunk(self, text: str, offset: int = 0) -> SearchResult:
+    def get_patterns(self) -> list[str]:
+        return [p for s in self.searchers for p in s.get_patterns()]
+
+    def prepare(self, encodings=("utf-8",)):
+        for s in self.searchers:
+            s.prepare(encodings)
+
+    def enable_stats(self, stats):
+        super().enable_stats(stats)
+        for s in self.searchers:
+            s.enable_stats(stats)
+
+    def get_signature(self) -> str:
+        return repr((type(self).__name__, [s.get_signature() for s in self.searchers]))
+
+    def reset(self):
+        super().reset()
+        for s in self.searchers:
+            s.reset()
+
+    def get_state(self) -> dict:
+        return {"searchers": [s.get_state() for s in self.searchers]}
+
+    def set_state(self, state: dict):
+        for s, st in zip(self.searchers, state["searchers"]):
+            s.set_state(st)
+
+    def search_chunk(self, text: str, offset: int = 0, mode: ResultMode = None) -> SearchResult:
+        counts = {}
+        positions = {}
+        distances = {}
+
+        for s in self.searchers:
+            r = s.search_chunk(text, offset, mode)
+            counts.update(r.counts)
+            positions.update(r.positions)
+            distances.update(r.distances)
+
+        return SearchResult(counts, positions, distances)
+
+    def finish(self) -> SearchResult:
         counts = {}
         positions = {}
         distances = {}
 
         for s in self.searchers:
-            r = s.search_chunk(text, offset)
+            r = s.finish()
             counts.update(r.counts)
             positions.update(r.positions)
             distances.update(r.distances)
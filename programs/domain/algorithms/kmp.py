@@ -1,11 +1,16 @@
 from domain.interfaces.search_algorithm import SearchAlgorithm
 from domain.models.search_result import SearchResult
+from domain.models.result_mode import ResultMode
 
 class KMPSearch(SearchAlgorithm):
+    bytes_native = True
+    stream_fields = SearchAlgorithm.stream_fields + ("_j",)
+
     def __init__(self, pattern: str):
         super().__init__(pattern)
         self.name = "Knuth–Morris–Pratt (KMP)"
         self.lps = self.build_lps(pattern)
+        self._j = 0
     
     def get_description(self):
         return ( "KMPアルゴリズムは部分一致テーブル（LPS）を使い、無駄な比較を避けながら線形時間で検索を行います。パターンが繰り返し構造を持つ場合に特に効率的です。^^" )
@@ -31,29 +36,57 @@ class KMPSearch(SearchAlgorithm):
                     i += 1
         return lps
 
-    def search(self, text: str) -> SearchResult:
-        positions = []
-        i = j = 0
-        n = len(text)
-        m = len(self.pattern)
+    def reset(self):
+        super().reset()
+        self._j = 0  # チャンクをまたいで持ち越す一致長
 
-        if m == 0:
+    def search(self, text: str, mode: ResultMode = None) -> SearchResult:
+        if len(self.pattern) == 0:
+            return SearchResult({"": 0}, {"": []})
+
+        positions = self.new_positions(mode)
+        count, _ = self._scan(text, 0, positions, mode.quota if mode else None)
+
+        return SearchResult(
+            {self.pattern: count},
+            {self.pattern: positions} if positions is not None else {}
+        )
+
+    def search_chunk(self, text: str, offset: int = 0, mode: ResultMode = None) -> SearchResult:
+        if len(self.pattern) == 0:
             return SearchResult({"": 0}, {"": []})
 
+        positions = self.new_positions(mode)
+        count, self._j = self._scan(text, self._j, positions, mode.quota if mode else None)
+
+        return SearchResult(
+            {self.pattern: count},
+            {self.pattern: [offset + pos for pos in positions]} if positions is not None else {}
+        )
+
+    def _scan(self, text, j: int, positions, quota: int = None):
+        """一致を数え、positions が None でなければ位置も足す。(件数, 持ち越す一致長) を返す。"""
+        # j > 0 で始めた場合、直前のチャンクから始まる一致は負の位置になる
+        count = 0
+        i = 0
+        n = len(text)
+        m = len(self.pattern)
+
         while i < n:
             if self.pattern[j] == text[i]:
                 i += 1
                 j += 1
             if j == m:
-                positions.append(i - j)
+                count += 1
+                if positions is not None:
+                    positions.append(i - j)
                 j = self.lps[j - 1]
+                if count == quota:
+                    break
             elif i < n and self.pattern[j] != text[i]:
                 if j != 0:
                     j = self.lps[j - 1]
                 else:
                     i += 1
 
-        return SearchResult(
-            {self.pattern: len(positions)},
-            {self.pattern: positions}
-        )
+        return count, j
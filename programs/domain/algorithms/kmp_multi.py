@@ -0,0 +1,17 @@
+from domain.algorithms.aho_corasick_compact import CompactAhoCorasickSearch
+
+
+class MultiKMPSearch(CompactAhoCorasickSearch):
+    """
+    複数パターンの KMP。各パターンの部分一致テーブル（LPS）を1つの Trie の上にまとめた失敗遷移にして、
+    テキストを1回だけ走査する（この形は Aho–Corasick のオートマトンそのものなので、表の作り方と走査は共有する）。
+    一致は KMPSearch と同じく、重なるものもすべて報告する。
+    """
+
+    def __init__(self, patterns):
+        super().__init__(patterns)
+        self.name = "KMP (Multi)"
+
+    def get_description(self):
+        return ( "KMPアルゴリズムを複数パターン用にしたもので、全パターンの部分一致テーブル（LPS）を1つのTrieの失敗遷移にまとめ、"
+                 "テキストを一度走査するだけで全パターンを検出します（Aho–Corasickと同じ形になります）。^^" )
@@ -1,7 +1,10 @@
 from domain.interfaces.search_algorithm import SearchAlgorithm
 from domain.models.search_result import SearchResult
+from domain.models.result_mode import ResultMode
 
 class NaiveSearch(SearchAlgorithm):
+    bytes_native = True
+
     def __init__(self, pattern: str):
         super().__init__(pattern)
         self.name = "Naive Search"
@@ -22,17 +25,25 @@ m文字のテキストからn文字のパターンを見つける場合、n回
 最悪のケースは "AAAAAAAAAAA" のような繰り返し文字が多いテキストで "AAAB" のようなパターンを探索する場合ですね。
                 """)
 
-    def search(self, text: str) -> SearchResult:
+    def search(self, text: str, mode: ResultMode = None) -> SearchResult:
         m = len(self.pattern)
         n = len(text)
-        positions = []
+        positions = self.new_positions(mode)
+        count = 0
+        quota = mode.quota if mode else None
 
         if m > 0:
+            first = self.pattern[0]
             for i in range(n - m + 1):
-                if text[i:i+m] == self.pattern:
-                    positions.append(i)
+                # 先頭の1文字が合った位置だけ部分文字列を切り出して比べる
+                if text[i] == first and text[i:i+m] == self.pattern:
+                    count += 1
+                    if positions is not None:
+                        positions.append(i)
+                    if count == quota:
+                        break
 
         return SearchResult(
-            {self.pattern: len(positions)},
-            {self.pattern: positions}
+            {self.pattern: count},
+            {self.pattern: positions} if positions is not None else {}
         )
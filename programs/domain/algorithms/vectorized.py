@@ -0,0 +1,105 @@
+"""
+NumPy による完全一致の候補絞り込み（VectorizedSearch エンジンの走査）。
+
+テキストを np.frombuffer で uint8 の配列として見て、パターンの先頭・末尾・最も珍しいバイトが
+その位置に来ているかを配列演算でまとめて比べ、残った候補だけを残りのバイトで確かめる。
+NumPy が無い環境や非 ASCII の文字列では as_array が None を返し、呼び出し側は別の走査を使う。
+find_newlines は改行の索引（use_cases.line_index）を作るときの改行の位置の検出に使う。
+"""
+from array import array
+
+# 最も珍しいバイトを選ぶときに見るテキストの長さ。find_newlines はこれより短いデータには使わない
+VECTOR_MIN = 64 * 1024
+# 一度に比べるテキストの長さ（比較結果の配列が大きくなりすぎないように区切る）
+BLOCK_SIZE = 8 * 1024 * 1024
+
+_numpy = None
+
+
+def _load_numpy():
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy  # NumPy は任意。初めて使うときだけ読み込む
+        except ImportError:
+            numpy = False
+        _numpy = numpy
+    return _numpy
+
+
+def as_array(text):
+    """
+    テキストを uint8 の配列として見る（str は ASCII のときだけ1回エンコードする。バイト列はコピーしない）。
+    使えない（NumPy が無い・非 ASCII の文字列で位置がずれる）なら None。
+    mmap への参照を残さないよう、使い終わったら呼び出し側で del する。
+    """
+    np = _load_numpy()
+    if not np:
+        return None
+    if isinstance(text, str):
+        if not text.isascii():
+            return None
+        text = text.encode("ascii")
+    return np.frombuffer(text, dtype=np.uint8)
+
+
+def byte_histogram(arr, start: int = 0):
+    """arr[start:] の先頭 VECTOR_MIN バイトの出現数。find_all の sample に渡す（パターンごとに数え直さない）。"""
+    return _numpy.bincount(arr[start:start + VECTOR_MIN], minlength=256)
+
+
+def find_all(arr, pattern: bytes, start: int = 0, quota: int = None, base: int = 0, sample=None) -> array:
+    """
+    arr（as_array の配列）の start 以降にある pattern の出現位置（重なりも含む）に base を足し、昇順の array('q') で返す。
+    quota を渡すとその件数で打ち切る。
+    """
+    np = _numpy
+    m = len(pattern)
+    positions = array("q")
+    if m == 0 or len(arr) - start < m:
+        return positions
+    needle = np.frombuffer(pattern, dtype=np.uint8)
+    if sample is None:
+        sample = byte_histogram(arr, start)
+    probes = sorted({0, m - 1, int(np.argmin(sample[needle]))})
+    rest = [k for k in range(m) if k not in probes]
+    last = len(arr) - m  # 一致の開始位置の最大値
+
+    for lo in range(start, last + 1, BLOCK_SIZE):
+        hi = min(lo + BLOCK_SIZE, last + 1)  # このブロックで調べる開始位置 [lo, hi)
+
+        k = probes[0]
+        mask = arr[lo + k:hi + k] == needle[k]
+        for k in probes[1:]:
+            mask &= arr[lo + k:hi + k] == needle[k]
+        candidates = np.flatnonzero(mask) + lo
+
+        # 残りのバイトは候補の位置だけで確かめる
+        for k in rest:
+            if not len(candidates):
+                break
+            candidates = candidates[arr[candidates + k] == needle[k]]
+
+        if quota is not None:
+            candidates = candidates[:quota - len(positions)]
+        positions.frombytes((candidates + base).astype(np.int64).tobytes())
+        if len(positions) == quota:
+            break
+
+    return positions
+
+
+def find_newlines(data, base: int = 0):
+    """data（バイト列）中の b"\\n" の直後の位置に base を足した array('q')（使えないときは None）。"""
+    if len(data) < VECTOR_MIN:
+        return None
+    np = _load_numpy()
+    if not np:
+        return None
+    arr = np.frombuffer(data, dtype=np.uint8)
+    try:
+        found = array("q")
+        found.frombytes((np.flatnonzero(arr == 10) + (base + 1)).astype(np.int64).tobytes())
+        return found
+    finally:
+        del arr
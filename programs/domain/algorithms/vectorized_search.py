@@ -0,0 +1,96 @@
+from array import array
+from domain.interfaces.search_algorithm import SearchAlgorithm
+from domain.models.search_result import SearchResult
+from domain.models.result_mode import ResultMode
+from domain.algorithms.native import NativeSearch
+from domain.algorithms.vectorized import as_array, byte_histogram, find_all
+
+
+class VectorizedSearch(SearchAlgorithm):
+    """
+    NumPy の配列演算で完全一致を探すエンジン（"vector"。Naive / Boyer–Moore の実装とは別）。
+
+    - テキストは1回だけ uint8 の配列にし、パターンごとに先頭・末尾・最も珍しいバイトをまとめて比べて候補を絞る
+    - 一致は Naive / KMP と同じく重なりも含めてすべて報告する
+    - NumPy が無い環境と非 ASCII の文字列（バイト位置と文字位置がずれる）は NativeSearch で探す
+    """
+    bytes_native = True
+
+    def __init__(self, patterns: list):
+        super().__init__(pattern="")
+        self.patterns = patterns
+        self.name = "Vectorized (NumPy)"
+        self.keys = [p for p in dict.fromkeys(patterns) if len(p) > 0]
+        self.longest = max((len(p) for p in self.keys), default=0)
+        # 配列と比べるバイト列。ASCII でない str のパターンは ASCII のテキストには現れない
+        self.needles = [
+            (p.encode("ascii") if p.isascii() else None) if isinstance(p, str) else bytes(p) for p in self.keys
+        ]
+        self.fallback = NativeSearch(self.keys)
+
+    def get_description(self):
+        return ( "NumPy の配列演算で、パターンの先頭・末尾・最も珍しい文字が合う位置をテキスト全体でまとめて比べ、"
+                 "残った候補だけを確かめます。1文字ずつ Python で回さないので、大きな ASCII のログで速くなります。"
+                 "NumPy が無いときや、ASCII 以外の文字を含むテキストは Native と同じ C の検索を使います。^^" )
+
+    def get_patterns(self) -> list[str]:
+        return list(self.patterns)
+
+    def build_encoded(self, encoding: str):
+        labels = {}
+        for pattern in self.keys:
+            try:
+                labels[pattern.encode(encoding)] = pattern
+            except UnicodeEncodeError:
+                pass  # このエンコーディングでは出現し得ないパターン
+        return VectorizedSearch(list(labels)), labels
+
+    def enable_stats(self, stats):
+        super().enable_stats(stats)
+        self.fallback.enable_stats(stats)
+
+    def search(self, text, mode: ResultMode = None) -> SearchResult:
+        return self._scan(text, 0, 0, mode)
+
+    def search_chunk(self, text: str, offset: int = 0, mode: ResultMode = None) -> SearchResult:
+        # 最長パターン - 1 文字を持ち越す。持ち越し部分だけに収まる一致は報告済みなので数えない
+        buf = self._tail + text
+        r = self._scan(buf, len(self._tail), offset - len(self._tail), mode)
+
+        keep = self.longest - 1
+        self._tail = buf[-keep:] if keep > 0 else ""
+
+        return r
+
+    def _scan(self, text, min_end: int, base: int, mode) -> SearchResult:
+        """text 内の一致のうち、終端が min_end より後ろのものを返す（位置には base を足す）。"""
+        arr = as_array(text)
+        if arr is None:
+            return self.fallback._scan(NativeSearch._haystack(text), min_end, base, mode)
+
+        quota = mode.quota if mode else None
+        counts = [0] * len(self.keys)
+        positions = None if mode and mode.limit == 0 else [array("q") for _ in self.keys]
+        try:
+            if self.stats is not None:
+                self.record_stats(vector_bytes=len(arr), vector_passes=len(self.keys))
+            # 最も珍しいバイトを選ぶための出現数は、全パターンで1回だけ数える
+            sample = byte_histogram(arr, min_end)
+            for k, needle in enumerate(self.needles):
+                if needle is None:
+                    continue
+                found = find_all(arr, needle, max(min_end - len(needle) + 1, 0), quota, base, sample)
+                counts[k] = len(found)
+                if positions is not None:
+                    positions[k] = found
+                if counts[k] and mode and mode.stop_any:
+                    break
+        finally:
+            # mmap への参照（バッファのエクスポート）を残さない
+            del arr
+
+        # 件数は一致の無いパターンも 0 で返す（位置は一致のあったパターンだけ）
+        return SearchResult(
+            dict(zip(self.keys, counts)),
+            {self.keys[k]: positions[k] for k, c in enumerate(counts) if c} if positions is not None else {}
+        )
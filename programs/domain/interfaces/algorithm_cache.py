@@ -0,0 +1,12 @@
+from abc import ABC, abstractmethod
+from domain.interfaces.search_algorithm import SearchAlgorithm
+
+class AlgorithmCache(ABC):
+    @abstractmethod
+    def get(self, key: str) -> SearchAlgorithm:
+        """構築済みのアルゴリズムを返す。無ければ None。"""
+        pass
+
+    @abstractmethod
+    def put(self, key: str, algorithm: SearchAlgorithm):
+        pass
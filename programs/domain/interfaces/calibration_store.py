@@ -0,0 +1,11 @@
+from abc import ABC, abstractmethod
+
+class CalibrationStore(ABC):
+    @abstractmethod
+    def get(self, key: str) -> dict:
+        """保存済みの較正結果 {"coeffs": {エンジン: 係数}, "time": 測った時刻} を返す。無ければ None。"""
+        pass
+
+    @abstractmethod
+    def put(self, key: str, entry: dict):
+        pass
@@ -0,0 +1,11 @@
+from abc import ABC, abstractmethod
+
+class CostModelStore(ABC):
+    @abstractmethod
+    def load(self) -> list[dict]:
+        """保存済みの観測（検索1回ごとの {engine, bytes, patterns, length, hits, seconds}）。無ければ空のリスト。"""
+        pass
+
+    @abstractmethod
+    def save(self, observations: list[dict]):
+        pass
@@ -1,15 +1,66 @@
 from abc import ABC, abstractmethod
-from typing import Iterator
+from typing import ContextManager, Iterator, Optional
 
 class FileRepository(ABC):
     @abstractmethod
     def read_text(self, path: str) -> str:
         pass
 
+    @abstractmethod
+    def open_bytes(self, path: str, encoding: str = None) -> ContextManager[tuple]:
+        """(バイト列バッファ, エンコーディング) を返すコンテキストマネージャ。encoding 指定時は判定を省く。"""
+        pass
+
     @abstractmethod
     def get_size(self, path: str) -> int:
         pass
 
     @abstractmethod
-    def read_chunks(self, path: str, chunk_size: int = 1024*1024) -> Iterator[str]:
+    def get_compression(self, path: str) -> Optional[str]:
+        """
+        圧縮ファイルなら形式名 ("gzip" / "bz2" / "xz" / "zstd")、アーカイブのメンバーなら "zip" / "tar"、
+        そうでなければ None。None 以外は mmap できないので、ストリーミングで読む。
+        """
+        pass
+
+    @abstractmethod
+    def list_members(self, path: str) -> Optional[list[str]]:
+        """
+        zip / tar（.tar.gz なども）ならメンバーの仮想パス "bundle.zip!/var/log/app.log" の一覧、そうでなければ None。
+        仮想パスは他のメソッドにそのまま渡せる（展開せずにメンバーを直接読む）。
+        """
+        pass
+
+    @abstractmethod
+    def get_content_size(self, path: str) -> int:
+        """展開後のサイズ（圧縮ファイルは見積もり）。所要時間の見積もりに使う。get_size はディスク上のサイズ。"""
+        pass
+
+    @abstractmethod
+    def get_fingerprint(self, path: str) -> tuple:
+        """(サイズ, 更新時刻, inode) を返す。結果キャッシュの有効判定に使う。"""
+        pass
+
+    @abstractmethod
+    def read_bytes(self, path: str, start: int, end: int) -> bytes:
+        pass
+
+    @abstractmethod
+    def sniff_encoding(self, path: str) -> str:
+        """ストリーミング読み込みで使うエンコーディングを先頭から推定する。"""
+        pass
+
+    @abstractmethod
+    def read_raw_chunks(self, path: str, chunk_size: int = 1024*1024, start: int = 0, end: int = None,
+                        on_progress=None) -> Iterator[bytes]:
+        """
+        バイト範囲 [start, end) をデコードせずにチャンク単位で返す（デコードは domain.utils.ChunkDecoder）。
+        圧縮ファイルは展開したものを返す。on_progress(位置) にはチャンクごとにディスク上の読み込み位置を渡す。
+        """
+        pass
+
+    @abstractmethod
+    def read_chunks(self, path: str, chunk_size: int = 1024*1024, start: int = 0, end: int = None,
+                    encoding: str = None, on_progress=None) -> Iterator[str]:
+        """バイト範囲 [start, end) をデコードしながらチャンク単位で返す。"""
         pass
@@ -0,0 +1,11 @@
+from abc import ABC, abstractmethod
+
+class LineIndexStore(ABC):
+    @abstractmethod
+    def get(self, key: str):
+        """保存済みの LineIndex を返す。無ければ None。"""
+        pass
+
+    @abstractmethod
+    def put(self, key: str, index):
+        pass
@@ -0,0 +1,11 @@
+from abc import ABC, abstractmethod
+
+class ResultStore(ABC):
+    @abstractmethod
+    def get(self, key: str) -> dict:
+        """保存済みのエントリを返す。無ければ None。"""
+        pass
+
+    @abstractmethod
+    def put(self, key: str, entry: dict):
+        pass
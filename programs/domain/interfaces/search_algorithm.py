@@ -1,25 +1,179 @@
+import copy
+from array import array
 from abc import ABC, abstractmethod
+from typing import Optional
 from domain.models.search_result import SearchResult
+from domain.models.result_mode import ResultMode
+from domain.utils import char_offsets, decode_text
 
 class SearchAlgorithm(ABC):
+    # True ならエンコード済みパターンでバイト列 (bytes/memoryview/mmap) を直接走査できる
+    bytes_native = False
+    # True なら重なり合う一致もすべて報告する（範囲分割して並列に探索できる）
+    overlapping = True
+    # チャンクをまたいで持ち越す状態を持つ属性（reset で初期化、get_state/set_state で保存・復元）
+    stream_fields = ("_tail",)
+    # 走査のカウンタを足す辞書（enable_stats したときだけ）
+    stats = None
+
     def __init__(self, pattern: str = ""):
         self.pattern = pattern
         self.name = "Unknown Algorithm"
+        self._encoded = {}
+        self._tail = ""
 
     @abstractmethod
-    def search(self, text: str) -> SearchResult:
+    def search(self, text: str, mode: ResultMode = None) -> SearchResult:
+        """
+        mode を渡すと、その上限に達した時点で走査を打ち切ってよい（count なら位置を記録しなくてよい）。
+        上限を超えた分の切り捨ては呼び出し側が mode.clip で行う。
+        """
         pass
 
+    @staticmethod
+    def new_positions(mode: ResultMode = None) -> Optional[array]:
+        """一致の位置を足していく array('q')。count モードでは位置を記録しないので None（件数だけ数える）。"""
+        return None if mode and mode.limit == 0 else array("q")
+
     @abstractmethod
     def get_description(self) -> str:
         """Returns the description of the algorithm."""
         pass
 
-    def search_chunk(self, text: str, offset: int = 0) -> SearchResult:
-        """Default implementation for chunk-based searching."""
-        r = self.search(text)
+    def get_patterns(self) -> list[str]:
+        """検索対象のパターン一覧を返す。"""
+        return [self.pattern]
+
+    def get_signature(self) -> str:
+        """検索条件（アルゴリズムとパターン、パラメータ）を表す文字列。結果のキャッシュキーに使う。"""
+        return repr((type(self).__name__, self.get_patterns()))
+
+    def reset(self):
+        """ファイルごとのストリーム状態（チャンク間の持ち越し）を初期化する。"""
+        self._tail = ""
+
+    def get_state(self) -> dict:
+        """ストリーム状態のコピーを返す。set_state に渡すと続きから走査を再開できる。"""
+        return {name: copy.copy(getattr(self, name)) for name in self.stream_fields}
+
+    def set_state(self, state: dict):
+        for name, value in state.items():
+            setattr(self, name, copy.copy(value))
+
+    def search_chunk(self, text: str, offset: int = 0, mode: ResultMode = None) -> SearchResult:
+        """
+        Default implementation for chunk-based searching.
+        直前のチャンク末尾 len(pattern)-1 文字を持ち越して検索するので、
+        境界をまたぐ一致も取りこぼさない（持ち越し部分だけに収まる一致は既に報告済み）。
+        """
+        buf = self._tail + text
+        base = offset - len(self._tail)
+        r = self.search(buf, mode)
+
+        keep = len(self.pattern) - 1
+        self._tail = buf[-keep:] if keep > 0 else ""
+
         new_positions = {
-            p: [pos + offset for pos in pos_list]
+            p: [pos + base for pos in pos_list]
             for p, pos_list in r.positions.items()
         }
         return SearchResult(r.counts, new_positions, getattr(r, 'distances', {}))
+
+    def enable_stats(self, stats: Optional[dict]):
+        """
+        走査のカウンタを stats に足すようにする（None で止める）。
+        カウンタは一致の処理など回数の少ない所か、走査の呼び出しごとにしか数えないので、止めていれば何もかからない。
+        """
+        self.stats = stats
+        for searcher, _ in self._encoded.values():
+            if searcher is not None:
+                searcher.enable_stats(stats)
+
+    def record_stats(self, **counters):
+        stats = self.stats
+        for name, n in counters.items():
+            stats[name] = stats.get(name, 0) + n
+
+    def finish(self) -> SearchResult:
+        """ストリームの終端で呼ぶ。報告を保留している一致があれば確定して返す。"""
+        return SearchResult({}, {})
+
+    def search_bytes(self, data, encoding: str = "utf-8", mode: ResultMode = None) -> SearchResult:
+        """
+        エンコード済みのデータを検索する。位置は文字オフセットで返す。
+        バイト走査に対応していない場合と、改行を含むパターンを "\r" のあるデータから探す場合
+        （改行を "\n" に揃えたテキストでないと一致が変わる）は、デコードしてから search を呼ぶ。
+        どの経路でも、一致の無いパターンの件数は 0 として返す。
+        """
+        raw = None
+        if not (self.has_newline_patterns() and b"\r" in data):
+            raw = self.search_encoded(data, encoding, mode)
+        if raw is None:
+            r = self.search(decode_text(data, encoding), mode)
+        else:
+            r = self.decode_positions(raw, data, encoding)
+        return self.fill_counts(r)
+
+    def has_newline_patterns(self) -> bool:
+        """"\n" か "\r" を含むパターンがあるか（生のバイト列をそのまま走査すると "\r\n" のファイルで一致が変わる）。"""
+        return any("\n" in p or "\r" in p for p in self.get_patterns())
+
+    def fill_counts(self, r: SearchResult) -> SearchResult:
+        """一致の無いパターンの件数を 0 として足す（どの経路で走査しても結果のキーを揃える）。"""
+        for p in self.get_patterns():
+            if p:
+                r.counts.setdefault(p, 0)
+        return r
+
+    @staticmethod
+    def decode_positions(raw: SearchResult, data, encoding: str) -> SearchResult:
+        """バイトオフセットの結果を文字オフセットの結果に変換する。"""
+        mapping = char_offsets(
+            data, (pos for pos_list in raw.positions.values() for pos in pos_list), encoding
+        )
+        positions = {
+            p: [mapping[pos] for pos in pos_list]
+            for p, pos_list in raw.positions.items()
+        }
+        return SearchResult(raw.counts, positions, raw.distances, raw.limit)
+
+    def prepare(self, encodings=("utf-8",)):
+        """指定エンコーディング用の探索器を先に構築しておく（キャッシュへの保存前など）。"""
+        for encoding in encodings:
+            if self.bytes_native and encoding not in self._encoded:
+                self._encoded[encoding] = self.build_encoded(encoding)
+
+    def search_encoded(self, data, encoding: str, mode: ResultMode = None) -> Optional[SearchResult]:
+        """バイト列を走査し、位置をバイトオフセットのまま返す。非対応なら None。"""
+        if not self.bytes_native:
+            return None
+
+        if encoding not in self._encoded:
+            self._encoded[encoding] = self.build_encoded(encoding)
+            if self.stats is not None and self._encoded[encoding][0] is not None:
+                self._encoded[encoding][0].enable_stats(self.stats)
+        searcher, labels = self._encoded[encoding]
+
+        if searcher is None:
+            # パターンがこのエンコーディングで表現できない＝出現し得ない
+            return SearchResult({self.pattern: 0}, {self.pattern: []})
+
+        with memoryview(data) as view:
+            r = searcher.search(view, mode)
+
+        return SearchResult(
+            {labels[p]: c for p, c in r.counts.items()},
+            {labels[p]: pos for p, pos in r.positions.items()},
+            {labels[p]: dist for p, dist in r.distances.items()}
+        )
+
+    def build_encoded(self, encoding: str):
+        """
+        パターンをエンコードした探索器と、{エンコード済みパターン: 元のパターン} を返す。
+        単一パターンのアルゴリズムはコンストラクタにそのまま bytes を渡せる。
+        """
+        try:
+            encoded = self.pattern.encode(encoding)
+        except UnicodeEncodeError:
+            return None, {}
+        return type(self)(encoded), {encoded: self.pattern}
@@ -0,0 +1,45 @@
+from array import array
+from bisect import bisect_right
+from typing import Optional
+
+
+class LineIndex:
+    """
+    改行の位置の索引。検索結果の位置（改行を "\\n" に揃えた文字列の文字位置）から行と桁を二分探索で求め、
+    行の先頭のバイト位置から、その行だけを seek して読めるようにする。
+
+    - starts: 各行の先頭の文字位置 (array('q'))。starts[0] は 0
+    - byte_starts: 各行の先頭のバイト位置。文字位置と同じ（ASCII だけで CR が無い）なら None で starts を使う
+    - seekable: バイト位置で seek して読んでよいか（圧縮ファイル・単独の CR があるファイルなどは False）
+    """
+    __slots__ = ("starts", "byte_starts", "length", "encoding", "seekable")
+
+    def __init__(self, starts: array = None, byte_starts: Optional[array] = None, length: int = 0,
+                 encoding: str = "utf-8", seekable: bool = False):
+        self.starts = starts if starts is not None else array("q", [0])
+        self.byte_starts = byte_starts
+        self.length = length      # 全体の文字数
+        self.encoding = encoding
+        self.seekable = seekable
+
+    def __len__(self):
+        return len(self.starts)
+
+    def line_of(self, position: int) -> int:
+        """位置を含む行（0 始まり）。"""
+        return bisect_right(self.starts, position) - 1
+
+    def locate(self, position: int) -> tuple:
+        """位置の (行, 桁)。どちらも 1 始まり。"""
+        i = bisect_right(self.starts, position) - 1
+        return i + 1, position - self.starts[i] + 1
+
+    def line_span(self, i: int) -> tuple:
+        """i 行目（0 始まり）の [先頭, 末尾) の文字位置（末尾の改行は含まない）。"""
+        end = self.starts[i + 1] - 1 if i + 1 < len(self.starts) else self.length
+        return self.starts[i], end
+
+    def byte_span(self, i: int) -> tuple:
+        """i 行目（0 始まり）の [先頭, 次の行の先頭) のバイト位置。最後の行の終わりは None。"""
+        starts = self.starts if self.byte_starts is None else self.byte_starts
+        return starts[i], starts[i + 1] if i + 1 < len(starts) else None
@@ -0,0 +1,69 @@
+from domain.models.search_result import SearchResult
+
+
+class ResultMode:
+    """
+    検索結果の取り方。
+
+    - all: すべての位置（既定）
+    - count: 件数だけ。位置は持たない
+    - exists: どれかのパターンが1件見つかった時点でそのファイルの走査を打ち切る
+    - first_n: パターンごとに先頭 n 件まで。全パターンが n 件に達したら打ち切る
+
+    exists / first_n の counts は見つけた件数（上限 1 / n）で、ファイル全体の件数ではない。
+    """
+    __slots__ = ("kind", "n")
+    KINDS = ("all", "count", "exists", "first_n")
+
+    def __init__(self, kind: str = "all", n: int = 1):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown result mode: {kind}")
+        if kind == "first_n" and n < 1:
+            raise ValueError("first_n には 1 以上の n が必要です")
+        self.kind = kind
+        self.n = n
+
+    @property
+    def limit(self):
+        """パターンごとに保持する位置の数（None は全件）。"""
+        return {"all": None, "count": 0, "exists": 1, "first_n": self.n}[self.kind]
+
+    @property
+    def quota(self):
+        """パターンごとに数える件数の上限。これに達したパターンはもう探さなくてよい（None は上限なし）。"""
+        return {"exists": 1, "first_n": self.n}.get(self.kind)
+
+    @property
+    def stop_any(self) -> bool:
+        """True なら、どれか1つのパターンが quota に達した時点で打ち切れる。"""
+        return self.kind == "exists"
+
+    def is_done(self, result: SearchResult, patterns) -> bool:
+        if self.kind == "exists":
+            return any(c > 0 for c in result.counts.values())
+        if self.kind == "first_n":
+            return all(result.counts.get(p, 0) >= self.n for p in patterns)
+        return False
+
+    def clip(self, r: SearchResult, current: SearchResult = None) -> SearchResult:
+        """r のうち、current に足してもモードの上限を超えない分だけを返す。"""
+        if self.kind == "all":
+            return r
+
+        quota = self.quota
+        limit = self.limit
+        current_counts = current.counts if current else {}
+        current_positions = current.positions if current else {}
+
+        counts = {
+            p: c if quota is None else max(0, min(c, quota - current_counts.get(p, 0)))
+            for p, c in r.counts.items()
+        }
+        room = {p: max(0, limit - len(current_positions.get(p, ()))) for p in r.positions}
+        positions = {p: pos[:room[p]] for p, pos in r.positions.items()}
+        distances = {p: dist[:room.get(p, 0)] for p, dist in r.distances.items()}
+
+        return SearchResult(counts, positions, distances, limit)
+
+    def apply(self, r: SearchResult) -> SearchResult:
+        return self.clip(r)
@@ -1,10 +1,22 @@
 # programs/domain/models/search_result.py
+from array import array
+
 
 class SearchResult:
-    def __init__(self, counts: dict[str, int], positions: dict[str, list[int]], distances: dict[str, list[int]] = None):
+    """
+    検索結果。位置は array('q')、距離は array('B') に詰めて持つ（int オブジェクトを1件ずつ作らない）。
+
+    limit はパターンごとに保持する位置の上限。None なら全件、0 なら件数だけを数え、
+    N なら先頭の N 件だけを残す（counts は常に全件の数）。
+    """
+    __slots__ = ("counts", "positions", "distances", "limit")
+
+    def __init__(self, counts: dict[str, int], positions: dict[str, list[int]], distances: dict[str, list[int]] = None,
+                 limit: int = None):
         self.counts = counts            # {pattern: count}
-        self.positions = positions      # {pattern: [pos1, pos2, ...]}
-        self.distances = distances or {} # {pattern: [dist1, dist2, ...]}
+        self.limit = limit
+        self.positions = {p: _positions(pos, limit) for p, pos in positions.items()}              # {pattern: array('q')}
+        self.distances = {p: _distances(dist, limit) for p, dist in (distances or {}).items()}   # {pattern: array('B')}
 
     def get_count(self, pattern: str) -> int:
         return self.counts.get(pattern, 0)
@@ -14,3 +26,51 @@ class SearchResult:
 
     def get_distances(self, pattern: str) -> list[int]:
         return self.distances.get(pattern, [])
+
+    def merge(self, other: "SearchResult"):
+        """other の件数・位置・距離をこの結果の後ろに足し込む（配列どうしの連結。limit を超える分は捨てる）。"""
+        for p, c in other.counts.items():
+            self.counts[p] = self.counts.get(p, 0) + c
+        for p, pos in other.positions.items():
+            self.positions[p] = _concat(self.positions.get(p), _positions(pos, None), self.limit)
+        for p, dist in other.distances.items():
+            self.distances[p] = _concat(self.distances.get(p), _distances(dist, None), self.limit)
+        return self
+
+    def copy(self) -> "SearchResult":
+        """位置・距離の配列まで複製した結果（merge しても元の結果は変わらない）。"""
+        return SearchResult(
+            dict(self.counts),
+            {p: pos[:] for p, pos in self.positions.items()},
+            {p: dist[:] for p, dist in self.distances.items()},
+            self.limit
+        )
+
+
+def _positions(values, limit):
+    if not (isinstance(values, array) and values.typecode == "q"):
+        values = array("q", values)
+    return values if limit is None or len(values) <= limit else values[:limit]
+
+
+def _distances(values, limit):
+    if not isinstance(values, array):
+        try:
+            values = array("B", values)
+        except OverflowError:
+            values = array("I", values)  # 256 以上の距離（d を極端に大きくした場合）
+    return values if limit is None or len(values) <= limit else values[:limit]
+
+
+def _concat(mine, extra, limit):
+    if mine is None:
+        mine = array(extra.typecode)
+    elif mine.typecode != extra.typecode:
+        mine, extra = (array("I", mine), extra) if extra.typecode == "I" else (mine, array("I", extra))
+
+    room = len(extra) if limit is None else limit - len(mine)
+    if room >= len(extra):
+        mine.extend(extra)
+    elif room > 0:
+        mine.extend(extra[:room])
+    return mine
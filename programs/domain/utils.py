@@ -1,3 +1,6 @@
+import codecs
+
+
 def levenshtein(a: str, b: str) -> int:
     dp = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
 
@@ -9,3 +12,98 @@ def levenshtein(a: str, b: str) -> int:
                 dp[i-1][j-1] + (a[i-1] != b[j-1])
             )
     return dp[-1][-1]
+
+
+_COUNT_BLOCK = 1024 * 1024
+
+
+def _char_counter(encoding: str):
+    """先頭から順に渡したバイト列が、ChunkDecoder で何文字になるかを返す関数。"""
+    name = codecs.lookup(encoding).name
+    if name == "utf-8":
+        # 不正なバイト列は ChunkDecoder と同じく捨てて数える（継続バイトを除くだけでは、
+        # latin-1 の "\xe9" のような続きの無い先頭バイトも1文字に数えてしまう）
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        return lambda seg: len(decoder.decode(seg))
+    if name in ("iso8859-1", "ascii"):
+        return len
+    raise ValueError(f"Unsupported encoding for offset mapping: {encoding}")
+
+
+def utf8_valid(data, start: int = 0, end: int = None) -> bool:
+    """
+    data[start:end] が UTF-8 として妥当か（コピーは _COUNT_BLOCK ずつ）。
+    範囲を分けて確かめるときのため、start の直後の継続バイト（前の範囲から続く文字）は飛ばし、
+    end をまたぐ文字は end + 3 バイトまで読んで確かめる（どの範囲も妥当なら全体も妥当）。
+    """
+    n = len(data)
+    end = n if end is None else min(end, n)
+    if start > 0:
+        for _ in range(3):
+            if start < n and data[start] & 0xC0 == 0x80:
+                start += 1
+    if start >= end:
+        return True  # この範囲から始まる文字は無い
+    stop = min(end + 3, n)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        for s in range(start, stop, _COUNT_BLOCK):
+            decoder.decode(bytes(data[s:min(s + _COUNT_BLOCK, stop)]))
+        if stop == n:
+            decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def decode_text(data, encoding: str) -> str:
+    """バイト列を read_text と同じ規則（改行は "\\n" に統一）で文字列に変換する。"""
+    return str(data, encoding).replace("\r\n", "\n").replace("\r", "\n")
+
+
+class ChunkDecoder:
+    """
+    チャンクに分けて読んだバイト列を、decode_text と同じ規則（改行は "\\n"）で順にデコードする。
+    チャンク境界で切れた多バイト文字と "\\r\\n" は次のチャンクに持ち越す。
+    """
+
+    def __init__(self, encoding: str):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="ignore")
+        self._pending_cr = ""
+
+    def decode(self, raw: bytes, final: bool = False) -> str:
+        chunk = self._pending_cr + self._decoder.decode(raw, final=final)
+        self._pending_cr = ""
+        if not final and chunk.endswith("\r"):
+            # 次のチャンクが "\n" で始まるかもしれないので持ち越す
+            chunk, self._pending_cr = chunk[:-1], "\r"
+        return chunk.replace("\r\n", "\n").replace("\r", "\n")
+
+    def get_state(self):
+        """持ち越している多バイト文字の途中と "\r" を返す。set_state に渡すと続きからデコードできる。"""
+        return self._decoder.getstate(), self._pending_cr
+
+    def set_state(self, state):
+        decoder_state, self._pending_cr = state
+        self._decoder.setstate(decoder_state)
+
+
+def char_offsets(data, byte_offsets, encoding: str) -> dict[int, int]:
+    """
+    バイトオフセットを decode_text 後の文字オフセットに変換する。
+    ヒット位置だけを昇順に数え上げるので、走査は全体で1回分で済む。
+    """
+    count = _char_counter(encoding)
+    mapping = {}
+    prev = chars = 0
+
+    for off in sorted(set(byte_offsets)):
+        for s in range(prev, off, _COUNT_BLOCK):
+            e = min(s + _COUNT_BLOCK, off)
+            chars += count(bytes(data[s:e]))
+            # "\r\n" は1文字として数える（前ブロック末尾の "\r" も含めて数える）
+            chars -= bytes(data[max(s - 1, 0):e]).count(b"\r\n")
+        mapping[off] = chars
+        prev = off
+
+    return mapping
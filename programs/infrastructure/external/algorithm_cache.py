@@ -0,0 +1,39 @@
+import threading
+from collections import OrderedDict
+from domain.interfaces.algorithm_cache import AlgorithmCache
+from infrastructure.external.pickle_directory import PickleDirectory, default_cache_dir
+
+
+class FileAlgorithmCache(AlgorithmCache):
+    """
+    構築済みアルゴリズム（AC オートマトン、BM/KMP の表など）をディスクに保存するキャッシュ。
+    キーの内容で名前を決めたファイルに pickle で保存し、手前にメモリ上の LRU を置く。
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = 256 * 1024 * 1024, memory_entries: int = 8):
+        self.store = PickleDirectory(directory or default_cache_dir("algorithms"), max_bytes)
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        algorithm = self.store.load(key)
+        if algorithm is not None:
+            self._remember(key, algorithm)
+        return algorithm
+
+    def put(self, key: str, algorithm):
+        self._remember(key, algorithm)
+        self.store.save(key, algorithm)
+
+    def _remember(self, key, algorithm):
+        with self._lock:
+            self._memory[key] = algorithm
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
@@ -0,0 +1,41 @@
+import json
+import os
+import threading
+from domain.interfaces.calibration_store import CalibrationStore
+from infrastructure.external.pickle_directory import default_cache_dir
+
+
+class FileCalibrationStore(CalibrationStore):
+    """起動時のベンチマークの係数を、マシン・インタプリタごとのキーで JSON の1ファイルに保存する。"""
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(default_cache_dir("calibration"), "coeffs.json")
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def get(self, key: str):
+        entry = self._load().get(key)
+        return entry if isinstance(entry, dict) and isinstance(entry.get("coeffs"), dict) else None
+
+    def put(self, key: str, entry: dict):
+        with self._lock:
+            entries = self._load()
+            entries[key] = entry
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(entries, f, ensure_ascii=False, indent=1)
+                os.replace(tmp, self.path)
+            except OSError:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
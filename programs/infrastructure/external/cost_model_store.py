@@ -0,0 +1,33 @@
+import json
+import os
+import threading
+from domain.interfaces.cost_model_store import CostModelStore
+from infrastructure.external.pickle_directory import default_cache_dir
+
+
+class FileCostModelStore(CostModelStore):
+    """コストモデルの観測を JSON の1ファイルに保存する（中身を読んで確かめられるように pickle にしない）。"""
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(default_cache_dir("cost_model"), "observations.json")
+
+    def load(self) -> list[dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                observations = json.load(f)
+        except (OSError, ValueError):
+            return []
+        return observations if isinstance(observations, list) else []
+
+    def save(self, observations: list[dict]):
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(observations, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
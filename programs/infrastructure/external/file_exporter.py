@@ -1,32 +1,247 @@
 import csv
-from openpyxl import Workbook
+import json
 import os
+from itertools import repeat
+
+
+class ResultExporter:
+    """
+    検索結果を1件の一致につき1行で書き出す。行は届いた順にそのまま書くので、メモリに全件を溜めない。
+
+    - write_matches(path, SearchResult): 一致を書く。run_search の result_callback にそのまま渡せる
+    - write_summary(path, data): ファイルの検索が終わったら、パターンごとの件数を書く（data は run_search の値）
+    - close(): ファイルを閉じる（with 文でも使える）
+    line_index（LineIndexUseCase のように lookup(path) で LineIndex を返すもの）を渡すと、一致ごとに行と桁も書く。
+    """
+
+    def write_matches(self, path, result):
+        pass
+
+    def write_summary(self, path, data):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _match_rows(path, result, line_index=None):
+    """
+    (ファイル, パターン, 位置, 距離) を一致ごとに返す。距離は Bitap 以外では None。
+    line_index を渡すと (ファイル, パターン, 位置, 距離, 行, 桁) を返す（行・桁は 1 始まり）。
+    """
+    index = None
+    for p, pos_list in result.positions.items():
+        dist_list = result.distances.get(p)
+        rows = zip(repeat(path), repeat(p), pos_list, dist_list if dist_list else repeat(None))
+        if line_index is None:
+            yield from rows
+            continue
+        if index is None and len(pos_list):
+            # 一致のあるファイルだけ索引を引く
+            index = line_index.lookup(path)
+        for row in rows:
+            yield row + index.locate(row[2])
+
+
+class CsvExporter(ResultExporter):
+    """一致の行（種別 match）と、ファイルごとの件数の行（種別 file）を1つの CSV に書く。"""
+    HEADER = ["種別", "ファイル", "パターン", "位置", "距離", "件数"]
+
+    def __init__(self, path, line_index=None):
+        self.line_index = line_index
+        self.f = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(self.HEADER + ["行", "桁"] if line_index else self.HEADER)
+
+    def write_matches(self, path, result):
+        self.writer.writerows(
+            ("match", file, p, pos, "" if dist is None else dist, "", *where)
+            for file, p, pos, dist, *where in _match_rows(path, result, self.line_index)
+        )
+
+    def write_summary(self, path, data):
+        blank = ("", "") if self.line_index else ()
+        self.writer.writerows(("file", path, p, "", "", c, *blank) for p, c in data["result"].counts.items())
+
+    def close(self):
+        self.f.close()
+
+
+class ExcelExporter(ResultExporter):
+    """
+    openpyxl の write-only モードで書く（行はワークブックに溜めずに一時ファイルへ流す）。
+    一致はシート「一致」、件数はシート「件数」。1シートの行数の上限を超えたら次のシートへ続ける。
+    """
+    MAX_ROWS = 1048576
+
+    def __init__(self, path, line_index=None):
+        from openpyxl import Workbook  # Excel に書き出すときだけ読み込む
+        self.path = path
+        self.line_index = line_index
+        self.wb = Workbook(write_only=True)
+        self.sheets = 0
+        self.matches = self._new_sheet()
+        self.summary = self.wb.create_sheet("件数")
+        self.summary.append(["ファイル", "パターン", "件数", "時間(ms)", "サイズ"])
+
+    def _new_sheet(self):
+        self.sheets += 1
+        ws = self.wb.create_sheet("一致" if self.sheets == 1 else f"一致 ({self.sheets})")
+        ws.append(["ファイル", "パターン", "位置", "距離"] + (["行", "桁"] if self.line_index else []))
+        self.rows = 1
+        return ws
+
+    def write_matches(self, path, result):
+        for row in _match_rows(path, result, self.line_index):
+            if self.rows == self.MAX_ROWS:
+                self.matches = self._new_sheet()
+            self.matches.append(row)
+            self.rows += 1
+
+    def write_summary(self, path, data):
+        for p, c in data["result"].counts.items():
+            self.summary.append([path, p, c, round(data["time"], 3), data["size"]])
+
+    def close(self):
+        self.wb.save(self.path)
+
+
+class JsonLinesExporter(ResultExporter):
+    """
+    {"type": "match", ...} を一致ごとに、{"type": "file", ...} をファイルごとに1行ずつ書く（CLI の出力と同じ形式）。
+    target にはパスか、書き込み用のテキストストリーム（閉じない）を渡す。
+    """
+
+    def __init__(self, target, line_index=None):
+        self.own = isinstance(target, (str, os.PathLike))
+        self.out = open(target, "w", encoding="utf-8") if self.own else target
+        self.line_index = line_index
+
+    def write_matches(self, path, result):
+        lines = []
+        for file, p, pos, dist, *where in _match_rows(path, result, self.line_index):
+            record = {"type": "match", "file": file, "pattern": p, "position": pos}
+            if dist is not None:
+                record["distance"] = dist
+            if where:
+                record["line"], record["column"] = where
+            lines.append(json.dumps(record, ensure_ascii=False))
+        if lines:
+            self.out.write("\n".join(lines) + "\n")
+            self.out.flush()
+
+    def write_summary(self, path, data):
+        record = {
+            "type": "file",
+            "file": path,
+            "counts": data["result"].counts,
+            "time_ms": round(data["time"], 3),
+            "size": data["size"]
+        }
+        if "engine" in data:
+            record["engine"] = data["engine"]
+        self.out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.out.flush()
+
+    def close(self):
+        if self.own:
+            self.out.close()
+
+
+class ArrowExporter(ResultExporter):
+    """
+    一致を (file, pattern, position, distance) の列で Parquet / Arrow IPC に書く（pyarrow が必要）。
+    line_index を渡すと line / column の列も足す。
+    BATCH_ROWS 行ずつ行グループ（レコードバッチ）にして書き足す。件数は一致の行から集計できるので書かない。
+    """
+    BATCH_ROWS = 65536
+
+    def __init__(self, path, fmt="parquet", line_index=None):
+        import pyarrow as pa  # 列指向の形式に書き出すときだけ読み込む
+        self.pa = pa
+        self.line_index = line_index
+        fields = [("file", pa.string()), ("pattern", pa.string()), ("position", pa.int64()), ("distance", pa.int32())]
+        if line_index:
+            fields += [("line", pa.int64()), ("column", pa.int64())]
+        self.schema = pa.schema(fields)
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+        self.columns = tuple([] for _ in self.schema)
+
+    def write_matches(self, path, result):
+        for row in _match_rows(path, result, self.line_index):
+            for column, value in zip(self.columns, row):
+                column.append(value)
+            if len(self.columns[0]) >= self.BATCH_ROWS:
+                self._flush()
+
+    def _flush(self):
+        if self.columns[0]:
+            self.writer.write_table(self.pa.Table.from_arrays(
+                [self.pa.array(column, type=field.type) for column, field in zip(self.columns, self.schema)],
+                schema=self.schema
+            ))
+        self.columns = tuple([] for _ in self.schema)
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
 
 class FileExporter:
-    @staticmethod
-    def export_csv(results, path):
-        with open(path, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(["ファイル名", "パターン", "件数", "位置"])
+    # 拡張子 -> 書き出し形式
+    FORMATS = {
+        ".csv": "csv",
+        ".xlsx": "excel",
+        ".jsonl": "jsonl",
+        ".parquet": "parquet",
+        ".arrow": "arrow",
+        ".feather": "arrow",
+    }
 
+    @classmethod
+    def open(cls, path, fmt=None, line_index=None) -> ResultExporter:
+        """形式（省略時は拡張子から判定）に合った ResultExporter を開く。line_index を渡すと行と桁も書く。"""
+        fmt = fmt or cls.FORMATS.get(os.path.splitext(path)[1].lower())
+        if fmt == "csv":
+            return CsvExporter(path, line_index)
+        if fmt == "excel":
+            return ExcelExporter(path, line_index)
+        if fmt == "jsonl":
+            return JsonLinesExporter(path, line_index)
+        if fmt in ("parquet", "arrow"):
+            return ArrowExporter(path, fmt, line_index)
+        raise ValueError(f"Unknown export format: {path}")
+
+    @classmethod
+    def export(cls, results, path, fmt=None, line_index=None):
+        """run_search の結果をまとめて書き出す。"""
+        with cls.open(path, fmt, line_index) as exporter:
             for file, data in results.items():
-                r = data["result"]
-                name = os.path.basename(file)
-                for p, c in r.counts.items():
-                    pos = r.positions.get(p, [])
-                    w.writerow([name, p, c, " ".join(map(str, pos))])
-
-    @staticmethod
-    def export_excel(results, path):
-        wb = Workbook()
-        ws = wb.active
-        ws.append(["ファイル名", "パターン", "件数", "位置"])
-
-        for file, data in results.items():
-            r = data["result"]
-            name = os.path.basename(file)
-            for p, c in r.counts.items():
-                pos = r.positions.get(p, [])
-                ws.append([name, p, c, " ".join(map(str, pos))])
-
-        wb.save(path)
+                exporter.write_matches(file, data["result"])
+                exporter.write_summary(file, data)
+
+    @classmethod
+    def export_csv(cls, results, path, line_index=None):
+        cls.export(results, path, "csv", line_index)
+
+    @classmethod
+    def export_excel(cls, results, path, line_index=None):
+        cls.export(results, path, "excel", line_index)
+
+    @classmethod
+    def export_jsonl(cls, results, path, line_index=None):
+        cls.export(results, path, "jsonl", line_index)
+
+    @classmethod
+    def export_parquet(cls, results, path, line_index=None):
+        cls.export(results, path, "parquet", line_index)
@@ -1,14 +1,76 @@
 import os
-from docx import Document
+import mmap
+import codecs
+import gzip
+import io
+import bz2
+import lzma
+import tarfile
+import threading
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
 from domain.interfaces.file_repository import FileRepository
-from typing import Iterator
+from domain.utils import ChunkDecoder, decode_text, utf8_valid
+from typing import Iterator, Optional
+
+# 圧縮形式は拡張子ではなく先頭のマジックバイトで判定する
+COMPRESSION_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+# アーカイブのメンバーは "bundle.zip!/var/log/app.log" のような仮想パスで表す
+ARCHIVE_SEPARATOR = "!/"
+
+
+def _zstandard():
+    try:
+        import zstandard  # .zst は zstandard が入っているときだけ展開する
+    except ImportError:
+        return None
+    return zstandard
+
 
 class LocalFileRepository(FileRepository):
+    # 展開後のサイズの見積もりに、先頭から展開してみるバイト数
+    SIZE_SAMPLE = 8 * 1024 * 1024
+    # 開いたままにしておくアーカイブの数（メンバーごとに開き直すと、tar.gz は毎回先頭から展開し直しになる）
+    ARCHIVE_CACHE = 8
+    # これ以下のメンバーは1度読んだら中身を覚えておく。判定・エンコーディング推定・検索で同じメンバーを
+    # 何度も先頭から開いても、tar.gz を先頭から展開し直さずに済む
+    MEMBER_CACHE = 8 * 1024 * 1024
+
+    def __init__(self):
+        self._content_sizes = {}  # (path, fingerprint) -> 展開後のサイズの見積もり（見積もりは入力のたびに呼ばれる）
+        self._archives = OrderedDict()  # path -> (stat, 種類, ZipFile / TarFile, RLock)
+        self._archives_lock = threading.Lock()
+        self._archives_pid = os.getpid()
+        self._member = (None, b"")  # 直前に読んだ小さなメンバー (仮想パスと stat, 中身)
+
+    def __getstate__(self):
+        # 並列検索のワーカーへ渡すとき、開いているアーカイブは渡さない（ワーカー側で開き直す）
+        state = self.__dict__.copy()
+        state["_archives"] = OrderedDict()
+        state["_member"] = (None, b"")
+        del state["_archives_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._archives_lock = threading.Lock()
+        self._archives_pid = os.getpid()
+
     def read_text(self, path: str) -> str:
-        ext = os.path.splitext(path)[1].lower()
-        if ext == ".docx":
+        if self._is_docx(path):
             return self._read_docx(path)
+        return self._read_plain(path)
 
+    def _read_plain(self, path: str) -> str:
+        if self.get_compression(path) or self._split_member(path):
+            data = b"".join(self.read_raw_chunks(path))
+            return decode_text(data, self._detect_encoding(data))
         try:
             with open(path, "r", encoding="utf-8") as f:
                 return f.read()
@@ -17,28 +79,263 @@ class LocalFileRepository(FileRepository):
             with open(path, "r", encoding="latin-1") as f:
                 return f.read()
 
+    def _is_docx(self, path: str) -> bool:
+        # アーカイブの中の .docx は python-docx で開けないので、ふつうのファイルとして読む
+        return os.path.splitext(path)[1].lower() == ".docx" and not self._split_member(path)
+
     def _read_docx(self, path: str) -> str:
         try:
+            from docx import Document  # python-docx は .docx を読むときだけ読み込む
             doc = Document(path)
             return "\n".join(p.text for p in doc.paragraphs)
         except:
-            return self.read_text(path)
+            return self._read_plain(path)
+
+    @contextmanager
+    def open_bytes(self, path: str, encoding: str = None):
+        # ファイルは mmap で開き、str へのデコードによるコピーを作らない
+        if self._is_docx(path):
+            yield self.read_text(path).encode("utf-8"), "utf-8"
+            return
+        if self.get_compression(path):
+            # 圧縮ファイル・アーカイブのメンバーは展開したものをメモリに載せる（検索はふつう read_chunks でストリーミングする）
+            data = b"".join(self.read_raw_chunks(path))
+            yield data, encoding or self._detect_encoding(data)
+            return
+
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b"", "utf-8"
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield data, encoding or self._detect_encoding(data)
+
+    def _detect_encoding(self, data) -> str:
+        # read_text と同じ判定（全体が UTF-8 として妥当か）をブロック単位で行う
+        return "utf-8" if utf8_valid(data) else "latin-1"
 
     def get_size(self, path: str) -> int:
+        member = self._split_member(path)
+        if member:
+            return self._member_info(*member)[0]
         return os.path.getsize(path)
 
-    def read_chunks(self, path: str, chunk_size: int = 1024*1024) -> Iterator[str]:
+    def get_compression(self, path: str) -> Optional[str]:
+        compression = self._stream_compression(path)
+        if compression is None and self._split_member(path):
+            return self._open_archive(self._split_member(path)[0])[1]  # "zip" / "tar"
+        return compression
+
+    def _stream_compression(self, path: str) -> Optional[str]:
+        with self._open_raw(path) as f:
+            head = f.read(6)
+        for magic, name in COMPRESSION_MAGIC:
+            if head.startswith(magic):
+                # zstandard が無ければ、これまでどおりバイナリとして扱う
+                return name if name != "zstd" or _zstandard() else None
+        return None
+
+    def get_content_size(self, path: str) -> int:
+        size = self.get_size(path)
+        if self.get_compression(path) in (None, "zip", "tar"):
+            return size
+
+        key = (path, self.get_fingerprint(path))
+        if key not in self._content_sizes:
+            self._content_sizes[key] = self._estimate_content_size(path, size)
+        return self._content_sizes[key]
+
+    def _estimate_content_size(self, path: str, size: int) -> int:
+        # 先頭 SIZE_SAMPLE バイトを展開したときの圧縮率で全体を見積もる（最後まで展開できれば正確な値）
+        position = [0]
+        content = 0
+        for raw in self.read_raw_chunks(path, on_progress=lambda pos: position.__setitem__(0, pos)):
+            content += len(raw)
+            if content >= self.SIZE_SAMPLE:
+                return int(size * content / max(position[0], 1))
+        return content
+
+    def get_fingerprint(self, path: str) -> tuple:
+        member = self._split_member(path)
+        if member:
+            # メンバーはアーカイブの更新時刻・inode と、メンバー自身のサイズで見分ける
+            st = os.stat(member[0])
+            return self._member_info(*member)[0], st.st_mtime_ns, st.st_ino
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def read_bytes(self, path: str, start: int, end: int) -> bytes:
+        with self._open_raw(path) as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def list_members(self, path: str) -> Optional[list[str]]:
+        if self._archive_kind(path) is None:
+            return None
+        _, kind, archive, lock = self._open_archive(path)
+        with lock:
+            if kind == "zip":
+                names = [info.filename for info in archive.infolist() if not info.is_dir()]
+            else:
+                names = [info.name for info in archive.getmembers() if info.isfile()]
+        return [path + ARCHIVE_SEPARATOR + name for name in names]
+
+    def _archive_kind(self, path: str) -> Optional[str]:
+        # .docx も zip だが、文書として本文を検索する
+        if os.path.splitext(path)[1].lower() == ".docx" or not os.path.isfile(path):
+            return None
+        if zipfile.is_zipfile(path):
+            return "zip"
+        if tarfile.is_tarfile(path):  # 圧縮された tar (.tar.gz など) も含む
+            return "tar"
+        return None
+
+    def _split_member(self, path: str) -> Optional[tuple]:
+        """仮想パスなら (アーカイブのパス, メンバー名)。実在するファイルのパスなら None。"""
+        if ARCHIVE_SEPARATOR not in path or os.path.exists(path):
+            return None
+        start = 0
+        while True:
+            i = path.find(ARCHIVE_SEPARATOR, start)
+            if i < 0:
+                return None
+            if os.path.isfile(path[:i]):
+                return path[:i], path[i + len(ARCHIVE_SEPARATOR):]
+            start = i + 1
+
+    def _open_archive(self, path: str):
+        """アーカイブを開いて (stat, 種類, ZipFile / TarFile, RLock) を返す。更新されていなければ開いたものを使い回す。"""
+        st = os.stat(path)
+        stamp = (st.st_size, st.st_mtime_ns, st.st_ino)
+        if self._archives_pid != os.getpid():
+            # fork で引き継いだアーカイブは親とファイル位置を共有しているので使わない（閉じるのも親に任せる）
+            self._archives = OrderedDict()
+            self._archives_lock = threading.Lock()
+            self._archives_pid = os.getpid()
+        with self._archives_lock:
+            cached = self._archives.get(path)
+            if cached and cached[0] == stamp:
+                self._archives.move_to_end(path)
+                return cached
+            if cached:
+                cached[2].close()
+
+            kind = self._archive_kind(path)
+            if kind is None:
+                raise FileNotFoundError(f"アーカイブではありません: {path}")
+            archive = zipfile.ZipFile(path) if kind == "zip" else tarfile.open(path)
+            self._archives[path] = (stamp, kind, archive, threading.RLock())
+            while len(self._archives) > self.ARCHIVE_CACHE:
+                self._archives.popitem(last=False)[1][2].close()
+            return self._archives[path]
+
+    def _member_info(self, archive_path: str, name: str) -> tuple:
+        """(メンバーのサイズ, ZipInfo / TarInfo)"""
+        _, kind, archive, lock = self._open_archive(archive_path)
+        with lock:
+            try:
+                if kind == "zip":
+                    info = archive.getinfo(name)
+                    return info.file_size, info
+                info = archive.getmember(name)
+                return info.size, info
+            except KeyError:
+                raise FileNotFoundError(f"{archive_path} に {name} はありません")
+
+    @contextmanager
+    def _open_raw(self, path: str):
+        """ディスク上のファイル、またはアーカイブのメンバーをバイナリのファイルとして開く（seek / tell 可）。"""
+        member = self._split_member(path)
+        if member is None:
+            with open(path, "rb") as f:
+                yield f
+            return
+
+        size, info = self._member_info(*member)
+        stamp, kind, archive, lock = self._open_archive(member[0])
+        key = (path, stamp)
+        # tar のメンバーはアーカイブのファイルを共有して seek しながら読むので、読み終わるまで他から読ませない
+        with lock:
+            if self._member[0] == key:
+                yield io.BytesIO(self._member[1])
+                return
+            with (archive.open(info) if kind == "zip" else archive.extractfile(info)) as f:
+                if size > self.MEMBER_CACHE:
+                    yield f
+                    return
+                self._member = (key, f.read())
+            yield io.BytesIO(self._member[1])
+
+    def sniff_encoding(self, path: str) -> str:
         # Use latin-1 for streaming if it might be binary
         # For simplicity and robustness in binary search, we use latin-1
         # if utf-8 fails or if we want to ensure no bytes are skipped.
-
-        encoding = "utf-8"
+        if self._is_docx(path):
+            return "utf-8"  # read_raw_chunks が UTF-8 にした本文を返す
         try:
-            with open(path, "rb") as f:
-                f.read(1024).decode("utf-8")
+            # 末尾で切れた多バイト文字は誤りとみなさない。圧縮ファイルは展開した先頭で判定する
+            head = next(self.read_raw_chunks(path, 1024), b"")
+            codecs.getincrementaldecoder("utf-8")().decode(head[:1024])
         except UnicodeDecodeError:
-            encoding = "latin-1"
+            return "latin-1"
+        return "utf-8"
+
+    def read_raw_chunks(self, path: str, chunk_size: int = 1024*1024, start: int = 0, end: int = None,
+                        on_progress=None) -> Iterator[bytes]:
+        if self._is_docx(path):
+            # .docx は本文を取り出して UTF-8 にしたものを1チャンクで返す（sniff_encoding も utf-8 を返す）
+            yield self.read_text(path).encode("utf-8")
+            if on_progress:
+                on_progress(self.get_size(path))
+            return
+
+        compression = self._stream_compression(path)
+        with self._open_raw(path) as f:
+            f.seek(start)
+            if compression:
+                # 展開しながら chunk_size ずつ返す（一時ファイルは作らない）。start は圧縮データ上の位置で、
+                # 追記されたメンバー（gzip）・ストリーム（bz2 / xz / zstd）の先頭になっている必要がある。
+                # end は無視して終端まで読む
+                with self._open_decompressed(f, compression) as stream:
+                    while True:
+                        raw = stream.read(chunk_size)
+                        if not raw:
+                            break
+                        if on_progress:
+                            on_progress(f.tell())
+                        yield raw
+                return
+
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                raw = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not raw:
+                    break
+                if remaining is not None:
+                    remaining -= len(raw)
+                if on_progress:
+                    on_progress(f.tell())
+                yield raw
+
+    @staticmethod
+    def _open_decompressed(f, compression):
+        # どれも複数メンバー（ストリーム）を連結したファイルを最後まで読む
+        if compression == "gzip":
+            return gzip.GzipFile(fileobj=f, mode="rb")
+        if compression == "bz2":
+            return bz2.BZ2File(f, mode="rb")
+        if compression == "xz":
+            return lzma.LZMAFile(f, mode="rb")
+        return _zstandard().ZstdDecompressor().stream_reader(f, read_across_frames=True, closefd=False)
 
-        with open(path, "r", encoding=encoding, errors="ignore") as f:
-            while chunk := f.read(chunk_size):
+    def read_chunks(self, path: str, chunk_size: int = 1024*1024, start: int = 0, end: int = None,
+                    encoding: str = None, on_progress=None) -> Iterator[str]:
+        # バイト範囲 [start, end) を読み、改行は read_text と同じく "\n" に揃える
+        decoder = ChunkDecoder(encoding or self.sniff_encoding(path))
+        for raw in self.read_raw_chunks(path, chunk_size, start, end, on_progress):
+            chunk = decoder.decode(raw)
+            if chunk:
                 yield chunk
+        chunk = decoder.decode(b"", final=True)
+        if chunk:
+            yield chunk
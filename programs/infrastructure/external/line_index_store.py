@@ -0,0 +1,15 @@
+from domain.interfaces.line_index_store import LineIndexStore
+from infrastructure.external.pickle_directory import PickleDirectory, default_cache_dir
+
+
+class FileLineIndexStore(LineIndexStore):
+    """ファイルごとの改行の索引をディスクに保存する。"""
+
+    def __init__(self, directory: str = None, max_bytes: int = 256 * 1024 * 1024):
+        self.store = PickleDirectory(directory or default_cache_dir("line_index"), max_bytes)
+
+    def get(self, key: str):
+        return self.store.load(key)
+
+    def put(self, key: str, index):
+        self.store.save(key, index)
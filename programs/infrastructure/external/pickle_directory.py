@@ -0,0 +1,105 @@
+import os
+import pickle
+import threading
+
+
+def default_cache_dir(name: str) -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "log_check", name)
+
+
+class PickleDirectory:
+    """
+    キーごとに1ファイルの pickle を保存するディレクトリ。
+    書き込みは一時ファイルからの置き換えで行い、合計サイズが max_bytes を超えたら
+    最後に使われたのが古いものから消す。
+    合計サイズは保存のたびに差分で更新し、ディレクトリ全体を見るのは初回と max_bytes を超えたときだけ。
+    """
+    SUFFIX = ".pickle"
+    # 超えたら max_bytes のこの割合まで消す（上限ぎわで保存のたびに全体を見直さないため）
+    LOW_WATER = 0.9
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # 合計サイズの見込み（None はまだ数えていない）。他のプロセスの書き込みは _evict で数え直すときに反映する
+        self._total = None
+        self._lock = threading.Lock()
+
+    def load(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)  # LRU 順のため最終使用時刻を更新
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # 古い形式や壊れたファイルはミス扱いにして消す
+            self._remove(path)
+            return None
+        return value
+
+    def save(self, key: str, value):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                size = f.tell()
+            old = self._size(path)
+            os.replace(tmp, path)
+        except OSError:
+            self._remove(tmp)
+            return
+
+        with self._lock:
+            if self._total is None:
+                self._total = self._scan_total()
+            else:
+                self._total += size - old
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        return entries
+
+    def _scan_total(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            target = self.max_bytes * self.LOW_WATER
+            for _, size, name in sorted(entries):
+                if total <= target:
+                    break
+                self._remove(os.path.join(self.directory, name))
+                total -= size
+        self._total = total
+
+    def _size(self, path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
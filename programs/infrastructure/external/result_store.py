@@ -0,0 +1,15 @@
+from domain.interfaces.result_store import ResultStore
+from infrastructure.external.pickle_directory import PickleDirectory, default_cache_dir
+
+
+class FileResultStore(ResultStore):
+    """ファイルごとの検索結果とストリーム状態をディスクに保存する。"""
+
+    def __init__(self, directory: str = None, max_bytes: int = 1024 * 1024 * 1024):
+        self.store = PickleDirectory(directory or default_cache_dir("results"), max_bytes)
+
+    def get(self, key: str):
+        return self.store.load(key)
+
+    def put(self, key: str, entry: dict):
+        self.store.save(key, entry)
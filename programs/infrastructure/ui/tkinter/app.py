@@ -5,11 +5,13 @@ import csv
 import os
 import threading
 
-from .result_window import ResultWindow
-from .progress_window import ProgressWindow
 from .splash import SplashScreen
+from use_cases.progress import ProgressChannel
 
 class SearchApp(TkinterDnD.Tk):
+    # 進捗の表示を更新する間隔 (ms)
+    PROGRESS_INTERVAL = 100
+
     def __init__(self, controller):
         super().__init__()
         self.controller = controller
@@ -22,12 +24,12 @@ class SearchApp(TkinterDnD.Tk):
         self.title("String Search App (Refactored)")
         self.geometry("600x600")
         self.build()
-        self.after(500, self.run_benchmark)
+        self.after_idle(self.start)
 
-    def run_benchmark(self):
-        print("ベンチマーク中...（1〜2秒）")
-        results = self.controller.run_benchmark()
-        print("ベンチマーク完了:", results)
+    def start(self):
+        # 保存済みの係数があればそれで見積もり、測り直しは裏で行って終わったら見積もりを更新する
+        if self.controller.calibrate(on_done=lambda coeffs: self.after(0, self.update_estimate)):
+            print("ベンチマークをバックグラウンドで実行中...")
         self.update_estimate()
 
         self.splash.destroy()
@@ -60,7 +62,10 @@ class SearchApp(TkinterDnD.Tk):
             ("bm", "Boyer-Moore"),
             ("kmp", "KMP"),
             ("ac", "Aho–Corasick"),
-            ("bitap", "Bitap（Fuzzy!）")
+            ("native", "Native（C エンジン）"),
+            ("vector", "Vectorized（NumPy）"),
+            ("bitap", "Bitap（Fuzzy!）"),
+            ("auto", "自動（ファイルごとに選ぶ）")
         ]
         for key, text in algos:
             f = ttk.Frame(frame)
@@ -165,8 +170,13 @@ class SearchApp(TkinterDnD.Tk):
             messagebox.showerror("エラー", "検索ワードを入力してください")
             return
 
+        from .progress_window import ProgressWindow  # ttkbootstrap は最初の検索で読み込む
+
         self.progress_window = ProgressWindow(self, self.file_paths)
         self.search_button.config(state="disabled")
+        # 検索スレッドは進捗をチャネルに書くだけにし、画面は決まった間隔で読みに行く
+        self.progress = ProgressChannel()
+        self.after(self.PROGRESS_INTERVAL, self.poll_progress)
 
         def task():
             try:
@@ -175,24 +185,32 @@ class SearchApp(TkinterDnD.Tk):
                     self.algorithm.get(),
                     patterns,
                     self.bitap_distance.get(),
-                    progress_callback=self.handle_progress
+                    progress_callback=self.progress
                 )
+                self.progress.close()
                 self.after(0, lambda: self.finish_search(results))
             except Exception as e:
+                self.progress.close()
                 self.after(0, lambda: messagebox.showerror("エラー", f"検索中にエラーが発生しました: {e}"))
                 self.after(0, self.reset_ui)
 
         threading.Thread(target=task, daemon=True).start()
 
-    def handle_progress(self, file_path, global_current, global_total, file_current, file_total):
-        self.after(0, lambda: self.progress_window.update_file_progress(file_path, file_current, file_total))
-        self.after(0, lambda: self.progress_window.update_overall_progress(global_current, global_total))
+    def poll_progress(self):
+        snapshot = self.progress.poll()
+        if snapshot and self.progress_window.winfo_exists():
+            self.progress_window.update_snapshot(snapshot)
+        if not (snapshot and snapshot.done):
+            self.after(self.PROGRESS_INTERVAL, self.poll_progress)
 
     def finish_search(self, results):
         self.reset_ui()
         if hasattr(self, 'progress_window'):
             self.progress_window.destroy()
-        ResultWindow(self, results)
+        from .result_window import ResultWindow
+
+        search_use_case = self.controller.search_use_case
+        ResultWindow(self, results, search_use_case.file_repo, search_use_case.line_indexes)
 
     def reset_ui(self):
         self.search_button.config(state="normal")
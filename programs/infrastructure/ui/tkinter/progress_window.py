@@ -70,3 +70,10 @@ class ProgressWindow(tb.Toplevel):
         progress = (current / total) * 100 if total > 0 else 100
         self.overall_progress["value"] = progress
         self.overall_label.config(text=f"全体の進捗: {progress:.1f}%")
+
+    def update_snapshot(self, snapshot):
+        """ProgressChannel.poll の結果をまとめて反映する（変わったファイルの分だけ）。"""
+        for path, (current, total) in snapshot.files.items():
+            self.update_file_progress(path, current, total)
+        self.update_overall_progress(snapshot.current, snapshot.total)
+        self.overall_label.config(text=f"全体の進捗: {snapshot.format()}")
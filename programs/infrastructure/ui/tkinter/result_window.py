@@ -1,16 +1,44 @@
 import tkinter as tk
 import ttkbootstrap as tb
-import os
+from concurrent.futures import ThreadPoolExecutor
+from adapters.presenters.result_table import ResultTable
 from infrastructure.external.file_exporter import FileExporter
 from tkinter import filedialog, messagebox
 
 class ResultWindow(tb.Toplevel):
-    def __init__(self, master, results):
+    """
+    1件の一致を1行で表示する結果画面。Treeview には見えている行だけを入れ、
+    スクロールのたびに ResultTable から入れ直す（何百万件でも行を全部は作らない）。
+    並べ替え・絞り込みと、行番号・前後の文字列の読み込みは別スレッドで行う。
+    """
+    ROWS = 30
+    COLUMNS = {
+        "file": ("ファイル名", 200),
+        "pattern": ("パターン", 120),
+        "line": ("行", 70),
+        "pos": ("位置", 100),
+        "distance": ("距離", 50),
+        "context": ("前後の文字列", 420),
+    }
+    # 見出しをクリックしたときの並べ替えのキー（行番号は位置の順と同じ）
+    SORT_KEYS = {"file": "file", "pattern": "pattern", "line": "position", "pos": "position", "distance": "distance"}
+
+    def __init__(self, master, results, file_repo=None, line_indexes=None):
         super().__init__(master)
         self.results = results
+        self.table = ResultTable(results, file_repo, line_indexes)
+        self.top = 0
+        self.visible = self.ROWS
+        self.sort_key = None
+        self.reverse = False
+        self.request = 0  # 最後に頼んだ並べ替え・絞り込み（古い結果は捨てる）
+        self.loading = set()  # 読み込み中の (ファイル, 位置)
+        self.worker = ThreadPoolExecutor(max_workers=1)
         self.title("RESULT")
         self.geometry("1000x700")
         self.build()
+        self.bind("<Destroy>", self.on_destroy)
+        self.render()
 
     def build(self):
         btn_frame = tb.Frame(self)
@@ -18,45 +46,177 @@ class ResultWindow(tb.Toplevel):
 
         tb.Button(btn_frame, text="CSV", command=self.export_csv).pack(side="left")
         tb.Button(btn_frame, text="Excel", command=self.export_excel).pack(side="left")
+        tb.Button(btn_frame, text="JSONL", command=self.export_jsonl).pack(side="left")
+        tb.Button(btn_frame, text="Parquet", command=self.export_parquet).pack(side="left")
+
+        self.filter_text = tk.StringVar()
+        entry = tb.Entry(btn_frame, textvariable=self.filter_text, width=30)
+        entry.pack(side="left", padx=(20, 0))
+        entry.bind("<Return>", lambda e: self.update_view())
+        tb.Button(btn_frame, text="絞り込み", command=self.update_view).pack(side="left")
+
+        self.status = tb.Label(btn_frame, text="")
+        self.status.pack(side="right", padx=10)
 
         container = tb.Frame(self)
         container.pack(fill="both", expand=True)
 
-        self.tree = tb.Treeview(
-            container,
-            columns=("file", "pattern", "count", "pos", "distance"),
-            show="headings"
-        )
-        self.tree.pack(fill="both", expand=True)
-
-        self.tree.heading("file", text="ファイル名")
-        self.tree.heading("pattern", text="パターン")
-        self.tree.heading("count", text="件数")
-        self.tree.heading("pos", text="位置")
-        self.tree.heading("distance", text="距離")
-
-        for file, data in self.results.items():
-            r = data["result"]
-            name = os.path.basename(file)
-
-            for p, c in r.counts.items():
-                pos = r.positions.get(p, [])
-                dist = r.distances.get(p, None)
-
-                self.tree.insert(
-                    "",
-                    "end",
-                    values=(name, p, c, pos, dist)
-                )
+        self.tree = tb.Treeview(container, columns=tuple(self.COLUMNS), show="headings", height=self.ROWS)
+        for column, (text, width) in self.COLUMNS.items():
+            self.tree.column(column, width=width, stretch=column == "context")
+            if column in self.SORT_KEYS:
+                self.tree.heading(column, text=text, command=lambda c=column: self.sort_by(c))
+            else:
+                self.tree.heading(column, text=text)
+
+        # スクロールバーは Treeview ではなく表全体の行数に対して動かす
+        self.scrollbar = tb.Scrollbar(container, orient="vertical", command=self.on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_to(self.top - 3 * (1 if e.delta > 0 else -1)))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_to(self.top - 3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_to(self.top + 3))
+
+    # ---- 表示 ---------------------------------------------------------------
+
+    def render(self):
+        """見えている行だけを Treeview に入れ直す。"""
+        rows = self.table.rows(self.top, self.top + self.visible)
+        self.tree.delete(*self.tree.get_children())
+        missing = []
+        for file, p, pos, dist, count in rows:
+            if pos is None:
+                values = (ResultTable.display_name(file), p, "", "", "", f"（位置なし: {count} 件）")
+            else:
+                context = self.table.get_context(file, pos)
+                if context is None:
+                    missing.append((file, p, pos, dist, count))
+                    context = ("", "…")
+                line, text = context
+                values = (ResultTable.display_name(file), p, "" if line is None else line, pos,
+                          "" if dist is None else dist, text)
+            self.tree.insert("", "end", values=values)
+
+        total = len(self.table)
+        if total:
+            self.scrollbar.set(self.top / total, min(self.top + self.visible, total) / total)
+        else:
+            self.scrollbar.set(0, 1)
+        self.status.config(text=f"{self.table.total:,} 件中 {total:,} 件")
+        self.load_context(missing)
+
+    def load_context(self, rows):
+        rows = [row for row in rows if (row[0], row[2]) not in self.loading]
+        if not rows or self.table.file_repo is None:
+            return
+        keys = {(row[0], row[2]) for row in rows}
+        self.loading |= keys
+
+        future = self.worker.submit(self.table.load_context, rows)
+        future.add_done_callback(lambda f: self.post(lambda: self.context_loaded(keys)))
+
+    def context_loaded(self, keys):
+        self.loading -= keys
+        self.render()
+
+    def scroll_to(self, top):
+        top = max(0, min(top, len(self.table) - self.visible))
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    def on_scroll(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.table)))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self.visible if args[2] == "pages" else 1)
+            self.scroll_to(self.top + step)
+
+    def on_resize(self, event):
+        # 見出しの分を除いた高さに入る行数
+        height = int(tb.Style().lookup("Treeview", "rowheight") or 20)
+        visible = max(1, (event.height - height) // height)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    # ---- 並べ替え・絞り込み -------------------------------------------------
+
+    def sort_by(self, column):
+        key = self.SORT_KEYS[column]
+        self.reverse = not self.reverse if key == self.sort_key else False
+        self.sort_key = key
+        self.update_view()
+
+    def update_view(self):
+        self.request += 1
+        request = self.request
+        self.status.config(text="並べ替え中...")
+        future = self.worker.submit(self.table.build_view, self.sort_key, self.reverse, self.filter_text.get())
+
+        future.add_done_callback(lambda f: self.post(lambda: self.apply_view(request, f)))
+
+    def post(self, callback):
+        """別スレッドから UI スレッドへ処理を渡す（画面を閉じた後なら捨てる）。"""
+        try:
+            self.after(0, callback)
+        except (tk.TclError, RuntimeError):
+            pass
+
+    def apply_view(self, request, future):
+        if request != self.request:
+            return
+        try:
+            view = future.result()
+        except Exception as e:
+            messagebox.showerror("エラー", f"並べ替えに失敗しました: {e}", parent=self)
+            return
+        self.table.set_view(view)
+        self.top = 0
+        self.render()
+
+    def on_destroy(self, event):
+        if event.widget is self:
+            self.worker.shutdown(wait=False)
+
+    # ---- 書き出し -----------------------------------------------------------
 
     def export_csv(self):
-        path = filedialog.asksaveasfilename(defaultextension=".csv")
-        if path:
-            FileExporter.export_csv(self.results, path)
-            messagebox.showinfo("完了", "CSV にエクスポートしました", parent=self)
+        self.export("csv", "CSV", ".csv")
 
     def export_excel(self):
-        path = filedialog.asksaveasfilename(defaultextension=".xlsx")
-        if path:
-            FileExporter.export_excel(self.results, path)
-            messagebox.showinfo("完了", "Excel にエクスポートしました", parent=self)
+        self.export("excel", "Excel", ".xlsx")
+
+    def export_jsonl(self):
+        self.export("jsonl", "JSONL", ".jsonl")
+
+    def export_parquet(self):
+        self.export("parquet", "Parquet", ".parquet")
+
+    def export(self, fmt, label, extension):
+        """
+        書き出しは別スレッドで行う（行番号を出すときはファイルを読んで索引を作ることがあるので、画面を止めない）。
+        終わったら UI スレッドで知らせる。
+        """
+        path = filedialog.asksaveasfilename(defaultextension=extension)
+        if not path:
+            return
+        self.status.config(text=f"{label} に書き出し中...")
+        write = getattr(FileExporter, f"export_{fmt}")
+        future = self.worker.submit(write, self.results, path, self.table.line_indexes)
+        future.add_done_callback(lambda f: self.post(lambda: self.exported(fmt, label, f)))
+
+    def exported(self, fmt, label, future):
+        self.status.config(text=f"{self.table.total:,} 件中 {len(self.table):,} 件")
+        try:
+            future.result()
+        except ImportError:
+            module = "pyarrow" if fmt == "parquet" else "openpyxl"
+            messagebox.showerror("エラー", f"{label} の書き出しには {module} が必要です", parent=self)
+            return
+        except Exception as e:
+            messagebox.showerror("エラー", f"{label} の書き出しに失敗しました: {e}", parent=self)
+            return
+        messagebox.showinfo("完了", f"{label} にエクスポートしました", parent=self)
@@ -1,21 +1,36 @@
 from infrastructure.ui.tkinter.app import SearchApp
 from infrastructure.external.file_repository import LocalFileRepository
+from infrastructure.external.algorithm_cache import FileAlgorithmCache
+from infrastructure.external.result_store import FileResultStore
+from infrastructure.external.cost_model_store import FileCostModelStore
+from infrastructure.external.calibration_store import FileCalibrationStore
+from infrastructure.external.line_index_store import FileLineIndexStore
 from use_cases.search_files import SearchFilesUseCase
+from use_cases.line_index import LineIndexUseCase
 from use_cases.benchmark import BenchmarkUseCase
 from use_cases.estimation import EstimationUseCase
+from use_cases.cost_model import CostModel
+from use_cases.parallel_search import ParallelSearchUseCase
+from use_cases.pipeline_search import PipelineSearchUseCase
 from adapters.controllers.search_controller import SearchController
 
 def main():
     # Setup dependencies
     file_repo = LocalFileRepository()
+    algorithm_cache = FileAlgorithmCache()
+    result_store = FileResultStore()
 
     # Setup use cases
-    search_use_case = SearchFilesUseCase(file_repo)
+    line_index_use_case = LineIndexUseCase(file_repo, FileLineIndexStore())
+    search_use_case = SearchFilesUseCase(file_repo, result_store, line_index_use_case)
     benchmark_use_case = BenchmarkUseCase()
-    estimation_use_case = EstimationUseCase()
+    estimation_use_case = EstimationUseCase(file_repo, CostModel(FileCostModelStore()))
+    parallel_search_use_case = ParallelSearchUseCase(search_use_case)
+    pipeline_search_use_case = PipelineSearchUseCase(search_use_case)
 
     # Setup controller
-    controller = SearchController(search_use_case, benchmark_use_case, estimation_use_case)
+    controller = SearchController(search_use_case, benchmark_use_case, estimation_use_case, parallel_search_use_case, algorithm_cache,
+                                  pipeline_search_use_case, FileCalibrationStore())
 
     # Start UI
     app = SearchApp(controller)
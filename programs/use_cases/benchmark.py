@@ -1,7 +1,13 @@
 import time
+import math
+import platform
 import random
+import statistics
 import string
+import sys
+import tracemalloc
 from domain.interfaces.search_algorithm import SearchAlgorithm
+from use_cases import benchmark_corpora
 
 class BenchmarkUseCase:
     def execute(self, algorithms: dict[str, SearchAlgorithm]):
@@ -22,3 +28,122 @@ class BenchmarkUseCase:
             results[key] = elapsed / size_kb
 
         return results
+
+    def run_suite(self, algorithm_factory, engines: list[str], corpora: list[str], sizes: list[int],
+                  pattern_counts: list[int], lengths: list[int], distances: list[int] = (1,),
+                  repeat: int = 5, warmup: int = 1, seed: int = 0, budget: float = 10.0, on_case=None) -> dict:
+        """
+        コーパス × 大きさ × 検索ワードの数 × 長さ × エンジン（Bitap は距離も）の組み合わせをすべて測る。
+
+        algorithm_factory(key, patterns, distance) で探索器を作り、warmup 回空回ししてから repeat 回測る。
+        1回が budget 秒を超える組み合わせは、空回しの1回だけを記録して飛ばす。
+        on_case(case) には組み合わせを測り終えるたびに結果を渡す。
+        戻り値は {"meta": 実行環境と設定, "cases": [組み合わせごとの結果]}（そのまま JSON にできる）。
+        """
+        config = {
+            "engines": list(engines), "corpora": list(corpora), "sizes": list(sizes),
+            "pattern_counts": list(pattern_counts), "lengths": list(lengths), "distances": list(distances),
+            "repeat": repeat, "warmup": warmup, "seed": seed, "budget": budget
+        }
+        cases = []
+        for corpus in corpora:
+            for size in sizes:
+                text = benchmark_corpora.generate(corpus, size, seed)
+                for count in pattern_counts:
+                    for length in lengths:
+                        patterns = benchmark_corpora.make_patterns(corpus, text, count, length, seed)
+                        for engine in engines:
+                            for distance in (distances if engine == "bitap" else [None]):
+                                case = {
+                                    "engine": engine, "corpus": corpus, "size": size,
+                                    "patterns": count, "length": length, "distance": distance
+                                }
+                                build = lambda: algorithm_factory(engine, patterns, distance)
+                                case.update(self._measure(build, text, repeat, warmup, budget))
+                                cases.append(case)
+                                if on_case:
+                                    on_case(case)
+
+        return {"meta": self._environment(config), "cases": cases}
+
+    def _measure(self, build, text, repeat, warmup, budget):
+        start = time.perf_counter()
+        algorithm = build()
+        algorithm.prepare()
+        measured = {"build_ms": (time.perf_counter() - start) * 1000}
+
+        times = []
+        for i in range(max(warmup, 1) + repeat):
+            start = time.perf_counter()
+            r = algorithm.search(text)
+            elapsed = time.perf_counter() - start
+            if i < max(warmup, 1):
+                if elapsed > budget:
+                    # 遅すぎる組み合わせは空回しの1回だけを記録する
+                    measured.update(skipped="budget", times_ms=[elapsed * 1000], hits=sum(r.counts.values()))
+                    return measured
+                continue
+            times.append(elapsed)
+
+        # メモリのピークは時間を測る回とは別に1回だけ（tracemalloc を有効にすると遅くなる）
+        tracemalloc.start()
+        try:
+            algorithm.search(text)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        ordered = sorted(times)
+        median = statistics.median(ordered)
+        measured.update(
+            hits=sum(r.counts.values()),
+            median_ms=median * 1000,
+            p95_ms=ordered[math.ceil(len(ordered) * 0.95) - 1] * 1000,
+            min_ms=ordered[0] * 1000,
+            mb_per_s=len(text) / median / (1024 * 1024) if median > 0 else None,
+            peak_bytes=peak,
+            times_ms=[t * 1000 for t in times]
+        )
+        return measured
+
+    @staticmethod
+    def _environment(config):
+        try:
+            import numpy
+            numpy_version = numpy.__version__
+        except ImportError:
+            numpy_version = None
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "numpy": numpy_version,
+            "config": config
+        }
+
+
+def _case_key(case):
+    return tuple(case[k] for k in ("engine", "corpus", "size", "patterns", "length", "distance"))
+
+
+def compare_runs(baseline: dict, current: dict, threshold: float = 0.1) -> list[dict]:
+    """
+    2回の run_suite の結果を比べ、中央値が threshold（割合）より遅くなった組み合わせと、
+    一致件数が変わった組み合わせを返す。片方にしか無い組み合わせ・飛ばした組み合わせは比べない。
+    """
+    before = {_case_key(case): case for case in baseline["cases"]}
+    changes = []
+    for case in current["cases"]:
+        old = before.get(_case_key(case))
+        if old is None or "skipped" in old or "skipped" in case:
+            continue
+        key = dict(zip(("engine", "corpus", "size", "patterns", "length", "distance"), _case_key(case)))
+        if old["hits"] != case["hits"]:
+            changes.append(dict(key, kind="hits", before=old["hits"], after=case["hits"]))
+        ratio = case["median_ms"] / old["median_ms"] if old["median_ms"] > 0 else 1.0
+        if ratio > 1 + threshold:
+            changes.append(dict(key, kind="slower", before=old["median_ms"], after=case["median_ms"], ratio=ratio))
+    return changes
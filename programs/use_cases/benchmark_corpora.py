@@ -0,0 +1,144 @@
+"""
+ベンチマーク用のテキスト（コーパス）と検索ワードを作る。同じ seed なら毎回同じものができる。
+
+- syslog: sshd / nginx / cron などの syslog 風の行（出現の多いプロセス・メッセージに偏りがある）
+- json: 1行1レコードの JSON ログ
+- japanese: 日本語の文章
+- binary: ランダムなバイト列（latin-1 で文字列にしたもの）
+- adversarial: "AAAA…" だけのテキスト。検索ワードは "AAA…B" のように最後の1文字だけ違う（素朴な照合の最悪ケース）
+- random: 英数字の一様乱数（起動時の簡易ベンチマークと同じ）
+"""
+import json
+import math
+import random
+import string
+
+CORPORA = ("syslog", "json", "japanese", "binary", "adversarial", "random")
+
+# これより大きいコーパスは、この大きさまで作ったものを繰り返して埋める（生成に時間をかけない）
+UNIQUE_SIZE = 8 * 1024 * 1024
+
+_HOSTS = ["web01", "web02", "db01", "batch", "gw"]
+_PROCS = [("sshd", 30), ("nginx", 40), ("kernel", 8), ("CRON", 10), ("app", 25), ("systemd", 5)]
+_USERS = ["root", "admin", "deploy", "okas", "guest", "backup"]
+_LEVELS = [("INFO", 70), ("DEBUG", 15), ("WARN", 10), ("ERROR", 4), ("FATAL", 1)]
+_JA_WORDS = [
+    "検索", "ログ", "ファイル", "文字列", "処理", "結果", "時間", "確認", "設定", "接続",
+    "サーバー", "エラー", "警告", "完了", "開始", "終了", "利用者", "要求", "応答", "障害",
+    "です", "ます", "した", "して", "から", "まで", "により", "について", "では", "への",
+]
+
+
+def _weighted(items):
+    return [item for item, _ in items], [weight for _, weight in items]
+
+
+def _ip(rng):
+    return f"10.{rng.randrange(4)}.{rng.randrange(256)}.{rng.randrange(256)}"
+
+
+def _syslog_line(rng, procs):
+    proc = rng.choices(*procs)[0]
+    stamp = f"Oct {rng.randrange(1, 29):2d} {rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}"
+    head = f"{stamp} {rng.choice(_HOSTS)} {proc}[{rng.randrange(100, 40000)}]: "
+    if proc == "sshd":
+        body = rng.choice([
+            f"Accepted password for {rng.choice(_USERS)} from {_ip(rng)} port {rng.randrange(1024, 65535)} ssh2",
+            f"Failed password for invalid user {rng.choice(_USERS)} from {_ip(rng)} port {rng.randrange(1024, 65535)} ssh2",
+            f"Connection closed by {_ip(rng)} port {rng.randrange(1024, 65535)} [preauth]",
+        ])
+    elif proc == "nginx":
+        body = (f'{_ip(rng)} - - "GET /api/v1/items/{rng.randrange(100000)} HTTP/1.1" '
+                f'{rng.choice([200, 200, 200, 304, 404, 500])} {rng.randrange(50, 90000)}')
+    elif proc == "CRON":
+        body = f"({rng.choice(_USERS)}) CMD (/usr/local/bin/job-{rng.randrange(20)}.sh)"
+    elif proc == "app":
+        level = rng.choices(*_weighted(_LEVELS))[0]
+        body = f"{level} request_id={rng.getrandbits(64):016x} elapsed_ms={rng.randrange(1, 5000)}"
+    else:
+        body = f"message {rng.getrandbits(32):08x}"
+    return head + body
+
+
+def _json_line(rng):
+    record = {
+        "ts": f"2024-10-{rng.randrange(1, 29):02d}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}Z",
+        "level": rng.choices(*_weighted(_LEVELS))[0],
+        "user": rng.choice(_USERS),
+        "path": f"/api/v1/items/{rng.randrange(100000)}",
+        "status": rng.choice([200, 200, 200, 201, 404, 500]),
+        "latency_ms": rng.randrange(1, 5000),
+    }
+    return json.dumps(record)
+
+
+def _japanese_line(rng):
+    words = rng.choices(_JA_WORDS, k=rng.randrange(5, 30))
+    return "".join(words) + "。"
+
+
+def generate(kind: str, size: int, seed: int = 0) -> str:
+    """kind のコーパスを size 文字ぶん作る。"""
+    rng = random.Random(f"{kind}:{seed}")
+    unique = min(size, UNIQUE_SIZE)
+
+    if kind == "random":
+        text = "".join(rng.choices(string.ascii_letters + string.digits, k=unique))
+    elif kind == "binary":
+        text = rng.randbytes(unique).decode("latin-1")
+    elif kind == "adversarial":
+        text = "A" * unique
+    else:
+        procs = _weighted(_PROCS)
+        make = {
+            "syslog": lambda: _syslog_line(rng, procs),
+            "json": lambda: _json_line(rng),
+            "japanese": lambda: _japanese_line(rng),
+        }.get(kind)
+        if make is None:
+            raise ValueError(f"Unknown corpus: {kind}")
+        lines = []
+        length = 0
+        while length < unique:
+            line = make()
+            lines.append(line)
+            length += len(line) + 1
+        text = "\n".join(lines)
+
+    return (text * -(-size // len(text)))[:size] if text else text
+
+
+def make_patterns(kind: str, text: str, count: int, length: int, seed: int = 0, hit_ratio: float = 0.5) -> list[str]:
+    """
+    count 個の長さ length の検索ワード。hit_ratio の割合はテキストから切り出した（必ず一致する）もの、
+    残りはテキストに出てくる文字で作ったランダムな文字列（ほとんど一致しない）。
+    """
+    rng = random.Random(f"{kind}:{seed}:{count}:{length}")
+    if kind == "adversarial":
+        # "AAA…A" + 番号（B〜Z の文字）。末尾まで比べないと不一致がわからない
+        patterns = []
+        for i in range(count):
+            tag = ""
+            n = i
+            while True:
+                tag = chr(ord("B") + n % 25) + tag
+                n //= 25
+                if n == 0:
+                    break
+            patterns.append("A" * max(length - len(tag), 0) + tag)
+        return patterns
+
+    sample = text[:1024 * 1024]
+    alphabet = sorted(set(sample) - {"\n"})
+    hits = math.ceil(count * hit_ratio)
+    patterns = {}
+    attempts = 0
+    while len(patterns) < hits and attempts < count * 20:
+        attempts += 1
+        start = rng.randrange(max(len(sample) - length, 1))
+        p = sample[start:start + length]
+        if len(p) == length and "\n" not in p:
+            patterns[p] = None
+    while len(patterns) < count:
+        patterns["".join(rng.choices(alphabet, k=length))] = None
+    return list(patterns)
@@ -0,0 +1,102 @@
+import threading
+import time
+from typing import Optional
+from domain.interfaces.cost_model_store import CostModelStore
+
+
+class CostModel:
+    """
+    実際の検索の所要時間から、エンジンごとの所要時間の式を当てはめるコストモデル。
+
+    検索のたびに record で (エンジン, バイト数, パターン数, 平均の長さ, 一致件数, 秒) を記録し（save で保存）、
+    秒 ≈ w0 + w1·MB + w2·MB·k + w3·MB·k·(平均の長さ/16) + w4·(一致件数/100万)
+    の係数 w を、エンジンごとに相対誤差が小さくなるよう非負の最小二乗で求める（k はパターン数）。
+    観測が MIN_OBSERVATIONS 件に満たないエンジンは predict が None を返す（呼び出し側は従来の見積もりを使う）。
+    """
+    # これだけ観測が溜まったら係数を使う
+    MIN_OBSERVATIONS = 5
+    # エンジンごとに残す観測の数（古いものから捨てる）
+    MAX_OBSERVATIONS = 200
+    # これより短い検索は誤差ばかりなので記録しない
+    MIN_SECONDS = 0.005
+    SWEEPS = 200
+
+    def __init__(self, store: CostModelStore = None):
+        self.store = store
+        self._lock = threading.Lock()
+        self._observations = {}
+        self._weights = {}
+        for observation in (store.load() if store else []):
+            self._observations.setdefault(observation.get("engine"), []).append(observation)
+        # 観測が増えたエンジン。係数は次に predict するときに求め直す
+        self._dirty = set(self._observations)
+
+    @staticmethod
+    def _features(size, patterns, length, hits):
+        mb = size / (1024 * 1024)
+        return [1.0, mb, mb * patterns, mb * patterns * length / 16, hits / 1e6]
+
+    def record(self, engine: str, size: int, patterns: int, length: float, hits: int, seconds: float):
+        """検索1回（1ファイル）の実測を足す。"""
+        if seconds < self.MIN_SECONDS or size <= 0:
+            return
+        with self._lock:
+            observations = self._observations.setdefault(engine, [])
+            observations.append({
+                "engine": engine, "bytes": size, "patterns": patterns, "length": length, "hits": hits,
+                "seconds": seconds, "time": time.time()
+            })
+            del observations[:-self.MAX_OBSERVATIONS]
+            self._dirty.add(engine)
+
+    def save(self):
+        """観測をストアに書く（検索1回分をまとめて record してから呼ぶ）。"""
+        if self.store:
+            with self._lock:
+                snapshot = [o for values in self._observations.values() for o in values]
+            self.store.save(snapshot)
+
+    def predict(self, engine: str, size: int, patterns: int, length: float, hits: int = 0) -> Optional[float]:
+        """秒の見込み。まだ当てはめられていないエンジンは None。"""
+        weights = self._current_weights(engine)
+        if weights is None:
+            return None
+        return sum(w * x for w, x in zip(weights, self._features(size, patterns, length, hits)))
+
+    def is_fitted(self, engine: str) -> bool:
+        return self._current_weights(engine) is not None
+
+    def _current_weights(self, engine):
+        with self._lock:
+            if engine in self._dirty:
+                self._dirty.discard(engine)
+                self._fit(engine)
+            return self._weights.get(engine)
+
+    def _fit(self, engine):
+        observations = self._observations.get(engine, [])
+        if len(observations) < self.MIN_OBSERVATIONS:
+            self._weights.pop(engine, None)
+            return
+
+        # 行を秒で割り、相対誤差の二乗和を最小にする。正規方程式の行列 G と右辺 b だけを作る
+        n = len(self._features(0, 0, 0, 0))
+        G = [[0.0] * n for _ in range(n)]
+        b = [0.0] * n
+        for o in observations:
+            scale = 1.0 / o["seconds"]
+            x = [v * scale for v in self._features(o["bytes"], o["patterns"], o["length"], o["hits"])]
+            for i in range(n):
+                b[i] += x[i]  # y * scale = 1
+                for j in range(n):
+                    G[i][j] += x[i] * x[j]
+
+        # 非負の座標降下法（係数が負になると、条件によって見込みが負になるため）
+        w = [0.0] * n
+        for _ in range(self.SWEEPS):
+            for j in range(n):
+                if G[j][j] <= 0:
+                    continue
+                rest = b[j] - sum(G[j][i] * w[i] for i in range(n) if i != j)
+                w[j] = max(0.0, rest / G[j][j])
+        self._weights[engine] = w
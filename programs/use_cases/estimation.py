@@ -1,6 +1,20 @@
 import os
+from domain.algorithms.native import NativeSearch
+from domain.interfaces.file_repository import FileRepository
+from use_cases.cost_model import CostModel
 
 class EstimationUseCase:
+    # "auto" で選ぶエンジン（Bitap はあいまい検索で結果が変わるので選ばない）
+    AUTO_ENGINES = ("naive", "bm", "kmp", "ac", "native")
+    # auto で一致の多さを見るために読むファイルの先頭の大きさ
+    SAMPLE_SIZE = 256 * 1024
+
+    def __init__(self, file_repo: FileRepository = None, cost_model: CostModel = None):
+        # file_repo があれば圧縮ファイルは展開後のサイズで見積もる
+        self.file_repo = file_repo
+        # cost_model が当てはめ済みのエンジンは、実測から求めた式で見積もる
+        self.cost_model = cost_model
+
     def execute(self, file_paths: list[str], algorithm_key: str, patterns: list[str], benchmark_coeffs: dict, bitap_distance: int = 0):
         seconds = self.get_seconds(file_paths, algorithm_key, patterns, benchmark_coeffs, bitap_distance)
         if seconds is None:
@@ -18,7 +32,22 @@ class EstimationUseCase:
         if not file_paths or not patterns:
             return None
 
-        total_size = sum(os.path.getsize(p) for p in file_paths)
+        if algorithm_key == "auto":
+            # 入力のたびに呼ばれるので、ファイルの先頭は読まずに見積もる
+            return sum(self.choose_engine(path, patterns, benchmark_coeffs, sample=False)[1] for path in file_paths)
+
+        predicted = self._predict(file_paths, algorithm_key, patterns, bitap_distance)
+        if predicted is not None:
+            return predicted
+
+        if self.file_repo:
+            total_size = sum(self.file_repo.get_content_size(p) for p in file_paths)
+        else:
+            total_size = sum(os.path.getsize(p) for p in file_paths)
+        return self._heuristic_seconds(total_size, algorithm_key, patterns, benchmark_coeffs)
+
+    def _heuristic_seconds(self, total_size, algorithm_key, patterns, benchmark_coeffs):
+        """起動時のベンチマークの係数と、エンジンごとの経験的な倍率による見積もり。"""
         N_KB = total_size / 1024
 
         num_patterns = len(patterns)
@@ -28,15 +57,112 @@ class EstimationUseCase:
         length_factor = max(1.0, avg_len / 16)
 
         if algorithm_key == "naive":
+            # パターンごとに走査する
             pattern_factor = num_patterns * (avg_len / 8)
         elif algorithm_key == "bm":
-            pattern_factor = num_patterns * (avg_len / 12)
+            if num_patterns == 1:
+                pattern_factor = avg_len / 12
+            else:
+                # 全パターンで1回の走査。確かめる候補はパターン数とともに増える
+                pattern_factor = 1.0 + num_patterns / 50
         elif algorithm_key == "kmp":
-            pattern_factor = num_patterns * (avg_len / 20)
+            # 複数パターンは1つのオートマトンで1回の走査（Aho–Corasick と同じ）
+            pattern_factor = avg_len / 20 if num_patterns == 1 else 1.0
         elif algorithm_key == "bitap":
-            d = max(1, bitap_distance)
-            pattern_factor = num_patterns * (avg_len / 8) * (d / 2)
+            # 全パターンを1つのビット列に詰めて1回で走査する。距離 d には依存しない
+            bits = num_patterns * max(len(p) for p in patterns)
+            pattern_factor = 1.0 + bits / 400
+        elif algorithm_key == "native":
+            # FIND_LIMIT 件まではパターンごとに C の find で1回ずつ、それ以上は正規表現で1回の走査
+            if num_patterns <= NativeSearch.FIND_LIMIT:
+                pattern_factor = num_patterns
+            else:
+                pattern_factor = 135 + num_patterns / 4
+        elif algorithm_key == "vector":
+            # パターンごとに配列全体を数回比べる（1回ごとの重さは C の find に近い）
+            pattern_factor = num_patterns
         else:  # AC
             pattern_factor = 1.0
 
         return N_KB * coeff * length_factor * pattern_factor
+
+    @staticmethod
+    def _model_key(algorithm_key, bitap_distance):
+        # Bitap は距離で速さが変わるので、距離ごとに別のエンジンとして当てはめる
+        return f"bitap/{bitap_distance}" if algorithm_key == "bitap" else algorithm_key
+
+    def _disk_size(self, path):
+        return self.file_repo.get_size(path) if self.file_repo else os.path.getsize(path)
+
+    def _predict(self, file_paths, algorithm_key, patterns, bitap_distance, hits=None):
+        """コストモデルによる見積もり（ファイルごとの和）。当てはめ前なら None。"""
+        if not self.cost_model:
+            return None
+        key = self._model_key(algorithm_key, bitap_distance)
+        avg_len = sum(len(p) for p in patterns) / len(patterns)
+        total = 0.0
+        for path in file_paths:
+            seconds = self.cost_model.predict(
+                key, self._disk_size(path), len(patterns), avg_len, hits.get(path, 0) if hits else 0
+            )
+            if seconds is None:
+                return None
+            total += seconds
+        return total
+
+    def choose_engines(self, paths, patterns, benchmark_coeffs, sample: bool = True) -> dict:
+        """
+        {パス: choose_engine の結果}。先頭の一致を数える NativeSearch は全ファイルで1つを使う
+        （パターンが多いと正規表現を作り直すのが重い）。
+        """
+        searcher = NativeSearch(patterns) if sample and self.file_repo else None
+        return {path: self.choose_engine(path, patterns, benchmark_coeffs, sample, searcher) for path in paths}
+
+    def choose_engine(self, path, patterns, benchmark_coeffs, sample: bool = True, searcher: NativeSearch = None) -> tuple:
+        """
+        このファイルで最も速そうなエンジンのキーと、その見積もり秒数。
+        先頭 SAMPLE_SIZE を C の検索で数えて一致の多さを見積もり（sample が False なら一致なしとみなす）、
+        コストモデル（当てはめ前のエンジンは従来の見積もり）で比べる。
+        searcher は一致を数えるのに使う NativeSearch(patterns)（複数のファイルで使い回すとき。無ければ作る）。
+        """
+        hits = self._sample_hits(path, patterns, searcher) if sample else 0
+        if self.file_repo:
+            content_size = self.file_repo.get_content_size(path)
+        else:
+            content_size = os.path.getsize(path)
+
+        best = None
+        for key in self.AUTO_ENGINES:
+            seconds = self._predict([path], key, patterns, 0, {path: hits})
+            if seconds is None:
+                seconds = self._heuristic_seconds(content_size, key, patterns, benchmark_coeffs)
+            if best is None or seconds < best[1]:
+                best = (key, seconds)
+        return best
+
+    def _sample_hits(self, path, patterns, searcher=None):
+        """ファイル全体の一致件数の見込み（先頭の一致の割合から）。読めなければ 0。"""
+        if not self.file_repo:
+            return 0
+        try:
+            sample = next(iter(self.file_repo.read_chunks(path, self.SAMPLE_SIZE)), "")
+        except (OSError, ValueError):
+            return 0
+        if not sample:
+            return 0
+        found = (searcher or NativeSearch(patterns)).search(sample)
+        return sum(found.counts.values()) * self._disk_size(path) / len(sample)
+
+    def record(self, algorithm_key, patterns, bitap_distance, results: dict):
+        """検索の結果（run_search の戻り値）の所要時間をコストモデルに足す。保存済みの結果を使ったファイルは除く。"""
+        if not self.cost_model or not patterns:
+            return
+        key = self._model_key(algorithm_key, bitap_distance)
+        avg_len = sum(len(p) for p in patterns) / len(patterns)
+        for data in results.values():
+            scanned = data.get("scanned", 0)
+            if scanned <= 0:
+                continue
+            hits = sum(data["result"].counts.values()) * scanned / max(data["size"], 1)
+            self.cost_model.record(key, scanned, len(patterns), avg_len, hits, data["time"] / 1000)
+        self.cost_model.save()
@@ -0,0 +1,198 @@
+import codecs
+import hashlib
+import json
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import accumulate, chain, islice, repeat
+from operator import add
+from typing import Optional
+from domain.algorithms.vectorized import find_newlines
+from domain.interfaces.file_repository import FileRepository
+from domain.interfaces.line_index_store import LineIndexStore
+from domain.models.line_index import LineIndex
+from domain.utils import ChunkDecoder
+
+
+def _line_starts(text, base: int) -> array:
+    """text（str か bytes）中の改行の直後の位置に base を足した array('q')。"""
+    if isinstance(text, bytes):
+        found = find_newlines(text, base)
+        if found is not None:
+            return found
+    pieces = text.split(b"\n" if isinstance(text, bytes) else "\n")
+    # 各行の長さ + 1 の累積和。C で動く関数だけを組み合わせ、1行ずつ Python で回さない
+    return array("q", islice(accumulate(chain((base,), map(add, map(len, pieces[:-1]), repeat(1)))), 1, None))
+
+
+class LineIndexBuilder:
+    """
+    読み込みと同時に LineIndex を作る。チャンクごとに feed(生のバイト列, それをデコードした文字列) を呼ぶ。
+    ASCII だけで CR の無いチャンクは、バイト列で見つけた改行の位置をそのまま文字位置にも使う。
+    作っている途中でも index.locate で、読み終えた所までの位置の行と桁を引ける。
+    """
+
+    def __init__(self, encoding: str):
+        self.index = LineIndex(encoding=encoding)
+        # latin-1 は1バイト1文字なので、ASCII 以外のバイトがあっても位置がずれない
+        self.single_byte = codecs.lookup(encoding).name == "iso8859-1"
+        self.bytes = 0
+
+    def feed(self, raw: Optional[bytes], text: str):
+        index = self.index
+        if raw is not None and len(text) == len(raw) and b"\r" not in raw and (self.single_byte or raw.isascii()):
+            offsets = _line_starts(raw, self.bytes)
+            delta = index.length - self.bytes
+            if index.byte_starts is None and delta == 0:
+                index.starts.extend(offsets)
+            else:
+                self._diverge()
+                index.byte_starts.extend(offsets)
+                index.starts.extend(map(add, offsets, repeat(delta)))
+        else:
+            self._diverge()
+            if raw:
+                index.byte_starts.extend(_line_starts(raw, self.bytes))
+            if text:
+                index.starts.extend(_line_starts(text, index.length))
+        index.length += len(text)
+        if raw:
+            self.bytes += len(raw)
+
+    def _diverge(self):
+        # ここから先は文字位置とバイト位置を別々に持つ
+        if self.index.byte_starts is None:
+            self.index.byte_starts = array("q", self.index.starts)
+
+    def finish(self, size: int, seekable: bool = True) -> LineIndex:
+        """読み終えた索引。size（ディスク上のバイト数）と読んだバイト数が違えば seek しない。"""
+        index = self.index
+        # 単独の CR は文字列では改行になるが、バイト列には b"\n" が無いので行の数が揃わない
+        index.seekable = seekable and self.bytes == size and (
+            index.byte_starts is None or len(index.byte_starts) == len(index.starts)
+        )
+        if not index.seekable:
+            index.byte_starts = None
+        return index
+
+
+class LineIndexUseCase:
+    """
+    ファイルごとの改行の索引 (LineIndex) を作り、(パス, サイズ, 更新時刻, inode) ごとに覚えておく（store があれば保存も）。
+
+    - 検索は走査と同じ読み込みで索引を作る（start → feed → finish、打ち切ったら discard）
+    - 結果の表示・書き出しは lookup / context で使う。索引がまだ無いファイルは get がその場で1回読んで作る
+    """
+    STORE_VERSION = 1
+    # メモリに残す索引の数
+    MEMORY_ENTRIES = 16
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, file_repo: FileRepository, store: LineIndexStore = None):
+        self.file_repo = file_repo
+        self.store = store
+        self._memory = OrderedDict()  # パス -> (指紋, LineIndex)
+        self._building = {}           # パス -> 作っている途中の LineIndexBuilder
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # 並列検索のワーカーへ渡すときは、覚えている索引とロックは渡さない
+        return {"file_repo": self.file_repo, "store": self.store}
+
+    def __setstate__(self, state):
+        self.__init__(state["file_repo"], state["store"])
+
+    def start(self, path: str, encoding: str) -> LineIndexBuilder:
+        builder = LineIndexBuilder(encoding)
+        with self._lock:
+            self._building[path] = builder
+        return builder
+
+    def finish(self, path: str, builder: LineIndexBuilder) -> LineIndex:
+        """読み終えた索引を覚える。"""
+        self.discard(path, builder)
+        fingerprint = self.file_repo.get_fingerprint(path)
+        # 展開しながら読むファイルは、読んだバイト位置がディスク上の位置と違う
+        index = builder.finish(fingerprint[0], self.file_repo.get_compression(path) in (None, "zip", "tar"))
+        self._remember(path, fingerprint, index)
+        if self.store:
+            self.store.put(self._key(path, fingerprint), index)
+        return index
+
+    def discard(self, path: str, builder: LineIndexBuilder):
+        with self._lock:
+            if self._building.get(path) is builder:
+                del self._building[path]
+
+    def build(self, path: str) -> LineIndex:
+        """ファイルを1回読んで索引を作る。"""
+        builder = LineIndexBuilder(self.file_repo.sniff_encoding(path))
+        return self.finish(path, self._feed_all(builder, self.file_repo.read_raw_chunks(path, self.CHUNK_SIZE)))
+
+    @staticmethod
+    def _feed_all(builder, chunks):
+        decoder = ChunkDecoder(builder.index.encoding)
+        for raw in chunks:
+            builder.feed(raw, decoder.decode(raw))
+        builder.feed(None, decoder.decode(b"", final=True))
+        return builder
+
+    def get(self, path: str, build: bool = True) -> Optional[LineIndex]:
+        """ファイルの今の中身の索引。覚えていなければ保存済みのものか、build なら読んで作る。"""
+        fingerprint = self.file_repo.get_fingerprint(path)
+        with self._lock:
+            entry = self._memory.get(path)
+            if entry and entry[0] == fingerprint:
+                self._memory.move_to_end(path)
+                return entry[1]
+        if self.store:
+            index = self.store.get(self._key(path, fingerprint))
+            if index is not None:
+                self._remember(path, fingerprint, index)
+                return index
+        return self.build(path) if build else None
+
+    def lookup(self, path: str) -> LineIndex:
+        """作っている途中ならその索引（読み終えた所まで）、そうでなければ get。検索中の書き出しで行を引くのに使う。"""
+        with self._lock:
+            builder = self._building.get(path)
+        return builder.index if builder else self.get(path)
+
+    def context(self, path: str, positions, width: int) -> Optional[dict]:
+        """
+        positions それぞれの (行番号, 同じ行の前後 width 文字) を、その行の部分だけを seek して読んで求める。
+        seek できないファイル（圧縮ファイルなど）は None（呼び出し側が先頭から読む）。
+        """
+        index = self.get(path)
+        if not index.seekable:
+            return None
+
+        found = {}
+        for position in positions:
+            i = index.line_of(position)
+            k = position - index.starts[i]
+            begin, end = index.byte_span(i)
+            if index.byte_starts is None:
+                # 1文字1バイトなので、一致の前後だけを読む
+                lo = max(k - width, 0)
+                raw = self.file_repo.read_bytes(path, begin + lo, begin + k + width if end is None else min(end, begin + k + width))
+                k -= lo
+            else:
+                # 行の先頭から読む（UTF-8 は1文字が最大4バイト。長い行は最後まで読まない）
+                limit = begin + 4 * (k + width)
+                raw = self.file_repo.read_bytes(path, begin, limit if end is None else min(end, limit))
+            text = ChunkDecoder(index.encoding).decode(raw).split("\n", 1)[0]
+            found[position] = (i + 1, text[max(k - width, 0):k + width].replace("\t", " "))
+        return found
+
+    def _remember(self, path, fingerprint, index):
+        with self._lock:
+            self._memory[path] = (fingerprint, index)
+            self._memory.move_to_end(path)
+            while len(self._memory) > self.MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    def _key(self, path, fingerprint):
+        content = json.dumps([self.STORE_VERSION, os.path.abspath(path), list(fingerprint)], ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
@@ -0,0 +1,173 @@
+import json
+import threading
+import time
+from contextlib import nullcontext
+from typing import Optional
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_time(self.name, time.perf_counter() - self.start)
+
+
+class _Profile:
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.profiler = None
+
+    def __enter__(self):
+        import cProfile  # 使うときだけ読み込む
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return self  # 別のプロファイラが動いている
+        self.profiler = profiler
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler:
+            self.profiler.disable()
+            self.metrics.add_profile(self.profiler)
+
+
+# 無効なときの stage / profiled が返す、何もしない with 文（使い回す）
+_NO_STAGE = nullcontext()
+
+
+class SearchMetrics:
+    """
+    検索1回分の計測。run_search に metrics として渡すと、段ごとの時間とカウンタが溜まる。
+
+    - stage(name): 段の時間を足す with 文。段は stat（サイズ・保存済みの結果の確認）/ read / decode /
+      build（探索器の構築）/ scan / merge（結果の合成・mode の適用）/ store / export / index（改行の索引）
+      （mmap で読むファイルは走査中に読み込まれるので、読み込みの時間は scan に入る。
+      チャンクで読むファイルの改行の索引は、デコードと一緒に作るので decode に入る）
+    - count(name, n): 全体のカウンタ。engine_counters(key) はエンジンごとのカウンタの辞書で、
+      探索器の enable_stats に渡すとエンジン固有の値（AC の走査文字数、BM のずらし幅、Bitap の開始位置の確認など）も入る
+    - profile_every を渡すと、profiled(name) で囲んだ処理を profile_every 回に1回 cProfile で測る
+    - to_dict() / dump(path): JSON にできる形で取り出す
+    段の時間はスレッド・プロセスをまたいで足し合わせるので、並列・パイプラインでは合計が経過時間を超える。
+    enabled が False（NO_METRICS）なら何も記録せず、stage は使い回しの空の with 文を返すだけ。
+    """
+
+    def __init__(self, enabled: bool = True, profile_every: int = 0):
+        self.enabled = enabled
+        self.profile_every = profile_every
+        self.stages = {}     # 段 -> [秒, 回数]
+        self.counters = {}
+        self.engines = {}    # エンジン -> {カウンタ: 値}
+        self._lock = threading.Lock()
+        self._calls = {}     # profiled の name -> 呼ばれた回数
+        self._profile = None
+        self._samples = 0
+        self._start = time.perf_counter()
+
+    def stage(self, name: str):
+        return _Stage(self, name) if self.enabled else _NO_STAGE
+
+    def add_time(self, name: str, seconds: float, calls: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self.stages.get(name)
+            if entry is None:
+                self.stages[name] = [seconds, calls]
+            else:
+                entry[0] += seconds
+                entry[1] += calls
+
+    def timed(self, name: str, func):
+        """呼ぶたびに func の時間を name の段に足す関数（無効なら func そのもの）。"""
+        if not self.enabled:
+            return func
+
+        def call(*args, **kwargs):
+            with _Stage(self, name):
+                return func(*args, **kwargs)
+
+        return call
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def engine_counters(self, key: str) -> Optional[dict]:
+        """エンジン key のカウンタの辞書。無効なら None。"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self.engines.setdefault(key, {})
+
+    def profiled(self, name: str):
+        """profile_every 回に1回だけ cProfile で測る with 文（1回目は必ず測る）。"""
+        if not self.enabled or self.profile_every <= 0:
+            return _NO_STAGE
+        with self._lock:
+            calls = self._calls[name] = self._calls.get(name, 0) + 1
+        return _Profile(self) if (calls - 1) % self.profile_every == 0 else _NO_STAGE
+
+    def add_profile(self, profiler):
+        import pstats
+
+        with self._lock:
+            self._samples += 1
+            if self._profile is None:
+                self._profile = pstats.Stats(profiler)
+            else:
+                self._profile.add(profiler)
+
+    def to_dict(self, top: int = 30) -> dict:
+        with self._lock:
+            data = {
+                "elapsed_ms": (time.perf_counter() - self._start) * 1000,
+                "stages": {
+                    name: {"ms": seconds * 1000, "calls": calls}
+                    for name, (seconds, calls) in sorted(self.stages.items(), key=lambda item: -item[1][0])
+                },
+                "counters": dict(self.counters),
+                "engines": {key: self._derived(counters) for key, counters in self.engines.items()}
+            }
+            if self._profile is not None:
+                data["profile"] = {"samples": self._samples, "functions": self._top_functions(top)}
+        return data
+
+    def dump(self, path: str, top: int = 30):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(top), f, ensure_ascii=False, indent=1)
+
+    @staticmethod
+    def _derived(counters):
+        data = dict(counters)
+        if data.get("time_ms"):
+            data["mb_per_s"] = data.get("bytes_scanned", 0) / (1024 * 1024) / (data["time_ms"] / 1000)
+        if data.get("bm_windows"):
+            data["bm_average_shift"] = data["bm_shift_total"] / data["bm_windows"]
+        return data
+
+    def _top_functions(self, top):
+        rows = sorted(self._profile.stats.items(), key=lambda item: -item[1][3])[:top]
+        return [
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "self_ms": self_time * 1000,
+                "cumulative_ms": cumulative * 1000
+            }
+            for (filename, line, name), (_, calls, self_time, cumulative, _) in rows
+        ]
+
+
+NO_METRICS = SearchMetrics(enabled=False)
@@ -0,0 +1,222 @@
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from queue import Empty
+from domain.interfaces.search_algorithm import SearchAlgorithm
+from domain.models.search_result import SearchResult
+from domain.models.result_mode import ResultMode
+from domain.utils import utf8_valid
+from use_cases.search_files import SearchFilesUseCase
+from use_cases.progress import throttled
+from use_cases.metrics import SearchMetrics, NO_METRICS
+
+# ワーカープロセスごとに1度だけ受け取る（タスクごとに pickle しない）
+_worker = {}
+
+
+def _init_worker(search_use_case, algorithm, progress_queue):
+    _worker["use_case"] = search_use_case
+    _worker["algorithm"] = algorithm
+    _worker["queue"] = progress_queue
+
+
+def _search_file(task_id, path, mode=None):
+    queue = _worker["queue"]
+    return _worker["use_case"].execute(
+        path,
+        _worker["algorithm"],
+        # チャンクごとにキューへ送ると親プロセスの受け取りが追いつかないので間引く
+        progress_callback=throttled(lambda current, total: queue.put((task_id, current))),
+        mode=mode
+    )
+
+
+def _search_range(task_id, path, encoding, start, end):
+    # [start, end) から始まる一致だけを返す。位置はバイトオフセットのまま。
+    # UTF-8 として不正なバイトがあれば None を返す（親がファイル全体を判定し直して走査する）
+    algorithm = _worker["algorithm"]
+    begin = time.perf_counter()
+
+    with _worker["use_case"].file_repo.open_bytes(path, encoding) as (data, encoding):
+        if encoding == "utf-8" and not utf8_valid(data, start, end):
+            return None, time.perf_counter() - begin
+        overlap = max((len(p.encode(encoding, "replace")) for p in algorithm.get_patterns()), default=1) - 1
+        with memoryview(data) as view:
+            part = view[start:min(end + overlap, len(data))]
+            r = algorithm.search_encoded(part, encoding)
+            part.release()
+
+    positions = {}
+    counts = {}
+    for p, pos_list in r.positions.items():
+        kept = [start + pos for pos in pos_list if pos < end - start]
+        positions[p] = kept
+        counts[p] = len(kept)
+
+    return SearchResult(counts, positions), time.perf_counter() - begin
+
+
+class ParallelSearchUseCase:
+    # これより大きいファイルは重なり付きのバイト範囲に分割して探索する
+    RANGE_SIZE = 8 * 1024 * 1024
+
+    def __init__(self, search_use_case: SearchFilesUseCase):
+        self.search_use_case = search_use_case
+
+    def execute(self, file_paths: list[str], algorithm: SearchAlgorithm, max_workers=None, progress_callback=None,
+                result_callback=None, mode: ResultMode = None, metrics: SearchMetrics = None):
+        """
+        ファイル（と大きなファイルのバイト範囲）をプロセスプールで並列に探索する。
+        戻り値は SearchController.run_search と同じ {path: {"result", "time", "size"}}。
+        result_callback(path, SearchResult) はファイルの結果が揃った時点で親プロセスから呼ばれる。
+        mode は各ファイルの execute にそのまま渡す（範囲に分割したファイルは全件を集めてから適用する）。
+        metrics には、ワーカーでの時間を scan、範囲の結果の合成を merge として足す。
+        """
+        file_repo = self.search_use_case.file_repo
+        if mode and mode.kind == "all":
+            mode = None
+        metrics = metrics or NO_METRICS
+        # exists / first_n はファイルの先頭から順に打ち切りたいので分割しない。
+        # 改行を含むパターンは "\r\n" を揃えたテキストで探す必要があるので、ファイル単位の search_bytes に任せる。
+        # 結果ストアを使う場合、保存済みの結果が使えるファイル・追記の続きから走査するファイルは execute に任せ、
+        # 分割して走査したファイルは合成した結果を保存する
+        result_store = self.search_use_case.result_store
+        splittable = (
+            algorithm.bytes_native and algorithm.overlapping
+            and (mode is None or mode.quota is None) and not algorithm.has_newline_patterns()
+        )
+
+        ctx = multiprocessing.get_context()
+        queue = ctx.Queue()
+
+        tasks = {}      # task_id -> (path, total)
+        progress = {}   # task_id -> current
+        with metrics.stage("stat"):
+            sizes = {path: file_repo.get_size(path) for path in file_paths}
+        total_size = sum(sizes.values())
+        file_progress = {path: 0 for path in file_paths}
+        processed_size = 0
+        ranges = {}     # path -> (encoding, 範囲ごとの結果リスト, 範囲数, 保存の計画)
+        results = {}
+
+        def add_task(path, total):
+            task_id = len(tasks)
+            tasks[task_id] = (path, total)
+            progress[task_id] = 0
+            return task_id
+
+        def update(task_id, current):
+            nonlocal processed_size
+            path, _ = tasks[task_id]
+            file_progress[path] += current - progress[task_id]
+            processed_size += current - progress[task_id]
+            progress[task_id] = current
+            if progress_callback:
+                progress_callback(path, processed_size, total_size, file_progress[path], sizes[path])
+
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self.search_use_case, algorithm, queue)
+        ) as pool:
+            futures = {}
+
+            for path in file_paths:
+                encoding = plan = None
+                length = 0
+                if splittable and sizes[path] > self.RANGE_SIZE and not file_repo.get_compression(path):
+                    if result_store:
+                        with metrics.stage("stat"):
+                            plan = self.search_use_case.plan_incremental(path, algorithm)
+                    if plan is None or (plan["cached"] is None and plan["state"] is None):
+                        # 全体を UTF-8 として確かめる open_bytes の判定は親で逐次に行うと重いので、先頭だけで仮に決め、
+                        # 各範囲を受け持つワーカーが確かめる。不正なバイトがあればファイル単位で走査し直す
+                        encoding = plan["encoding"] if plan else file_repo.sniff_encoding(path)
+                        length = sizes[path]
+
+                if length > self.RANGE_SIZE:
+                    ranges[path] = (encoding, [], -(-length // self.RANGE_SIZE), plan)
+                    metrics.count("ranges", ranges[path][2])
+                    for start in range(0, length, self.RANGE_SIZE):
+                        end = min(start + self.RANGE_SIZE, length)
+                        # 進捗はファイルサイズに対する割合で按分する
+                        task_id = add_task(path, sizes[path] * end // length - sizes[path] * start // length)
+                        futures[pool.submit(_search_range, task_id, path, encoding, start, end)] = task_id
+                else:
+                    task_id = add_task(path, sizes[path])
+                    futures[pool.submit(_search_file, task_id, path, mode)] = task_id
+
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                self._drain(queue, futures, pending, update)
+
+                for f in done:
+                    task_id = futures[f]
+                    path, total = tasks[task_id]
+                    if path in ranges:
+                        encoding, parts, count, plan = ranges[path]
+                        parts.append((task_id, f.result()))
+                        metrics.add_time("scan", parts[-1][1][1])
+                        if len(parts) == count and any(r is None for _, (r, _) in parts):
+                            # UTF-8 ではなかった。範囲の進捗を戻し、open_bytes の判定（latin-1）で走査し直す
+                            del ranges[path]
+                            for part_id, _ in parts:
+                                update(part_id, 0)
+                            metrics.count("encoding_retries")
+                            retry_id = add_task(path, sizes[path])
+                            retry = pool.submit(_search_file, retry_id, path, mode)
+                            futures[retry] = retry_id
+                            pending.add(retry)
+                            continue
+                        if len(parts) == count:
+                            with metrics.stage("merge"):
+                                results[path] = self._merge_ranges(
+                                    path, algorithm, encoding, parts, sizes[path], mode, plan
+                                )
+                    else:
+                        results[path] = f.result()
+                        metrics.add_time("scan", results[path]["time"] / 1000)
+                    update(task_id, total)
+
+                    if result_callback and path in results:
+                        result_callback(path, results[path]["result"])
+
+        return {path: results[path] for path in file_paths}
+
+    def _drain(self, queue, futures, pending, update):
+        running = {futures[f] for f in pending}
+        while True:
+            try:
+                task_id, current = queue.get_nowait()
+            except Empty:
+                return
+            # 完了済みタスクの遅れて届いた進捗は無視する
+            if task_id in running:
+                update(task_id, current)
+
+    def _merge_ranges(self, path, algorithm, encoding, parts, size, mode=None, plan=None):
+        """範囲ごとの結果を合成する。plan（plan_incremental の計画）があれば、mode を適用する前の全件を保存する。"""
+        begin = time.perf_counter()
+        merged = SearchResult({}, {})
+        elapsed = 0.0
+
+        for _, (r, seconds) in sorted(parts, key=lambda part: part[0]):
+            elapsed += seconds
+            merged.merge(r)
+
+        with self.search_use_case.file_repo.open_bytes(path, encoding) as (data, encoding):
+            result = algorithm.fill_counts(SearchAlgorithm.decode_positions(merged, data, encoding))
+        if plan:
+            self.search_use_case.store_incremental(path, algorithm, plan, None, result)
+        if mode:
+            result = mode.apply(result)
+
+        elapsed += time.perf_counter() - begin
+        return {
+            "result": result,
+            "time": elapsed * 1000,
+            "size": size,
+            "scanned": size
+        }
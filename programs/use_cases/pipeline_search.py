@@ -0,0 +1,293 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from domain.interfaces.search_algorithm import SearchAlgorithm
+from domain.models.search_result import SearchResult
+from domain.models.result_mode import ResultMode
+from domain.utils import ChunkDecoder
+from use_cases.search_files import SearchFilesUseCase
+from use_cases.metrics import SearchMetrics, NO_METRICS
+
+# プロセスで走査するときに、ワーカーが1度だけ受け取る探索器
+_worker = {}
+
+
+def _init_worker(algorithm):
+    _worker["algorithm"] = algorithm
+
+
+def _scan_step(algorithm, state, chunk, offset, mode):
+    """
+    ストリーム状態 state から chunk を1つ走査し、(結果, 走査後の状態) を返す。
+    state が None ならファイルの先頭から、chunk が None ならファイルの終端 (finish)。
+    状態を毎回受け渡すので、探索器が別プロセスにあっても続きから走査できる。
+    """
+    if state is None:
+        algorithm.reset()
+    else:
+        algorithm.set_state(state)
+    r = algorithm.finish() if chunk is None else algorithm.search_chunk(chunk, offset, mode)
+    return r, algorithm.get_state()
+
+
+def _worker_scan_step(state, chunk, offset, mode):
+    return _scan_step(_worker["algorithm"], state, chunk, offset, mode)
+
+
+def _decode_step(decoder, builder, raw):
+    """raw をデコードし、builder (LineIndexBuilder) があれば改行の索引にも足す。"""
+    text = decoder.decode(raw)
+    if builder:
+        builder.feed(raw, text)
+    return text
+
+
+class PipelineSearchUseCase:
+    """
+    読み込み → デコード → 走査 を asyncio の段に分け、段のあいだを長さの決まったキューでつなぐ。
+    走査しているあいだに次のチャンク（次のファイル）の読み込みとデコードが進むので、
+    ディスク（NFS など）の待ち時間と CPU の処理が重なる。キューが一杯なら前の段が待つので、
+    メモリに載るのはおよそ CHUNK_SIZE * (2 * QUEUE_SIZE + 3) までに収まる。
+    """
+    CHUNK_SIZE = 1024 * 1024
+    QUEUE_SIZE = 4
+
+    def __init__(self, search_use_case: SearchFilesUseCase):
+        self.search_use_case = search_use_case
+
+    def execute(self, file_paths: list[str], algorithm: SearchAlgorithm, progress_callback=None,
+                result_callback=None, mode: ResultMode = None, processes: bool = False, metrics: SearchMetrics = None):
+        """
+        戻り値・コールバックは SearchController.run_search と同じ
+        （progress_callback(path, 全体の現在値, 全体, ファイルの現在値, ファイルのサイズ)、result_callback(path, SearchResult)）。
+        processes が True なら走査を別プロセスで行う（デコードとも CPU を取り合わない）。
+        metrics には段ごとの時間を足す（段は重なって進むので、合計は経過時間を超える）。
+        """
+        if mode and mode.kind == "all":
+            mode = None
+        return asyncio.run(self._run(file_paths, algorithm, progress_callback, result_callback, mode, processes,
+                                     metrics or NO_METRICS))
+
+    async def _run(self, file_paths, algorithm, progress_callback, result_callback, mode, processes, metrics):
+        loop = asyncio.get_running_loop()
+        raw_queue = asyncio.Queue(self.QUEUE_SIZE)
+        text_queue = asyncio.Queue(self.QUEUE_SIZE)
+        # 打ち切ったファイル（exists / first_n を満たした）。読み込みとデコードを途中でやめる
+        stopped = set()
+        results = {}
+
+        sizes = {path: self.search_use_case.file_repo.get_size(path) for path in file_paths}
+        progress = {"total": sum(sizes.values()), "done": 0, "files": {}}
+
+        if processes:
+            scan_pool = ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(algorithm,))
+            step = _worker_scan_step
+        else:
+            scan_pool = ThreadPoolExecutor(max_workers=1)
+            step = functools.partial(_scan_step, algorithm)
+
+        with ThreadPoolExecutor(max_workers=1) as io_pool, ThreadPoolExecutor(max_workers=1) as decode_pool, scan_pool:
+            tasks = [
+                asyncio.ensure_future(self._read(loop, io_pool, file_paths, algorithm, mode, raw_queue, stopped, metrics)),
+                asyncio.ensure_future(self._decode(loop, decode_pool, raw_queue, text_queue, stopped, metrics)),
+                asyncio.ensure_future(self._scan(
+                    loop, scan_pool, io_pool, step, algorithm, mode, text_queue, stopped, sizes, progress,
+                    progress_callback, result_callback, results, metrics
+                ))
+            ]
+            # どこかの段が失敗したら、キューを待ち続けている他の段も止める
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                task.result()
+
+        return {path: results[path] for path in file_paths}
+
+    def _plan(self, path, algorithm, mode):
+        """走査の開始位置とエンコーディング。結果ストアがあれば保存済みの結果・続きからの再開を使う。"""
+        search_use_case = self.search_use_case
+        if search_use_case.result_store:
+            plan = search_use_case.plan_incremental(path, algorithm)
+            if mode is None:
+                return plan
+            # mode 付きでは保存済みの全件の結果だけを使い、続きからの再開と保存はしない
+            if plan["cached"] is None and plan["state"] is not None:
+                plan.update(start=0, offset=0, state=None, decoder=None, base=None,
+                            encoding=search_use_case.file_repo.sniff_encoding(path))
+            plan["store"] = False
+            return plan
+
+        return {
+            "size": search_use_case.file_repo.get_size(path), "cached": None, "start": 0, "offset": 0,
+            "encoding": search_use_case.file_repo.sniff_encoding(path), "state": None, "decoder": None, "base": None,
+            "store": False
+        }
+
+    async def _read(self, loop, io_pool, file_paths, algorithm, mode, raw_queue, stopped, metrics):
+        """読み込み段。ファイルを先頭から順にチャンクで読み、走査が追いつくまで先読みする。"""
+        file_repo = self.search_use_case.file_repo
+        plan_file = metrics.timed("stat", self._plan)
+        read = metrics.timed("read", next)
+
+        for path in file_paths:
+            plan = await loop.run_in_executor(io_pool, plan_file, path, algorithm, mode)
+            await raw_queue.put(("start", path, plan))
+
+            if plan["cached"] is None:
+                position = [plan["start"]]  # ディスク上の読み込み位置（進捗に使う）
+                chunks = file_repo.read_raw_chunks(
+                    path, self.CHUNK_SIZE, plan["start"], plan["size"], lambda pos: position.__setitem__(0, pos)
+                )
+                try:
+                    while path not in stopped:
+                        raw = await loop.run_in_executor(io_pool, read, chunks, None)
+                        if raw is None:
+                            break
+                        await raw_queue.put(("chunk", path, (raw, position[0])))
+                finally:
+                    await loop.run_in_executor(io_pool, chunks.close)
+
+            await raw_queue.put(("end", path, None))
+        await raw_queue.put(None)
+
+    async def _decode(self, loop, decode_pool, raw_queue, text_queue, stopped, metrics):
+        """
+        デコード段。バイト列を文字列にし、(文字列, 読み込み位置) を走査段へ渡す。
+        line_indexes があれば、先頭から読むファイルの改行の索引もここで作る。
+        """
+        line_indexes = self.search_use_case.line_indexes
+        decoder = None
+        builder = None
+        while True:
+            item = await raw_queue.get()
+            if item is None:
+                await text_queue.put(None)
+                return
+
+            kind, path, value = item
+            if kind == "start":
+                decoder = ChunkDecoder(value["encoding"]) if value["cached"] is None else None
+                if decoder and value["decoder"] is not None:
+                    decoder.set_state(value["decoder"])
+                builder = None
+                if decoder and line_indexes and value["start"] == 0:
+                    builder = line_indexes.start(path, value["encoding"])
+                await text_queue.put(item)
+            elif kind == "chunk":
+                if path not in stopped:
+                    raw, position = value
+                    text = await loop.run_in_executor(
+                        decode_pool, metrics.timed("decode", _decode_step), decoder, builder, raw
+                    )
+                    await text_queue.put(("chunk", path, (text, position)))
+            else:
+                if decoder and path not in stopped:
+                    # 終端で確定した文字列は、確定する前のデコーダの状態（再開に使う）と一緒に終端として渡す
+                    held = decoder.get_state()
+                    text = decoder.decode(b"", final=True)
+                    if builder:
+                        builder.feed(None, text)
+                        await loop.run_in_executor(decode_pool, line_indexes.finish, path, builder)
+                    item = ("end", path, (text, held))
+                elif builder:
+                    # 途中で打ち切ったので、索引も途中まで
+                    line_indexes.discard(path, builder)
+                builder = None
+                await text_queue.put(item)
+
+    async def _scan(self, loop, scan_pool, io_pool, step, algorithm, mode, text_queue, stopped, sizes, progress,
+                    progress_callback, result_callback, results, metrics):
+        """走査段。チャンクを届いた順に走査し、ファイルの終端で結果をまとめる。"""
+        search_use_case = self.search_use_case
+        patterns = [p for p in dict.fromkeys(algorithm.get_patterns()) if p]
+
+        def report(path, current):
+            files = progress["files"]
+            progress["done"] += current - files.get(path, 0)
+            files[path] = current
+            if progress_callback:
+                progress_callback(path, progress["done"], progress["total"], current, sizes[path])
+
+        def emit(path, r):
+            if result_callback:
+                result_callback(path, r)
+
+        while True:
+            item = await text_queue.get()
+            if item is None:
+                return
+
+            kind, path, value = item
+            if kind == "start":
+                plan = value
+                begin = time.perf_counter()
+                state = plan["state"]
+                offset = plan["offset"]
+                position = plan["start"]
+                report(path, position)
+
+                if plan["cached"] is not None:
+                    metrics.count("cached_files")
+                    result = mode.apply(plan["cached"]) if mode else plan["cached"]
+                    emit(path, result)
+                elif plan["base"] is not None:
+                    result = plan["base"]
+                    emit(path, result)
+                else:
+                    result = SearchResult({}, {}, {}, mode.limit if mode else None)
+
+            elif kind == "chunk":
+                if path in stopped:
+                    continue
+                text, position = value
+                metrics.count("chunks")
+                # 走査はプロセスで行うこともあるので（関数を包むと pickle できない）、待ち時間ごと測る
+                with metrics.stage("scan"):
+                    r, state = await loop.run_in_executor(scan_pool, step, state, text, offset, mode)
+                if mode:
+                    r = mode.clip(r, result)
+                emit(path, r)
+                with metrics.stage("merge"):
+                    result.merge(r)
+                offset += len(text)
+                report(path, min(position, sizes[path]))
+                if mode and mode.is_done(result, patterns):
+                    stopped.add(path)
+
+            else:
+                if plan["cached"] is None and path not in stopped:
+                    text, held = value
+                    # 終端の処理（デコーダの確定と finish）の前の時点から、追記されたら再開する（SearchFilesUseCase を参照）
+                    # 空のファイルはまだ状態が無い（次も最初から走査する）
+                    checkpoint = {"chars": offset, "state": state, "decoder": held} if state is not None else None
+                    rest = []
+                    with metrics.stage("scan"):
+                        if text:
+                            r, state = await loop.run_in_executor(scan_pool, step, state, text, offset, mode)
+                            rest.append(r)
+                        r, state = await loop.run_in_executor(scan_pool, step, state, None, offset, mode)
+                        rest.append(r)
+                    partial = result.copy() if any(any(r.counts.values()) for r in rest) else result
+                    for r in rest:
+                        if mode:
+                            r = mode.clip(r, result)
+                        emit(path, r)
+                        result.merge(r)
+                    position = sizes[path]
+                    if plan.get("store", True):
+                        if checkpoint is not None:
+                            checkpoint["result"] = partial
+                        await loop.run_in_executor(
+                            io_pool, metrics.timed("store", search_use_case.store_incremental),
+                            path, algorithm, plan, checkpoint, result
+                        )
+                report(path, sizes[path])
+                results[path] = {
+                    "result": result,
+                    "time": (time.perf_counter() - begin) * 1000,
+                    "size": sizes[path],
+                    # 打ち切ったファイルは読んだところまで
+                    "scanned": 0 if plan["cached"] is not None else position - plan["start"]
+                }
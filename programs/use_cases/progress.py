@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class ProgressSnapshot:
+    """ある時点の進捗。files は前回の snapshot から変わったファイルだけ {path: (現在値, サイズ)}。"""
+    __slots__ = ("files", "current", "total", "rate", "eta", "elapsed", "done")
+
+    def __init__(self, files, current, total, rate, eta, elapsed, done):
+        self.files = files
+        self.current = current    # 全体の現在値（バイト）
+        self.total = total
+        self.rate = rate          # バイト/秒（直近 WINDOW 秒の平均。まだ測れなければ None）
+        self.eta = eta            # 残りの秒数の見込み（測れなければ None）
+        self.elapsed = elapsed
+        self.done = done
+
+    @property
+    def fraction(self) -> float:
+        return self.current / self.total if self.total > 0 else 1.0
+
+    def format(self) -> str:
+        """「 45.2%  123.4 MB/s  残り 12 秒」の形の1行。"""
+        text = f"{self.fraction * 100:5.1f}%"
+        if self.rate is not None:
+            text += f"  {self.rate / (1024 * 1024):.1f} MB/s"
+        if self.done:
+            text += f"  {self.elapsed:.1f} 秒"
+        elif self.eta is not None:
+            text += f"  残り {self.eta:.0f} 秒"
+        return text
+
+
+class ProgressChannel:
+    """
+    検索スレッドから届く進捗をまとめて、UI などへ間引いて渡す。
+
+    run_search の progress_callback としてそのまま渡せる（path, 全体の現在値, 全体, ファイルの現在値, ファイルのサイズ）。
+    受け取った値は最新のものだけを覚えておく（ロックを取って辞書に書くだけ）ので、何度呼ばれても検索は遅くならない。
+
+    - poll(): 受け手が決まった間隔で呼び、前回から変わった分を ProgressSnapshot で受け取る（Tk の after など）
+    - listener: 渡すと、update の中で interval 秒に1回だけ listener(snapshot) を呼ぶ（CLI など）
+    - close(): 最後の値を listener に渡す
+    """
+    INTERVAL = 0.1
+    # 速度はこの秒数のあいだの進み方で測る
+    WINDOW = 3.0
+
+    def __init__(self, listener=None, interval: float = INTERVAL):
+        self.listener = listener
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._files = {}
+        self._current = 0
+        self._total = 0
+        self._done = False
+        self._start = time.monotonic()
+        self._last = 0.0  # 最後に listener を呼んだ時刻
+        self._samples = deque()  # (時刻, 全体の現在値)
+
+    def __call__(self, path, current, total, file_current, file_total):
+        self.update(path, current, total, file_current, file_total)
+
+    def update(self, path, current, total, file_current, file_total):
+        with self._lock:
+            self._files[path] = (file_current, file_total)
+            self._current = current
+            self._total = total
+        if self.listener:
+            now = time.monotonic()
+            if now - self._last >= self.interval:
+                self._last = now
+                self.listener(self.poll())
+
+    def poll(self) -> Optional[ProgressSnapshot]:
+        """前回の poll から変わった分。何も届いていなければ None。"""
+        now = time.monotonic()
+        with self._lock:
+            files, self._files = self._files, {}
+            current, total, done = self._current, self._total, self._done
+        if not files and not done and self._samples and self._samples[-1][1] == current:
+            return None
+
+        samples = self._samples
+        samples.append((now, current))
+        while len(samples) > 2 and now - samples[1][0] >= self.WINDOW:
+            samples.popleft()
+        rate = eta = None
+        t0, c0 = samples[0]
+        if now > t0 and len(samples) > 1:
+            rate = (current - c0) / (now - t0)
+            if rate > 0:
+                eta = max(total - current, 0) / rate
+        return ProgressSnapshot(files, current, total, rate, eta, now - self._start, done)
+
+    def close(self):
+        with self._lock:
+            self._done = True
+            self._current = self._total
+        if self.listener:
+            self.listener(self.poll())
+
+
+def throttled(callback, interval: float = ProgressChannel.INTERVAL):
+    """
+    callback(現在値, 全体) を interval 秒に1回まで間引く（最後の 現在値 == 全体 は必ず渡す）。
+    並列検索のワーカーがチャンクごとにキューへ送る進捗などに使う。
+    """
+    last = [0.0]
+
+    def report(current, total):
+        now = time.monotonic()
+        if current >= total or now - last[0] >= interval:
+            last[0] = now
+            callback(current, total)
+
+    return report
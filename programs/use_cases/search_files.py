@@ -1,60 +1,372 @@
 import time
+import os
+import hashlib
+import json
 from domain.interfaces.file_repository import FileRepository
 from domain.interfaces.search_algorithm import SearchAlgorithm
+from domain.interfaces.result_store import ResultStore
 from domain.models.search_result import SearchResult
+from domain.models.result_mode import ResultMode
+from domain.utils import ChunkDecoder
+from use_cases.line_index import LineIndexUseCase
+from use_cases.metrics import SearchMetrics, NO_METRICS
 
 class SearchFilesUseCase:
     LARGE_FILE_THRESHOLD = 50 * 1024 * 1024
+    # 追記かどうかの判定に使う、前回の末尾のバイト数
+    APPEND_CHECK_SIZE = 4096
+    RESULT_STORE_VERSION = 6
+    CHUNK_SIZE = 1024 * 1024
 
-    def __init__(self, file_repo: FileRepository):
+    def __init__(self, file_repo: FileRepository, result_store: ResultStore = None,
+                 line_indexes: LineIndexUseCase = None):
         self.file_repo = file_repo
+        self.result_store = result_store
+        # 渡すと、走査と同じ読み込みでファイルごとの改行の索引も作る（結果の行番号・前後の文字列の表示に使う）
+        self.line_indexes = line_indexes
 
-    def execute(self, file_path: str, algorithm: SearchAlgorithm, progress_callback=None):
-        size = self.file_repo.get_size(file_path)
+    def execute(self, file_path: str, algorithm: SearchAlgorithm, progress_callback=None, result_callback=None,
+                mode: ResultMode = None, metrics: SearchMetrics = None):
+        """
+        result_callback を渡すと、見つかった一致を result_callback(SearchResult) で受け取れる
+        （ファイル全体の完了を待たずに出力したい CLI 向け。ストリーミングで読む大きなファイルはチャンクごと、
+        mmap で1回に走査するファイルは走査し終えた時点で1回）。
+        mode (count / exists / first_n) を渡すと、その条件を満たした時点でファイルの読み込みをやめる。
+        metrics を渡すと段ごとの時間（stat / read / decode / scan / merge / store）を足していく。
+        """
+        if mode and mode.kind == "all":
+            mode = None
+        metrics = metrics or NO_METRICS
+
+        if self.result_store:
+            if mode is None:
+                return self._execute_incremental(file_path, algorithm, progress_callback, result_callback, metrics)
+            with metrics.stage("stat"):
+                stored = self._stored_result(file_path, algorithm, progress_callback, result_callback, mode)
+            if stored:
+                metrics.count("cached_files")
+                return stored
+
+        with metrics.stage("stat"):
+            size = self.file_repo.get_size(file_path)
+            streaming = self._needs_stream(file_path, size)
         start = time.perf_counter()
 
-        if size > self.LARGE_FILE_THRESHOLD:
-            result = self._search_stream(file_path, algorithm, progress_callback=progress_callback)
+        if streaming:
+            result, scanned = self._search_stream(
+                file_path, algorithm, progress_callback=progress_callback, result_callback=result_callback, mode=mode,
+                metrics=metrics
+            )
         else:
+            result = self._search_mapped(file_path, algorithm, size, progress_callback, result_callback, mode, metrics)
+            scanned = size
+
+        end = time.perf_counter()
+
+        return {
+            "result": result,
+            "time": (end - start) * 1000,
+            "size": size,
+            "scanned": scanned
+        }
+
+    def _needs_stream(self, file_path, size):
+        # 圧縮ファイルは展開しながら読む（mmap できず、展開後の大きさも分からない）
+        return size > self.LARGE_FILE_THRESHOLD or self.file_repo.get_compression(file_path)
+
+    def _search_mapped(self, file_path, algorithm, size, progress_callback, result_callback, mode, metrics):
+        """
+        ファイル全体を mmap で開き、search_bytes で1回に走査する。
+        エンコーディングは read_text と同じく全体が UTF-8 として妥当かで決める（先頭だけで決めると、
+        後ろにある不正なバイトが捨てられて一致を落とし、それより後ろの位置もずれる）。
+        改行の索引も作るときは、バッファをチャンクに分けて _search_stream と同じ走査で索引も作る（バッファを2回読まない）。
+        """
+        with self.file_repo.open_bytes(file_path) as (data, encoding):
+            if self.line_indexes:
+                result, _ = self._search_stream(
+                    file_path, algorithm, progress_callback=progress_callback, result_callback=result_callback,
+                    end=size, encoding=encoding, mode=mode, metrics=metrics, buffer=data
+                )
+                return result
             if progress_callback:
                 progress_callback(0, size)
-            text = self.file_repo.read_text(file_path)
-            result = algorithm.search(text)
+            with metrics.stage("scan"):
+                result = algorithm.search_bytes(data, encoding, mode)
+        if mode:
+            with metrics.stage("merge"):
+                result = mode.apply(result)
+        if result_callback:
+            result_callback(result)
+        if progress_callback:
+            progress_callback(size, size)
+        return result
+
+    def _execute_incremental(self, file_path, algorithm, progress_callback=None, result_callback=None,
+                             metrics=NO_METRICS):
+        """
+        (パス, サイズ, 更新時刻, inode, 検索条件) が前回と同じなら保存済みの結果を返す。
+        追記されただけのファイルは、前回の終端からストリーム状態を引き継いで続きだけを走査する。
+        最初から走査する小さなファイルは mmap で1回に走査し、結果だけを保存する（ストリーム状態は持たないので、
+        追記されたら次も最初から走査する）。
+        """
+        with metrics.stage("stat"):
+            plan = self.plan_incremental(file_path, algorithm)
+        size = plan["size"]
+        start = time.perf_counter()
+
+        if plan["cached"]:
+            metrics.count("cached_files")
             if progress_callback:
                 progress_callback(size, size)
+            if result_callback:
+                result_callback(plan["cached"])
+            return {
+                "result": plan["cached"],
+                "time": (time.perf_counter() - start) * 1000,
+                "size": size,
+                "scanned": 0
+            }
+
+        if plan["state"] is None and not self._needs_stream(file_path, size):
+            result = self._search_mapped(file_path, algorithm, size, progress_callback, result_callback, None, metrics)
+            with metrics.stage("store"):
+                self.store_incremental(file_path, algorithm, plan, None, result)
+            return {
+                "result": result,
+                "time": (time.perf_counter() - start) * 1000,
+                "size": size,
+                "scanned": size
+            }
+
+        if plan["state"] is not None:
+            algorithm.set_state(plan["state"])
+            if result_callback:
+                result_callback(plan["base"])
+        checkpoint = {}
+        r, scanned = self._search_stream(
+            file_path, algorithm, progress_callback=progress_callback, result_callback=result_callback,
+            start=plan["start"], end=size, offset=plan["offset"], encoding=plan["encoding"],
+            decoder_state=plan["decoder"], metrics=metrics, checkpoint=checkpoint
+        )
+        result = r
+        if plan["base"]:
+            metrics.count("resumed_files")
+            partial = checkpoint["result"]
+            # 再開の時点の結果も、保存済みの分を足したものにする（終端の処理で増えた分が無ければ同じもの）
+            if partial is not r:
+                checkpoint["result"] = plan["base"].copy().merge(partial)
+            result = plan["base"].merge(r)
+            if partial is r:
+                checkpoint["result"] = result
+        with metrics.stage("store"):
+            self.store_incremental(file_path, algorithm, plan, checkpoint, result)
 
         end = time.perf_counter()
 
         return {
             "result": result,
             "time": (end - start) * 1000,
-            "size": size
+            "size": size,
+            "scanned": scanned
+        }
+
+    def plan_incremental(self, file_path, algorithm) -> dict:
+        """
+        保存済みの結果をもとに、このファイルをどこから走査すればよいかを返す。
+
+        - cached: 保存済みの結果がそのまま使えるならその SearchResult（走査は不要）
+        - start / offset / encoding: 走査を始めるバイト位置・文字オフセットとエンコーディング
+        - state / decoder / base: 追記の続きから走査するときのストリーム状態・デコーダの持ち越しと、
+          それまでの結果（最初からなら None）
+        再開の時点を保存していない結果（mmap で走査したもの）は、追記されたら最初から走査し直す。
+        """
+        size, mtime, inode = self.file_repo.get_fingerprint(file_path)
+        entry = self.result_store.get(self._result_key(file_path, algorithm))
+        plan = {
+            "size": size, "fingerprint": (size, mtime, inode), "cached": None,
+            "start": 0, "offset": 0, "encoding": None, "state": None, "decoder": None, "base": None
         }
 
-    def _search_stream(self, path, algorithm, chunk_size=1024*1024, progress_callback=None):
-        size = self.file_repo.get_size(path)
-        offset = 0
-        counts = {}
-        positions = {}
-        distances = {}
+        if entry and (entry["size"], entry["mtime"], entry["inode"]) == (size, mtime, inode):
+            plan["cached"] = entry["result"]
+        elif entry and entry["checkpoint"] is not None and self._is_append(file_path, entry, size, inode):
+            checkpoint = entry["checkpoint"]
+            plan.update(
+                start=entry["size"], offset=checkpoint["chars"], encoding=entry["encoding"],
+                state=checkpoint["state"], decoder=checkpoint["decoder"], base=checkpoint["result"]
+            )
+        else:
+            plan["encoding"] = self.file_repo.sniff_encoding(file_path)
+        return plan
+
+    def store_incremental(self, file_path, algorithm, plan, checkpoint, result):
+        """
+        plan_incremental の計画どおりに走査し終えた結果を、次回の再利用・再開のために保存する。
+        checkpoint は終端の処理の前の時点（_search_stream を参照）。None なら追記の続きからは再開しない。
+        """
+        size, mtime, inode = plan["fingerprint"]
+        self.result_store.put(self._result_key(file_path, algorithm), {
+            "size": size,
+            "mtime": mtime,
+            "inode": inode,
+            "encoding": plan["encoding"],
+            "tail": self._tail_digest(file_path, size),
+            "checkpoint": checkpoint,
+            "result": result
+        })
+
+    def _stored_result(self, file_path, algorithm, progress_callback, result_callback, mode):
+        """保存済みの全件の結果がそのまま使えるなら、mode を適用して返す（mode 付きの検索結果は保存しない）。"""
+        size, mtime, inode = self.file_repo.get_fingerprint(file_path)
+        entry = self.result_store.get(self._result_key(file_path, algorithm))
+        if not entry or (entry["size"], entry["mtime"], entry["inode"]) != (size, mtime, inode):
+            return None
+
+        start = time.perf_counter()
+        result = mode.apply(entry["result"])
+        if progress_callback:
+            progress_callback(size, size)
+        if result_callback:
+            result_callback(result)
+        return {
+            "result": result,
+            "time": (time.perf_counter() - start) * 1000,
+            "size": size,
+            "scanned": 0
+        }
+
+    def _result_key(self, file_path, algorithm):
+        content = json.dumps(
+            [self.RESULT_STORE_VERSION, os.path.abspath(file_path), algorithm.get_signature()],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
+    def _is_append(self, file_path, entry, size, inode):
+        return (
+            inode == entry["inode"]
+            and size > entry["size"]
+            and self._tail_digest(file_path, entry["size"]) == entry["tail"]
+        )
+
+    def _tail_digest(self, file_path, size):
+        data = self.file_repo.read_bytes(file_path, max(0, size - self.APPEND_CHECK_SIZE), size)
+        return hashlib.sha256(data).hexdigest()
+
+    def _search_stream(self, path, algorithm, chunk_size=CHUNK_SIZE, progress_callback=None, result_callback=None,
+                       start=0, end=None, offset=0, encoding=None, decoder_state=None, mode=None, metrics=NO_METRICS,
+                       checkpoint=None, buffer=None):
+        """
+        バイト範囲 [start, end) をチャンク単位で検索し、(結果, 読み込んだバイト数) を返す。
+        start > 0 のときは set_state 済みのストリーム状態と、decoder_state（ChunkDecoder の持ち越し）から続きを走査する。
+        mode の条件を満たしたら残りのチャンクは読まない。buffer（mmap したファイル全体など）を渡すと、ファイルを読む代わりに
+        そのバッファをチャンクに分けて走査する。
+        checkpoint (dict) を渡すと、終端の処理（デコーダが持ち越した "\r" と多バイト文字の途中の確定、finish）の
+        直前の時点を chars / state / decoder / result に入れる。追記されたらこの時点から再開する
+        （終端の処理の後から再開すると、保留していた一致や "\r" の後の "\n" を二重に数える）。
+        """
+        size = self.file_repo.get_size(path) if end is None else end
+        result = SearchResult({}, {}, {}, mode.limit if mode else None)
+        patterns = [p for p in dict.fromkeys(algorithm.get_patterns()) if p]
+        position = start  # ディスク上の読み込み位置（圧縮ファイルでも進捗は圧縮後のサイズに対して出す）
+
+        def on_progress(pos):
+            nonlocal position
+            position = pos
+
+        if start == 0:
+            algorithm.reset()
         if progress_callback:
-            progress_callback(0, size)
+            progress_callback(start, size)
 
-        for chunk in self.file_repo.read_chunks(path, chunk_size):
-            r = algorithm.search_chunk(chunk, offset)
+        with metrics.stage("decode"):
+            encoding = encoding or self.file_repo.sniff_encoding(path)
+            decoder = ChunkDecoder(encoding)
+            if decoder_state is not None:
+                decoder.set_state(decoder_state)
+        builder = None
+        if self.line_indexes and start == 0:
+            # 途中から再開するときは索引を作らない（必要になったときに読み直して作る）
+            builder = self.line_indexes.start(path, encoding)
 
-            for p, c in r.counts.items():
-                counts[p] = counts.get(p, 0) + c
-            for p, pos in r.positions.items():
-                if p not in positions: positions[p] = []
-                positions[p].extend(pos)
-            for p, dist in r.distances.items():
-                if p not in distances: distances[p] = []
-                distances[p].extend(dist)
+        chunks = self._decoded_chunks(path, chunk_size, start, end, decoder, on_progress, metrics, builder, buffer)
+        for chunk in chunks:
+            with metrics.stage("scan"):
+                r = algorithm.search_chunk(chunk, offset, mode)
+            if mode:
+                r = mode.clip(r, result)
+            if result_callback:
+                result_callback(r)
+            with metrics.stage("merge"):
+                result.merge(r)
 
             offset += len(chunk)
             if progress_callback:
-                progress_callback(offset, size)
+                progress_callback(min(position, size), size)
+            if mode and mode.is_done(result, patterns):
+                break
+        else:
+            if checkpoint is not None:
+                checkpoint.update(chars=offset, state=algorithm.get_state(), decoder=decoder.get_state())
+            with metrics.stage("decode"):
+                chunk = decoder.decode(b"", final=True)
+                if builder:
+                    builder.feed(None, chunk)
+            with metrics.stage("scan"):
+                rest = [algorithm.search_chunk(chunk, offset, mode)] if chunk else []
+                rest.append(algorithm.finish())
+            if checkpoint is not None:
+                # 終端の処理で一致が増えるときだけ、その前の結果を複製して残す
+                checkpoint["result"] = result.copy() if any(any(r.counts.values()) for r in rest) else result
+            for r in rest:
+                if mode:
+                    r = mode.clip(r, result)
+                if result_callback:
+                    result_callback(r)
+                result.merge(r)
+            if builder:
+                self.line_indexes.finish(path, builder)
+                builder = None
+        if builder:
+            # 途中で打ち切ったので、索引も途中まで
+            self.line_indexes.discard(path, builder)
+
+        if progress_callback:
+            progress_callback(size, size)
+
+        return result, position - start
+
+    def _decoded_chunks(self, path, chunk_size, start, end, decoder, on_progress, metrics, builder=None, buffer=None):
+        """
+        [start, end) を読み、decoder (ChunkDecoder) でデコードしたチャンクを、読み込み (read) とデコード (decode) の
+        時間を分けて測りながら返す。終端での decoder の確定は呼び出し側で行う。
+        builder (LineIndexBuilder) を渡すと、生のバイト列とデコードした文字列を渡して改行の索引も作る。
+        buffer を渡すと、ファイルの代わりに buffer[start:end] を切り分けて返す。
+        """
+        if buffer is None:
+            raws = self.file_repo.read_raw_chunks(path, chunk_size, start, end, on_progress)
+        else:
+            raws = self._buffer_chunks(buffer, chunk_size, start, len(buffer) if end is None else min(end, len(buffer)),
+                                       on_progress)
+        try:
+            while True:
+                with metrics.stage("read"):
+                    raw = next(raws, None)
+                if raw is None:
+                    return
+                with metrics.stage("decode"):
+                    chunk = decoder.decode(raw)
+                    if builder:
+                        builder.feed(raw, chunk)
+                if chunk:
+                    metrics.count("chunks")
+                    yield chunk
+        finally:
+            raws.close()
 
-        return SearchResult(counts, positions, distances)
+    @staticmethod
+    def _buffer_chunks(buffer, chunk_size, start, end, on_progress):
+        for s in range(start, end, chunk_size):
+            e = min(s + chunk_size, end)
+            on_progress(e)
+            yield buffer[s:e]
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# アプリは programs/ を起点に絶対 import する（python programs/main.py と同じ）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "programs"))
@@ -0,0 +1,83 @@
+"""
+CompactAhoCorasickSearch の疎な遷移表（_SparseDelta）が、配列の遷移表と同じ結果を返すかを確かめる。
+"""
+import pickle
+import random
+
+import pytest
+
+from domain.algorithms.aho_corasick_compact import CompactAhoCorasickSearch, _SparseDelta
+from domain.models.result_mode import ResultMode
+from domain.models.search_result import SearchResult
+
+MODES = [None, ResultMode("count"), ResultMode("exists"), ResultMode("first_n", 2)]
+
+
+def dense(patterns):
+    return CompactAhoCorasickSearch(patterns)
+
+
+def sparse(patterns):
+    searcher = CompactAhoCorasickSearch(patterns)
+    searcher.DENSE_LIMIT = 0
+    return searcher
+
+
+def matches(r: SearchResult):
+    return {p: c for p, c in r.counts.items()}, {p: list(pos) for p, pos in r.positions.items() if len(pos)}
+
+
+def test_sparse_table_is_used_over_limit():
+    searcher = sparse(["ab", "bc"])
+    searcher.build_automaton()
+    assert isinstance(searcher.delta, _SparseDelta)
+    built = dense(["ab", "bc"])
+    built.build_automaton()
+    assert not isinstance(built.delta, _SparseDelta)
+
+
+@pytest.mark.parametrize("mode", MODES, ids=lambda m: m.kind if m else "all")
+def test_sparse_matches_dense(mode):
+    rng = random.Random(4)
+    for _ in range(300):
+        patterns = ["".join(rng.choice("abcé") for _ in range(rng.randint(1, 5))) for _ in range(rng.randint(1, 8))]
+        text = "".join(rng.choice("abcéz") for _ in range(rng.randint(0, 120)))
+        assert matches(sparse(patterns).search(text, mode)) == matches(dense(patterns).search(text, mode)), (
+            patterns, text
+        )
+
+
+def test_sparse_matches_dense_on_bytes_and_chunks():
+    rng = random.Random(5)
+    for _ in range(100):
+        patterns = ["".join(rng.choice("abエ") for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 6))]
+        text = "".join(rng.choice("abエz") for _ in range(rng.randint(0, 120)))
+        expected = matches(dense(patterns).search(text))
+        assert matches(sparse(patterns).search_bytes(text.encode("utf-8"), "utf-8")) == expected
+
+        searcher = sparse(patterns)
+        searcher.reset()
+        result = SearchResult({}, {})
+        for offset in range(0, len(text), 7):
+            result.merge(searcher.search_chunk(text[offset:offset + 7], offset))
+        assert matches(result)[1] == expected[1]
+
+
+def test_sparse_memo_is_bounded():
+    # 覚える遷移の数は SPARSE_MEMO までで、それを超えても結果は変わらない
+    rng = random.Random(6)
+    cjk = [chr(0x4E00 + i) for i in range(500)]
+    patterns = ["".join(rng.choice(cjk) for _ in range(3)) for _ in range(300)]
+    text = "".join(rng.choice(cjk) for _ in range(20000)) + patterns[0]
+    searcher = sparse(patterns)
+    searcher.SPARSE_MEMO = 64
+    assert matches(searcher.search(text)) == matches(dense(patterns).search(text))
+    assert len(searcher.delta) <= 64
+
+
+def test_sparse_automaton_survives_pickle():
+    patterns = ["エラー", "error", "err"]
+    searcher = sparse(patterns)
+    text = "an error: エラー, err"
+    expected = matches(searcher.search(text))
+    assert matches(pickle.loads(pickle.dumps(searcher)).search(text)) == expected
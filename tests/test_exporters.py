@@ -0,0 +1,124 @@
+"""
+書き出した結果を読み戻し、一致（ファイル・パターン・位置・距離・行・桁）と件数が変わらないかを形式ごとに確かめる。
+"""
+import csv
+import io
+import json
+
+import pytest
+
+from domain.models.search_result import SearchResult
+from infrastructure.external.file_exporter import ExcelExporter, FileExporter, JsonLinesExporter
+from infrastructure.external.file_repository import LocalFileRepository
+from use_cases.line_index import LineIndexUseCase
+
+
+def make_results():
+    return {
+        "a.log": {"result": SearchResult({"ERROR": 2, "エラー": 0}, {"ERROR": [0, 14]}), "time": 1.25, "size": 20},
+        "b.log": {
+            "result": SearchResult({"timeout": 3}, {"timeout": [5, 40, 41]}, {"timeout": [0, 1, 2]}),
+            "time": 0.5, "size": 64
+        },
+    }
+
+
+def expected_matches(results):
+    rows = []
+    for path, data in results.items():
+        r = data["result"]
+        for p, positions in r.positions.items():
+            distances = r.distances.get(p) or [None] * len(positions)
+            rows.extend((path, p, pos, dist) for pos, dist in zip(positions, distances))
+    return rows
+
+
+def expected_counts(results):
+    return [(path, p, c) for path, data in results.items() for p, c in data["result"].counts.items()]
+
+
+def test_csv_round_trip(tmp_path):
+    results = make_results()
+    path = str(tmp_path / "out.csv")
+    FileExporter.export(results, path)
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["種別", "ファイル", "パターン", "位置", "距離", "件数"]
+    assert [(r[1], r[2], int(r[3]), int(r[4]) if r[4] else None) for r in rows if r[0] == "match"] == \
+        expected_matches(results)
+    assert [(r[1], r[2], int(r[5])) for r in rows if r[0] == "file"] == expected_counts(results)
+
+
+@pytest.mark.parametrize("to_stream", [False, True])
+def test_jsonl_round_trip(tmp_path, to_stream):
+    results = make_results()
+    if to_stream:
+        out = io.StringIO()
+        with JsonLinesExporter(out) as exporter:
+            for file, data in results.items():
+                exporter.write_matches(file, data["result"])
+                exporter.write_summary(file, data)
+        text = out.getvalue()
+    else:
+        path = str(tmp_path / "out.jsonl")
+        FileExporter.export(results, path)
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+
+    records = [json.loads(line) for line in text.splitlines()]
+    assert [(r["file"], r["pattern"], r["position"], r.get("distance")) for r in records if r["type"] == "match"] == \
+        expected_matches(results)
+    assert [(r["file"], p, c) for r in records if r["type"] == "file" for p, c in r["counts"].items()] == \
+        expected_counts(results)
+
+
+def test_excel_round_trip_across_sheets(tmp_path, monkeypatch):
+    openpyxl = pytest.importorskip("openpyxl")
+    # 1シートの行数の上限を小さくして、次のシートへ続くことも確かめる
+    monkeypatch.setattr(ExcelExporter, "MAX_ROWS", 3)
+    results = make_results()
+    path = str(tmp_path / "out.xlsx")
+    FileExporter.export(results, path)
+
+    wb = openpyxl.load_workbook(path, read_only=True)
+    match_sheets = [ws for ws in wb.worksheets if ws.title.startswith("一致")]
+    assert len(match_sheets) == 3
+    rows = [row for ws in match_sheets for row in list(ws.iter_rows(values_only=True))[1:]]
+    # 読み戻すと末尾の空のセル（距離なし）は省かれる
+    assert [tuple(row) + (None,) * (4 - len(row)) for row in rows] == expected_matches(results)
+    counts = list(wb["件数"].iter_rows(values_only=True))[1:]
+    assert [row[:3] for row in counts] == expected_counts(results)
+    wb.close()
+
+
+@pytest.mark.parametrize("ext", [".parquet", ".arrow"])
+def test_arrow_round_trip(tmp_path, monkeypatch, ext):
+    pa = pytest.importorskip("pyarrow")
+    from infrastructure.external.file_exporter import ArrowExporter
+    # 行グループ（レコードバッチ）に分けて書き足しても、読み戻すと同じ行になる
+    monkeypatch.setattr(ArrowExporter, "BATCH_ROWS", 2)
+    results = make_results()
+    path = str(tmp_path / ("out" + ext))
+    FileExporter.export(results, path)
+
+    if ext == ".parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+    else:
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+    assert list(zip(*(table.column(name).to_pylist() for name in ("file", "pattern", "position", "distance")))) == \
+        expected_matches(results)
+
+
+def test_line_and_column(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text("ok\nan ERROR\r\nERROR\n", encoding="utf-8", newline="")
+    results = {str(log): {"result": SearchResult({"ERROR": 2}, {"ERROR": [6, 12]}), "time": 0.1, "size": 19}}
+    path = str(tmp_path / "out.jsonl")
+    FileExporter.export(results, path, line_index=LineIndexUseCase(LocalFileRepository()))
+
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [(r["line"], r["column"]) for r in records if r["type"] == "match"] == [(2, 4), (3, 1)]
@@ -0,0 +1,122 @@
+"""
+ストリーム状態の保存と再開（get_state / set_state）と、追記されたファイルを続きから走査する結果ストアを確かめる。
+"""
+import os
+import pickle
+import random
+
+import pytest
+
+from adapters.controllers.search_controller import SearchController
+from domain.models.search_result import SearchResult
+from infrastructure.external.file_repository import LocalFileRepository
+from infrastructure.external.pickle_directory import PickleDirectory
+from infrastructure.external.result_store import FileResultStore
+from use_cases.search_files import SearchFilesUseCase
+
+ENGINES = ["naive", "bm", "kmp", "ac", "native", "vector", "bitap"]
+PATTERNS = ["ab", "a\nb", "エラー", "aaa", "\n\n", "a\n"]
+
+
+def make_algorithm(key, patterns=PATTERNS):
+    return SearchController(None, None, None)._get_algorithm(key, patterns, 1)
+
+
+def matches(r: SearchResult):
+    return (
+        {p: list(pos) for p, pos in r.positions.items() if len(pos)},
+        {p: list(dist) for p, dist in r.distances.items() if len(dist)},
+    )
+
+
+@pytest.mark.parametrize("key", ENGINES)
+def test_resume_from_saved_state(key):
+    # 途中までの状態を pickle して別の探索器に set_state しても、続きの結果は変わらない
+    rng = random.Random(key)
+    for _ in range(100):
+        text = "".join(rng.choice(["a", "b", "エ", "ラー", "\n"]) for _ in range(rng.randint(0, 200)))
+        cut = rng.randint(0, len(text))
+        first = make_algorithm(key)
+        first.reset()
+        result = first.search_chunk(text[:cut], 0)
+        state = pickle.loads(pickle.dumps(first.get_state()))
+
+        second = make_algorithm(key)
+        second.set_state(state)
+        result.merge(second.search_chunk(text[cut:], cut))
+        result.merge(second.finish())
+        assert matches(result) == matches(make_algorithm(key).search(text)), text
+
+
+@pytest.fixture
+def use_cases(tmp_path):
+    repo = LocalFileRepository()
+    incremental = SearchFilesUseCase(repo, FileResultStore(str(tmp_path / "results")))
+    # 小さなファイルも追記の続きから走査できるよう、ストリーミングで読む
+    incremental.LARGE_FILE_THRESHOLD = -1
+    return incremental, SearchFilesUseCase(repo)
+
+
+@pytest.mark.parametrize("key", ENGINES)
+def test_appended_file_resumes(use_cases, tmp_path, key):
+    incremental, plain = use_cases
+    path = str(tmp_path / "app.log")
+    rng = random.Random("append-" + key)
+    open(path, "wb").close()
+    for step in range(30):
+        with open(path, "ab") as f:
+            f.write("".join(rng.choice(["a", "b", "ab", "エラー", "\n", "\r\n", "\r"]) for _ in range(rng.randint(0, 30)))
+                    .encode("utf-8"))
+        got = incremental.execute(path, make_algorithm(key))
+        expected = plain.execute(path, make_algorithm(key))
+        assert matches(got["result"]) == matches(expected["result"]), (step, open(path, "rb").read())
+
+
+def test_trailing_cr_then_appended_lf(use_cases, tmp_path):
+    # 前回の終端の "\r" と、追記の先頭の "\n" は合わせて1つの改行
+    incremental, plain = use_cases
+    path = str(tmp_path / "crlf.log")
+    with open(path, "wb") as f:
+        f.write(b"xa\r")
+    incremental.execute(path, make_algorithm("ac", ["a\nb", "b"]))
+    with open(path, "ab") as f:
+        f.write(b"\nb")
+    got = incremental.execute(path, make_algorithm("ac", ["a\nb", "b"]))
+    assert 0 < got["scanned"] < got["size"]
+    assert matches(got["result"]) == matches(plain.execute(path, make_algorithm("ac", ["a\nb", "b"]))["result"])
+    assert list(got["result"].positions["b"]) == [3]
+
+
+def test_bitap_pending_match_is_not_reported_twice(use_cases, tmp_path):
+    incremental, plain = use_cases
+    path = str(tmp_path / "bitap.log")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("xx timeou")
+    incremental.execute(path, make_algorithm("bitap", ["timeout"]))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("t yy")
+    got = incremental.execute(path, make_algorithm("bitap", ["timeout"]))
+    expected = plain.execute(path, make_algorithm("bitap", ["timeout"]))
+    assert matches(got["result"]) == matches(expected["result"])
+    assert got["result"].counts["timeout"] == expected["result"].counts["timeout"]
+
+
+def test_unchanged_file_uses_stored_result(use_cases, tmp_path):
+    incremental, _ = use_cases
+    path = str(tmp_path / "same.log")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("ab ab\n")
+    first = incremental.execute(path, make_algorithm("native"))
+    second = incremental.execute(path, make_algorithm("native"))
+    assert first["scanned"] == os.path.getsize(path) and second["scanned"] == 0
+    assert matches(second["result"]) == matches(first["result"])
+
+
+def test_pickle_directory_stays_under_limit(tmp_path):
+    store = PickleDirectory(str(tmp_path), 20000)
+    for i in range(300):
+        store.save(f"k{i}", b"x" * 1000)
+    total = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    assert total <= 20000
+    assert store.load("k299") == b"x" * 1000
+    assert store.load("k0") is None
@@ -0,0 +1,93 @@
+"""
+チャンクに分けて search_chunk で走査した結果が、テキスト全体を search した結果と同じになるか
+（チャンク境界をまたぐ一致・持ち越しの二重報告）をエンジンごとに確かめる。
+"""
+import random
+
+import pytest
+
+from adapters.controllers.search_controller import SearchController
+from domain.models.search_result import SearchResult
+from domain.utils import decode_text
+
+ENGINES = ["naive", "bm", "kmp", "ac", "native", "vector", "bitap"]
+ALPHABET = ["a", "b", "ab", "エ", "ラー", "\n"]
+
+
+def make_algorithm(key, patterns):
+    # controller と同じ対応（1パターンなら BM / KMP は1パターン版）
+    return SearchController(None, None, None)._get_algorithm(key, patterns, 1)
+
+
+def matches(r: SearchResult):
+    return (
+        {p: list(pos) for p, pos in r.positions.items() if len(pos)},
+        {p: list(dist) for p, dist in r.distances.items() if len(dist)},
+        {p: c for p, c in r.counts.items() if c},
+    )
+
+
+def random_case(rng):
+    text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 300)))
+    patterns = ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 4))]
+    return text, patterns
+
+
+def search_chunked(algorithm, text, rng):
+    algorithm.reset()
+    result = SearchResult({}, {})
+    offset = 0
+    while offset < len(text):
+        chunk = text[offset:offset + rng.randint(1, 40)]
+        result.merge(algorithm.search_chunk(chunk, offset))
+        offset += len(chunk)
+    return result.merge(algorithm.finish())
+
+
+@pytest.mark.parametrize("key", ENGINES)
+def test_chunked_matches_whole_text(key):
+    rng = random.Random(key)
+    for _ in range(150):
+        text, patterns = random_case(rng)
+        whole = make_algorithm(key, patterns).search(text)
+        chunked = search_chunked(make_algorithm(key, patterns), text, rng)
+        assert matches(chunked) == matches(whole), (patterns, text)
+
+
+@pytest.mark.parametrize("key", ENGINES)
+def test_single_pattern_chunked(key):
+    rng = random.Random("single-" + key)
+    for _ in range(100):
+        text, patterns = random_case(rng)
+        whole = make_algorithm(key, patterns[:1]).search(text)
+        chunked = search_chunked(make_algorithm(key, patterns[:1]), text, rng)
+        assert matches(chunked) == matches(whole), (patterns[:1], text)
+
+
+@pytest.mark.parametrize("key", ENGINES)
+def test_search_bytes_matches_decoded_text(key):
+    # バイト列のまま走査しても、位置は改行を揃えてデコードしたテキストの文字オフセットになる
+    rng = random.Random("bytes-" + key)
+    for _ in range(100):
+        text, patterns = random_case(rng)
+        data = text.replace("\n", rng.choice(["\n", "\r\n"])).encode("utf-8")
+        expected = make_algorithm(key, patterns).search(decode_text(data, "utf-8"))
+        got = make_algorithm(key, patterns).search_bytes(data, "utf-8")
+        assert matches(got) == matches(expected), (patterns, data)
+
+
+def test_match_across_many_chunks():
+    # 1文字ずつのチャンクでも、長いパターンの一致を1度だけ報告する
+    text = "xx" + "abcdefgh" * 3 + "yy"
+    for key in ENGINES:
+        algorithm = make_algorithm(key, ["abcdefgh", "habc"])
+        algorithm.reset()
+        result = SearchResult({}, {})
+        for i, char in enumerate(text):
+            result.merge(algorithm.search_chunk(char, i))
+        result.merge(algorithm.finish())
+        if key == "bitap":
+            assert list(result.positions["abcdefgh"])[:1] == [2]
+        else:
+            assert list(result.positions["abcdefgh"]) == [2, 10, 18], key
+            assert list(result.positions["habc"]) == [9, 17], key